@@ -1,31 +1,90 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field, computed_field
-from typing import Annotated
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Body, Request
+from fastapi.responses import Response, StreamingResponse, PlainTextResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import Annotated, Literal
 import pandas as pd
 import numpy as np
-import joblib
+import pyarrow as pa
 import io
+import time
+import asyncio
+import contextvars
+import instrumentation
+from featureengineering import feature_kernel, columns_from_records, NUMERIC_INPUTS, CATEGORICAL_INPUTS, KPI_SPEC
+from model_registry import registry
+from prediction_cache import prediction_cache
+from batching import MicroBatcher, batching_enabled
+from execution import backend, BackendBusy
+from dataio import detect_format, iter_frames
+from ingest import read_typed, iter_typed, validate, InvalidRows
+from edastats import EDAAccumulator
+from dataset_store import dataset_store
+from kpicube import KPICube, InvalidCube, kpi_cubes
+from scenarios import score_scenarios, allocate_budget, InvalidScenario, ALLOCATION_MIN_MULTIPLIER, \
+    ALLOCATION_MAX_MULTIPLIER, ALLOCATION_STEPS
+from attribution import (PathAccumulator, attribute, parse_models, InvalidPaths,
+                         SHAPLEY_EXACT_MAX, SHAPLEY_SAMPLES, TIME_DECAY_HALF_LIFE)
+from serialization import (negotiate, parse_columns, select_columns, handle_nonfinite, encode_table, encode_eda,
+                           encode_json, columns_data,
+                           EDA_TABLES, MEDIA_TYPES, UnknownColumns, NonFiniteValues)
+from instrumentation import (span, run_traced, record_spans, profiled, profile_mode, profile_slot,
+                             request_profile_mode, metrics, Gauge, REQUEST_SECONDS, PROFILE_HEADER)
 
 app = FastAPI(title="Revenue Predictor with EDA")
 
-# ------------------- Load Model & Encoders -------------------
-model = joblib.load("xgb_model.pkl")
-le_adgroup = joblib.load("le_adgroup.pkl")
-le_month = joblib.load("le_month.pkl")
+# ------------------- Model Registry -------------------
+# The active model bundle is loaded lazily on first use and can be hot-swapped
+# via /admin/model/reload or by pointing models/CURRENT at a new version.
+registry.watch()
 
-# Required CSV columns (Conv_Rate added)
-REQUIRED_COLUMNS = ['Impressions', 'Clicks', 'CTR', 'Conversions', 'Conv Rate', 
-                    'Cost', 'CPC', 'Sale Amount', 'P&L', 'Ad Group', 'Month']
+# Backend jobs score with the bundle the request pinned, not whichever one their
+# process has active: process workers never see a reload in the parent.
+job_bundle = contextvars.ContextVar("job_bundle", default=None)
 
 
-# ------------------- Input Schema with Computed Fields -------------------
+def current_bundle():
+    return job_bundle.get() or registry.get()
+
+
+def run_pinned(version, fn, args):
+    token = job_bundle.set(registry.pinned(version))
+    try:
+        return fn(*args)
+    finally:
+        job_bundle.reset(token)
+
+
+def predict_rows(bundle, X):
+    # Cached rows skip the model; the misses are scored in a single batch
+    with span("predict", rows=len(X), version=bundle.version):
+        return prediction_cache.predict(X, bundle.version, bundle.predict)
+
+# Required CSV columns: the raw inputs of the feature specification
+REQUIRED_COLUMNS = NUMERIC_INPUTS + CATEGORICAL_INPUTS
+
+# Streaming mode: rows parsed and scored per chunk, and response media types
+STREAM_CHUNK_ROWS = 50_000
+EDA_CHUNK_ROWS = 100_000
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Upper bound on records accepted by /predict_batch in one request
+MAX_BATCH_RECORDS = 10_000
+
+
+# ------------------- Input Schema -------------------
+# Derived features (Conv Rate, CPC, ROI, CPM, ...) come from the shared feature
+# specification, exactly as in training; Conv_Rate and CPC are accepted for
+# compatibility but recomputed from the raw counts. Rates are fractions, as in
+# the training data and the ingest rules: 0.41, not 41.
 class CampaignInput(BaseModel):
     Impressions: Annotated[int, Field(..., gt=0)]
     Clicks: Annotated[int, Field(..., ge=0)]
-    CTR: Annotated[float, Field(..., ge=0)]
+    CTR: Annotated[float, Field(..., ge=0, le=1, description="Clicks/Impressions as a fraction (0.41, not 41)")]
     Conversions: Annotated[int, Field(..., ge=0)]
-    Conv_Rate: Annotated[float, Field(..., ge=0, description="Conversion rate = Conversions/Clicks")]
+    Conv_Rate: Annotated[float, Field(..., ge=0, le=1,
+                                      description="Conversions/Clicks as a fraction (0.1, not 10)")]
     Cost: Annotated[float, Field(..., ge=0)]
     CPC: Annotated[float, Field(..., ge=0)]
     Sale_Amount: Annotated[float, Field(..., ge=0)]
@@ -33,31 +92,65 @@ class CampaignInput(BaseModel):
     Ad_Group: Annotated[str, Field(...)]
     Month: Annotated[str, Field(...)]
 
-    # -------- Computed Fields --------
-    @computed_field
-    @property
-    def ROI(self) -> float:
-        return round((self.Sale_Amount - self.Cost) / self.Cost if self.Cost > 0 else 0, 2)
-
-    @computed_field
-    @property
-    def Profit_Margin(self) -> float:
-        return round((self.Sale_Amount - self.Cost) / self.Sale_Amount if self.Sale_Amount > 0 else 0, 2)
-
-    @computed_field
-    @property
-    def CPM(self) -> float:
-        return round((self.Cost / self.Impressions) * 1000 if self.Impressions > 0 else 0, 2)
-
-    @computed_field
-    @property
-    def Revenue_per_Click(self) -> float:
-        return round(self.Sale_Amount / self.Clicks if self.Clicks > 0 else 0, 2)
-
-    @computed_field
-    @property
-    def Revenue_per_Conversion(self) -> float:
-        return round(self.Sale_Amount / self.Conversions if self.Conversions > 0 else 0, 2)
+
+# ------------------- Instrumentation -------------------
+# Stage spans feed latency histograms and row counters labelled with the model
+# version; every request is timed per route, and a sampled profiler can be
+# switched on with MTA_PROFILE or, with MTA_PROFILE_HEADER=1, per request with
+# the X-MTA-Profile header. Only one request per process is profiled at a time.
+instrumentation.model_version = lambda: registry.loaded_version or "none"
+
+metrics.register(Gauge("mta_model_info", "Active model version.", ("version",),
+                       lambda: {(registry.loaded_version,): 1} if registry.loaded_version else {}))
+metrics.register(Gauge("mta_executor_in_flight", "Jobs running or queued on the execution backend.", ("kind",),
+                       lambda: {(backend.kind,): backend.stats()["in_flight"]}))
+metrics.register(Gauge("mta_executor_rejected", "Jobs rejected by admission control since start.", ("kind",),
+                       lambda: {(backend.kind,): backend.stats()["rejected"]}))
+metrics.register(Gauge("mta_prediction_cache", "Prediction cache counters.", ("field",),
+                       lambda: {(k,): v for k, v in prediction_cache.stats().items() if k in ("entries", "hits", "misses")}))
+
+
+@app.middleware("http")
+async def instrument_request(request: Request, call_next):
+    requested = request_profile_mode(request.headers.get(PROFILE_HEADER))
+    started = time.perf_counter()
+    status = 500
+    with profile_slot(requested) as mode:
+        token = profile_mode.set(mode)
+        try:
+            with profiled(request.url.path, mode) as profile:
+                response = await call_next(request)
+            status = response.status_code
+            if profile["path"]:
+                response.headers["X-MTA-Profile-Dump"] = profile["path"]
+            elif requested and mode is None:
+                response.headers["X-MTA-Profile-Skipped"] = "another profile is running"
+            return response
+        finally:
+            route = request.scope.get("route")
+            REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                    (request.method, route.path if route else "unmatched", str(status)))
+            profile_mode.reset(token)
+
+
+async def run_backend(fn, *args, version=None):
+    # Backend jobs return their spans (and profile) to this process; the model
+    # version is pinned here, when the request arrives
+    version = version or registry.get().version
+    try:
+        result, spans = await backend.run(run_traced, run_pinned, (version, fn, args), profile_mode.get())
+    except Exception as e:
+        record_spans(getattr(e, "mta_spans", ()))
+        raise
+    record_spans(spans)
+    return result
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # ------------------- Root Endpoint -------------------
 @app.get("/")
 def read_root():
@@ -65,106 +158,891 @@ def read_root():
 
 
 # ------------------- CSV Validation -------------------
+class InvalidInput(ValueError):
+    # Raised inside backend jobs; unlike HTTPException it survives pickling to a process pool
+    pass
+
+
 def validate_csv_columns(df: pd.DataFrame):
     missing_cols = [col for col in REQUIRED_COLUMNS if col not in df.columns]
     if missing_cols:
-        raise HTTPException(status_code=400, detail=f"Missing columns in CSV: {missing_cols}")
+        raise InvalidInput(f"Missing columns in CSV: {missing_cols}")
+
+
+# ------------------- Errors -------------------
+def overload_error(e: Exception) -> HTTPException:
+    if isinstance(e, BackendBusy):
+        return HTTPException(status_code=503, detail=f"Server busy: {str(e)}", headers={"Retry-After": "1"})
+    return HTTPException(status_code=504, detail=f"Request exceeded {backend.timeout:g}s processing limit")
+
+
+# Input that cannot be decoded or parsed is the client's error, not the server's
+BAD_INPUT_ERRORS = (UnicodeDecodeError, pd.errors.ParserError, pd.errors.EmptyDataError, pa.ArrowInvalid)
+
+
+def processing_error(e: Exception, what: str = "file") -> HTTPException:
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, (InvalidInput, UnknownColumns, InvalidPaths, InvalidScenario, InvalidRows, InvalidCube)):
+        return HTTPException(status_code=400, detail=str(e))
+    if isinstance(e, NonFiniteValues):
+        return HTTPException(status_code=422, detail=str(e))
+    stage = getattr(e, "mta_stage", None)
+    where = f" during {stage}" if stage else ""
+    status = 400 if isinstance(e, BAD_INPUT_ERRORS) else 500
+    return HTTPException(status_code=status, detail=f"Error processing {what}{where}: {str(e)}")
+
+
+async def upload_source(file: UploadFile):
+    # Thread workers read the spooled upload directly; process workers need bytes
+    if backend.kind == "thread":
+        file.file.seek(0)
+        return file.file
+    return await file.read()
+
+
+def require_input(file: UploadFile | None, dataset_id: str | None):
+    if (file is None) == (dataset_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of 'file' or 'dataset_id'")
+    if dataset_id is not None and not dataset_store.exists(dataset_id):
+        raise HTTPException(status_code=404, detail=f"Unknown dataset_id: {dataset_id}")
+
+
+# ------------------- Content Negotiation -------------------
+# An explicit output_format wins; otherwise the Accept header picks among
+# JSON, CSV, Parquet and Arrow IPC.
+OutputFormat = Literal["json", "csv", "parquet", "arrow"]
+NonFinitePolicy = Literal["null", "error"]
+# Rows failing the ingest rules (ingest.RULES): scored anyway, dropped, or a 400
+InvalidRowPolicy = Literal["keep", "drop", "raise"]
+
+
+def response_format(request: Request, output_format: str | None) -> str:
+    fmt = output_format or negotiate(request.headers.get("accept"))
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"Acceptable formats: {', '.join(MEDIA_TYPES.values())}")
+    return fmt
+
+
+# ------------------- Dataset Upload -------------------
+def ingest_dataset(source, fmt: str) -> dict:
+    # Hash, parse once and store; re-uploading the same bytes is a no-op
+    return dataset_store.info(dataset_store.put(source, fmt))
+
+
+@app.post("/datasets")
+async def upload_dataset(file: UploadFile = File(...)):
+    try:
+        fmt = detect_format(file.filename, file.content_type)
+        return await run_backend(ingest_dataset, await upload_source(file), fmt)
+
+    except (BackendBusy, asyncio.TimeoutError) as e:
+        raise overload_error(e)
+    except KeyError as e:
+        # Evicted by concurrent uploads before it could be described
+        raise HTTPException(status_code=404, detail=f"Dataset {e} was evicted; upload it again")
+    except Exception as e:
+        raise processing_error(e)
+
+
+@app.get("/datasets/stats")
+def dataset_stats():
+    return dataset_store.stats()
+
+
+@app.get("/datasets/{dataset_id}")
+def dataset_info(dataset_id: str):
+    try:
+        return dataset_store.info(dataset_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset_id: {dataset_id}")
 
 
 # ------------------- EDA Endpoint -------------------
-@app.post("/eda")
-async def run_eda(file: UploadFile = File(...)):
+def timed_frames(frames):
+    # Chunks are read lazily, so each one is timed as it is parsed
+    frames = iter(frames)
     try:
-        contents = await file.read()
-        df = pd.read_csv(io.StringIO(contents.decode("utf-8")))
+        while True:
+            with span("parse") as parse:
+                chunk = next(frames, None)
+                parse.rows = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        if hasattr(frames, "close"):
+            frames.close()
+
+
+def describe_frames(frames) -> dict:
+    # Chunks are folded into mergeable accumulators, so memory stays
+    # O(columns^2) whatever the row count.
+    acc = EDAAccumulator()
+    for chunk in timed_frames(frames):
+        if acc.columns is None:
+            validate_csv_columns(chunk)
+        with span("eda_accumulate", rows=len(chunk)):
+            acc.update(chunk)
+
+    # EDA Summary
+    with span("eda_summary"):
+        return acc.summary()
 
-        validate_csv_columns(df)
 
-        # EDA Summary
-        eda_summary = {
-            "Shape": df.shape,
-            "Missing_Values": df.isnull().sum().to_dict(),
-            "Numeric_Summary": df.describe().to_dict(),
-            "Top_Ad_Groups": df["Ad Group"].value_counts().head(5).to_dict(),
-            "Top_Months": df["Month"].value_counts().head(5).to_dict(),
-            "Correlation": df.corr(numeric_only=True).to_dict()
-        }
+def describe_upload(source, fmt: str) -> dict:
+    # Runs on the execution backend, streaming the upload in chunks
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return describe_frames(iter_typed(source, fmt, EDA_CHUNK_ROWS))
+
+
+def describe_dataset(dataset_id: str) -> dict:
+    df = dataset_store.get(dataset_id)
+    return describe_frames(df.iloc[i:i + EDA_CHUNK_ROWS] for i in range(0, max(len(df), 1), EDA_CHUNK_ROWS))
+
+
+@app.post("/eda")
+async def run_eda(
+    request: Request,
+    file: UploadFile | None = File(None),
+    dataset_id: str | None = None,
+    output_format: OutputFormat | None = None,
+    table: Literal[tuple(EDA_TABLES)] = "numeric_summary",
+    columns: str | None = None,
+    nonfinite: NonFinitePolicy = "null",
+):
+    # JSON keeps the nested summary (columns= picks sections); tabular formats
+    # return one `table` of it (columns= picks its columns)
+    require_input(file, dataset_id)
+    output_format = response_format(request, output_format)
+    try:
+        if dataset_id is not None:
+            key = (dataset_id, "eda")
+            eda_summary = dataset_store.get_result(key)
+            if eda_summary is None:
+                eda_summary = await run_backend(describe_dataset, dataset_id)
+                dataset_store.put_result(key, eda_summary)
+        else:
+            fmt = detect_format(file.filename, file.content_type)
+            eda_summary = await run_backend(describe_upload, await upload_source(file), fmt)
 
-        return JSONResponse(status_code=200, content=eda_summary)
+        with span("serialize"):
+            body = encode_eda(eda_summary, output_format, parse_columns(columns), table, nonfinite)
+        return Response(status_code=200, content=body, media_type=MEDIA_TYPES[output_format])
 
+    except (BackendBusy, asyncio.TimeoutError) as e:
+        raise overload_error(e)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+        raise processing_error(e)
+
+
+# ------------------- CSV Scoring -------------------
+def score_frame(df: pd.DataFrame, on_invalid: str = "keep", bundle=None) -> pd.DataFrame:
+    validate_csv_columns(df)
+    if on_invalid != "keep":
+        with span("validate", rows=len(df)):
+            df, _ = validate(df, on_invalid)
+
+    bundle = bundle or current_bundle()
+    kernel = feature_kernel(bundle.features)
+
+    # Features in the bundle's training order, encoded in the same pass
+    with span("features", rows=len(df)):
+        features = kernel(df, bundle.encoders)
+
+    # Prediction
+    df["Predicted_Revenue"] = predict_rows(bundle, features)
+
+    # Add KPIs on predicted revenue
+    with span("kpis", rows=len(df)):
+        for name, values in kernel.kpis(df, df["Predicted_Revenue"]).items():
+            df[name] = values
+
+    return df
+
+
+def serialize_chunk(df: pd.DataFrame, stream_format: str, header: bool,
+                    columns: list | None = None, nonfinite: str = "null") -> str:
+    with span("serialize", rows=len(df)):
+        df = handle_nonfinite(select_columns(df, columns), nonfinite)
+        if stream_format == "csv":
+            return df.to_csv(index=False, header=header)
+        out = df.to_json(orient="records", lines=True)
+        return out if out.endswith("\n") else out + "\n"
+
+
+def input_columns(bundle) -> list:
+    # Column projection: only what validation and the model need is loaded
+    return list(dict.fromkeys(REQUIRED_COLUMNS + bundle.features))
+
+
+def score_upload(contents: bytes, fmt: str, output_format: str, orient: str = "records",
+                 nonfinite: str = "null", columns: list | None = None, on_invalid: str = "keep") -> bytes:
+    # Runs on the execution backend, including the encoding of the response body
+    with span("parse") as parse:
+        df = read_typed(io.BytesIO(contents), fmt, columns=input_columns(current_bundle()))
+        parse.rows = len(df)
+    return encode_predictions(score_frame(df, on_invalid), output_format, orient, nonfinite, columns)
+
+
+def score_dataset(dataset_id: str, output_format: str, orient: str = "records",
+                  nonfinite: str = "null", columns: list | None = None, on_invalid: str = "keep") -> bytes:
+    with span("dataset_load") as load:
+        df = dataset_store.get(dataset_id, columns=input_columns(current_bundle()))
+        load.rows = len(df)
+    return encode_predictions(score_frame(df, on_invalid), output_format, orient, nonfinite, columns)
+
+
+def encode_predictions(df: pd.DataFrame, output_format: str, orient: str = "records",
+                       nonfinite: str = "null", columns: list | None = None) -> bytes:
+    # orjson from column buffers for JSON (records or columns); NaN/inf made explicit
+    with span("serialize", rows=len(df)):
+        return encode_table(df, output_format, orient, nonfinite, columns)
+
+
+def open_stream(source, fmt: str, chunk_rows: int, columns: list | None = None, on_invalid: str = "keep",
+                bundle=None):
+    bundle = bundle or registry.get()
+    reader = timed_frames(iter_typed(source, fmt, chunk_rows, columns=input_columns(bundle)))
+    first_chunk = score_frame(next(reader), on_invalid, bundle)
+    select_columns(first_chunk, columns)
+    return reader, first_chunk
+
+
+def stream_predictions(source, reader, first_chunk: pd.DataFrame, stream_format: str,
+                       columns: list | None = None, nonfinite: str = "null", on_invalid: str = "keep",
+                       bundle=None, release=None):
+    # The first chunk is scored eagerly so validation errors still produce a
+    # proper status code; every later chunk is parsed, scored and sent before
+    # the next one is read, keeping memory bounded by chunk_rows.
+    try:
+        yield serialize_chunk(first_chunk, stream_format, True, columns, nonfinite)
+        for chunk in reader:
+            yield serialize_chunk(score_frame(chunk, on_invalid, bundle), stream_format, False, columns, nonfinite)
+    finally:
+        reader.close()
+        source.close()
+        if release is not None:
+            release()
 
 
 # ------------------- Predict from CSV -------------------
 @app.post("/predict_from_csv")
-async def predict_from_csv(file: UploadFile = File(...)):
+async def predict_from_csv(
+    request: Request,
+    file: UploadFile | None = File(None),
+    dataset_id: str | None = None,
+    stream: bool = False,
+    stream_format: Literal["ndjson", "csv"] = "ndjson",
+    output_format: OutputFormat | None = None,
+    orient: Literal["records", "columns"] = "records",
+    nonfinite: NonFinitePolicy = "null",
+    columns: str | None = None,
+    chunk_rows: Annotated[int, Query(gt=0)] = STREAM_CHUNK_ROWS,
+    on_invalid: InvalidRowPolicy = "keep",
+):
+    require_input(file, dataset_id)
+    output_format = "json" if stream else response_format(request, output_format)
+    columns = parse_columns(columns)
     try:
-        contents = await file.read()
-        df = pd.read_csv(io.StringIO(contents.decode("utf-8")))
+        # Every chunk, and every backend job, is scored by the model active now
+        bundle = registry.get()
+        if stream:
+            if dataset_id is not None:
+                # Stored datasets stream straight from their Parquet file
+                source, fmt = open(dataset_store.path(dataset_id), "rb"), "parquet"
+            else:
+                # Take ownership of the spooled upload: FastAPI closes the
+                # UploadFile when the handler returns, before the body is streamed.
+                fmt = detect_format(file.filename, file.content_type)
+                source, file.file = file.file, io.BytesIO()
+                source.seek(0)
+            # A stream scores chunks in the threadpool as they are sent, so it holds
+            # one backend slot until its last chunk; busy servers answer 503 here
+            try:
+                release = backend.hold()
+            except BackendBusy:
+                source.close()
+                raise
+            try:
+                reader, first_chunk = await run_in_threadpool(open_stream, source, fmt, chunk_rows, columns,
+                                                              on_invalid, bundle)
+            except BaseException:
+                release()
+                raise
+            # The background task also frees the slot of a stream the client never read
+            return StreamingResponse(
+                stream_predictions(source, reader, first_chunk, stream_format, columns, nonfinite, on_invalid,
+                                   bundle, release),
+                media_type=STREAM_MEDIA_TYPES[stream_format],
+                background=BackgroundTask(release),
+            )
 
-        validate_csv_columns(df)
+        if dataset_id is not None:
+            # Predictions are cached per dataset, model version and output options
+            options = (output_format, orient, nonfinite, columns, on_invalid)
+            key = (dataset_id, "predict", bundle.version, output_format, orient, nonfinite,
+                   tuple(columns or ()), on_invalid)
+            body = dataset_store.get_result(key)
+            if body is None:
+                body = await run_backend(score_dataset, dataset_id, *options, version=bundle.version)
+                dataset_store.put_result(key, body)
+        else:
+            fmt = detect_format(file.filename, file.content_type)
+            with span("upload_read"):
+                contents = await file.read()
+            body = await run_backend(score_upload, contents, fmt, output_format, orient, nonfinite, columns,
+                                     on_invalid, version=bundle.version)
 
-        # Encode categorical features
-        try:
-            df["Ad Group Encoded"] = le_adgroup.transform(df["Ad Group"])
-        except ValueError:
-            df["Ad Group Encoded"] = -1
+        return Response(status_code=200, content=body, media_type=MEDIA_TYPES[output_format])
 
-        try:
-            df["Month Encoded"] = le_month.transform(df["Month"])
-        except ValueError:
-            df["Month Encoded"] = -1
+    except (BackendBusy, asyncio.TimeoutError) as e:
+        raise overload_error(e)
+    except Exception as e:
+        raise processing_error(e)
+
+
+# ------------------- Paginated Predictions -------------------
+# Interactive clients page through a stored dataset's predictions; the scored
+# frame is computed once per dataset and model version, then every request
+# filters, sorts and slices it server-side so only one page is transferred.
+MAX_PAGE_ROWS = 1_000
+FACET_COLUMNS = ("Ad Group", "Month")
+
+
+def scored_dataset(dataset_id: str, version: str):
+    key = (dataset_id, "scored", version)
+    cached = dataset_store.get_result(key)
+    if cached is None:
+        with span("dataset_load") as load:
+            df = dataset_store.get(dataset_id, columns=input_columns(current_bundle()))
+            load.rows = len(df)
+        df = score_frame(df)
+        facets = {col: sorted(df[col].dropna().astype(str).unique().tolist()) for col in FACET_COLUMNS}
+        cached = (df, facets)
+        dataset_store.put_result(key, cached)
+    return cached
+
+
+def page_predictions(dataset_id: str, version: str, offset: int, limit: int, sort_by: str | None,
+                     descending: bool, filters: dict, columns: list | None) -> bytes:
+    df, facets = scored_dataset(dataset_id, version)
+    with span("page") as page:
+        for col, values in filters.items():
+            if values:
+                df = df[df[col].isin(values)]
+        total = len(df)
+        if sort_by is not None:
+            select_columns(df, [sort_by])
+            end = offset + limit
+            # Early pages of a large numeric sort only need a partial selection
+            if end * 10 < len(df) and df[sort_by].dtype.kind in "biuf":
+                pick = df.nlargest if descending else df.nsmallest
+                df = pick(end, sort_by)
+            else:
+                df = df.sort_values(sort_by, ascending=not descending, kind="stable")
+        rows = df.iloc[offset:offset + limit]
+        page.rows = len(rows)
+    with span("serialize", rows=len(rows)):
+        rows = handle_nonfinite(select_columns(rows, columns), "null")
+        return encode_json({
+            "dataset_id": dataset_id,
+            "model_version": version,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "sort_by": sort_by,
+            "descending": descending,
+            "columns": list(rows.columns),
+            "data": columns_data(rows),
+            "facets": facets,
+        })
+
+
+@app.get("/datasets/{dataset_id}/predictions")
+async def dataset_predictions(
+    dataset_id: str,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(gt=0, le=MAX_PAGE_ROWS)] = 100,
+    sort_by: str | None = None,
+    descending: bool = True,
+    ad_group: Annotated[list[str] | None, Query()] = None,
+    month: Annotated[list[str] | None, Query()] = None,
+    columns: str | None = None,
+):
+    require_input(None, dataset_id)
+    try:
+        version = registry.get().version
+        filters = {"Ad Group": ad_group, "Month": month}
+        body = await run_backend(page_predictions, dataset_id, version, offset, limit, sort_by,
+                                 descending, filters, parse_columns(columns), version=version)
+        return Response(status_code=200, content=body, media_type="application/json")
+
+    except (BackendBusy, asyncio.TimeoutError) as e:
+        raise overload_error(e)
+    except Exception as e:
+        raise processing_error(e, "dataset")
 
-        # Prepare features
-        features = df.drop(columns=["Ad Group", "Month"])
 
-        # Prediction
-        df["Predicted_Revenue"] = model.predict(features)
+# ------------------- KPI Cube -------------------
+# Additive measures pre-aggregated per Ad Group x Month (and any other text
+# column of the data). A stored dataset's cube is built once and cached; named
+# cubes grow by appends. Slices, roll-ups and top-k read only the cube's cells.
+KPI_CHUNK_ROWS = 200_000
 
-        # Add KPIs
-        df["ROI"] = (df["Predicted_Revenue"] - df["Cost"]) / df["Cost"]
-        df["Profit_Margin"] = (df["Predicted_Revenue"] - df["Cost"]) / df["Predicted_Revenue"]
-        df["CPM"] = df["Cost"] / (df["Impressions"] / 1000)
-        df["Revenue_per_Click"] = df["Predicted_Revenue"] / df["Clicks"]
-        df["Revenue_per_Conversion"] = df["Predicted_Revenue"] / df["Conversions"]
 
-        return JSONResponse(status_code=200, content=df.to_dict(orient="records"))
+def cube_frames(frames, on_invalid: str = "keep") -> KPICube:
+    cube = KPICube()
+    for chunk in timed_frames(frames):
+        if on_invalid != "keep":
+            with span("validate", rows=len(chunk)):
+                chunk, _ = validate(chunk, on_invalid)
+        with span("cube_update", rows=len(chunk)):
+            cube.update(chunk)
+    return cube
 
+
+def cube_upload(source, fmt: str, on_invalid: str = "keep") -> KPICube:
+    # Runs on the execution backend; only the cells travel back
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return cube_frames(iter_typed(source, fmt, KPI_CHUNK_ROWS), on_invalid)
+
+
+def cube_dataset(dataset_id: str, on_invalid: str = "keep") -> KPICube:
+    df = dataset_store.get(dataset_id)
+    return cube_frames((df.iloc[i:i + KPI_CHUNK_ROWS] for i in range(0, max(len(df), 1), KPI_CHUNK_ROWS)),
+                       on_invalid)
+
+
+async def dataset_cube(dataset_id: str, on_invalid: str = "keep") -> KPICube:
+    key = (dataset_id, "cube", on_invalid)
+    cube = dataset_store.get_result(key)
+    if cube is None:
+        cube = await run_backend(cube_dataset, dataset_id, on_invalid)
+        dataset_store.put_result(key, cube)
+    return cube
+
+
+def kpi_filters(ad_group: list[str] | None, month: list[str] | None, where: list[str] | None) -> dict:
+    # ad_group/month as on /datasets/{id}/predictions; where=Dimension=value for any dimension
+    filters = {}
+    for item in where or ():
+        dim, sep, value = item.partition("=")
+        if not sep or not dim.strip():
+            raise HTTPException(status_code=400, detail=f"'where' takes Dimension=value, got {item!r}")
+        filters.setdefault(dim.strip(), []).append(value)
+    for dim, values in (("Ad Group", ad_group), ("Month", month)):
+        if values:
+            filters.setdefault(dim, []).extend(values)
+    return filters
+
+
+def named_cube(name: str) -> KPICube:
+    try:
+        return kpi_cubes.get(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown KPI cube: {name}")
+    except InvalidCube as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/kpis")
+async def kpi_query(
+    request: Request,
+    dataset_id: str | None = None,
+    cube: str | None = None,
+    by: Annotated[list[str] | None, Query()] = None,
+    ad_group: Annotated[list[str] | None, Query()] = None,
+    month: Annotated[list[str] | None, Query()] = None,
+    where: Annotated[list[str] | None, Query(description="Dimension=value; repeat to keep several")] = None,
+    metrics: str | None = None,
+    sort_by: str | None = None,
+    top: Annotated[int | None, Query(gt=0)] = None,
+    descending: bool = True,
+    on_invalid: InvalidRowPolicy = "keep",
+    output_format: OutputFormat | None = None,
+    orient: Literal["records", "columns"] = "records",
+    nonfinite: NonFinitePolicy = "null",
+):
+    if (dataset_id is None) == (cube is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of 'dataset_id' or 'cube'")
+    if dataset_id is not None:
+        require_input(None, dataset_id)
+    output_format = response_format(request, output_format)
+    filters = kpi_filters(ad_group, month, where)
+    try:
+        kpi_cube = await dataset_cube(dataset_id, on_invalid) if dataset_id is not None else named_cube(cube)
+        started = time.perf_counter()
+        with span("kpi_query", rows=len(kpi_cube)):
+            result = kpi_cube.query(by, filters, parse_columns(metrics), sort_by, top, descending)
+        elapsed = time.perf_counter() - started
+        body = encode_predictions(pd.DataFrame(result), output_format, orient, nonfinite)
+        return Response(status_code=200, content=body, media_type=MEDIA_TYPES[output_format],
+                        headers={"X-MTA-Query-Microseconds": f"{elapsed * 1e6:.0f}"})
+
+    except (BackendBusy, asyncio.TimeoutError) as e:
+        raise overload_error(e)
+    except Exception as e:
+        raise processing_error(e, "KPI query")
+
+
+@app.post("/kpis/{name}")
+async def kpi_append(
+    name: str,
+    file: UploadFile | None = File(None),
+    dataset_id: str | None = None,
+    on_invalid: InvalidRowPolicy = "keep",
+):
+    # Creates the cube on first append; later appends must carry the same dimensions
+    require_input(file, dataset_id)
+    try:
+        kpi_cubes.path(name)
+        if dataset_id is not None:
+            part = await dataset_cube(dataset_id, on_invalid)
+        else:
+            fmt = detect_format(file.filename, file.content_type)
+            part = await run_backend(cube_upload, await upload_source(file), fmt, on_invalid)
+        cube = await run_in_threadpool(kpi_cubes.append, name, part)
+        return {"cube": name, "appended_rows": part.rows, **cube.info()}
+
+    except (BackendBusy, asyncio.TimeoutError) as e:
+        raise overload_error(e)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+        raise processing_error(e)
+
+
+@app.get("/kpis/{name}")
+def kpi_cube_info(name: str):
+    return {"cube": name, **named_cube(name).info()}
+
+
+@app.delete("/kpis/{name}")
+def kpi_cube_delete(name: str):
+    named_cube(name)
+    kpi_cubes.delete(name)
+    return {"deleted": name}
+
+
+# ------------------- Attribution -------------------
+# Journeys (Ad Group touchpoint paths ending in conversion or null) are folded
+# into per-(Month, Path) totals while they stream in, then credited per Ad
+# Group by rule-based, Markov removal-effect and Shapley models.
+ATTRIBUTION_CHUNK_ROWS = 500_000
+MAX_JOURNEYS = 10_000
+
+
+class Journey(BaseModel):
+    path: Annotated[list[str], Field(..., min_length=1, description="Ad Group touchpoints in order")]
+    converted: bool
+    revenue: Annotated[float, Field(0.0, ge=0)]
+    month: str | None = None
+
+
+def attribution_options(models, by_month, half_life, shapley_samples, shapley_exact_max, seed) -> dict:
+    return {"models": parse_models(models), "by_month": by_month, "half_life": half_life,
+            "samples": shapley_samples, "exact_max": shapley_exact_max, "seed": seed}
+
+
+def attribute_frames(frames, options: dict) -> pd.DataFrame:
+    acc = PathAccumulator()
+    for chunk in frames:
+        with span("attribution_accumulate", rows=len(chunk)):
+            acc.update(chunk)
+    with span("attribution", rows=acc.journeys):
+        return attribute(acc.paths(), **options)
+
+
+def attribute_upload(source, fmt: str, options: dict, output_format: str, orient: str = "records",
+                     nonfinite: str = "null", columns: list | None = None) -> bytes:
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    credit = attribute_frames(timed_frames(iter_frames(source, fmt, ATTRIBUTION_CHUNK_ROWS)), options)
+    return encode_predictions(credit, output_format, orient, nonfinite, columns)
+
+
+def attribute_dataset(dataset_id: str, options: dict, output_format: str, orient: str = "records",
+                      nonfinite: str = "null", columns: list | None = None) -> bytes:
+    df = dataset_store.get(dataset_id)
+    frames = (df.iloc[i:i + ATTRIBUTION_CHUNK_ROWS] for i in range(0, max(len(df), 1), ATTRIBUTION_CHUNK_ROWS))
+    credit = attribute_frames(frames, options)
+    return encode_predictions(credit, output_format, orient, nonfinite, columns)
+
+
+def attribute_journeys(journeys: list[dict], options: dict, output_format: str, orient: str = "records",
+                       nonfinite: str = "null", columns: list | None = None) -> bytes:
+    df = pd.DataFrame({
+        "Path": [j["path"] for j in journeys],
+        "Conversions": [int(j["converted"]) for j in journeys],
+        "Revenue": [j["revenue"] for j in journeys],
+    })
+    if any(j["month"] is not None for j in journeys):
+        df["Month"] = [j["month"] for j in journeys]
+    with span("attribution", rows=len(df)):
+        credit = attribute(df, **options)
+    return encode_predictions(credit, output_format, orient, nonfinite, columns)
+
+
+@app.post("/attribution")
+async def run_attribution(
+    request: Request,
+    file: UploadFile | None = File(None),
+    dataset_id: str | None = None,
+    models: str | None = None,
+    by_month: bool = True,
+    half_life: Annotated[float, Query(gt=0)] = TIME_DECAY_HALF_LIFE,
+    shapley_samples: Annotated[int, Query(gt=0)] = SHAPLEY_SAMPLES,
+    shapley_exact_max: Annotated[int, Query(ge=0, le=20)] = SHAPLEY_EXACT_MAX,
+    seed: int = 0,
+    output_format: OutputFormat | None = None,
+    orient: Literal["records", "columns"] = "records",
+    nonfinite: NonFinitePolicy = "null",
+    columns: str | None = None,
+):
+    require_input(file, dataset_id)
+    output_format = response_format(request, output_format)
+    try:
+        options = attribution_options(models, by_month, half_life, shapley_samples, shapley_exact_max, seed)
+        encoding = (output_format, orient, nonfinite, parse_columns(columns))
+        if dataset_id is not None:
+            key = (dataset_id, "attribution", *options.values(), *encoding[:3], tuple(encoding[3] or ()))
+            body = dataset_store.get_result(key)
+            if body is None:
+                body = await run_backend(attribute_dataset, dataset_id, options, *encoding)
+                dataset_store.put_result(key, body)
+        else:
+            fmt = detect_format(file.filename, file.content_type)
+            body = await run_backend(attribute_upload, await upload_source(file), fmt, options, *encoding)
+        return Response(status_code=200, content=body, media_type=MEDIA_TYPES[output_format])
+
+    except (BackendBusy, asyncio.TimeoutError) as e:
+        raise overload_error(e)
+    except Exception as e:
+        raise processing_error(e, "journeys")
+
+
+@app.post("/attribution/journeys")
+async def attribution_from_journeys(
+    request: Request,
+    journeys: Annotated[list[Journey], Body(..., min_length=1, max_length=MAX_JOURNEYS)],
+    models: str | None = None,
+    by_month: bool = True,
+    half_life: Annotated[float, Query(gt=0)] = TIME_DECAY_HALF_LIFE,
+    shapley_samples: Annotated[int, Query(gt=0)] = SHAPLEY_SAMPLES,
+    shapley_exact_max: Annotated[int, Query(ge=0, le=20)] = SHAPLEY_EXACT_MAX,
+    seed: int = 0,
+    output_format: OutputFormat | None = None,
+    orient: Literal["records", "columns"] = "records",
+    nonfinite: NonFinitePolicy = "null",
+    columns: str | None = None,
+):
+    output_format = response_format(request, output_format)
+    try:
+        options = attribution_options(models, by_month, half_life, shapley_samples, shapley_exact_max, seed)
+        body = await run_backend(attribute_journeys, [j.model_dump() for j in journeys], options,
+                                 output_format, orient, nonfinite, parse_columns(columns))
+        return Response(status_code=200, content=body, media_type=MEDIA_TYPES[output_format])
+
+    except (BackendBusy, asyncio.TimeoutError) as e:
+        raise overload_error(e)
+    except Exception as e:
+        raise processing_error(e, "journeys")
+
+
+# ------------------- What-If Scenarios -------------------
+# Base campaign rows (inline or a stored dataset) are perturbed per Ad Group;
+# every (row, level) pair is scored in one batched predict and scenarios are
+# summed from the resulting per-group revenue curves.
+MAX_SCENARIO_ROWS = 10_000
+Multipliers = list[Annotated[float, Field(ge=0)]]
+
+
+class ScenarioLevers(BaseModel):
+    cost: Annotated[Multipliers | None, Field(None, min_length=1)]
+    clicks: Annotated[Multipliers | None, Field(None, min_length=1, description="Default: follow cost")]
+    impressions: Annotated[Multipliers | None, Field(None, min_length=1, description="Default: follow cost")]
+
+
+class ScenarioRequest(BaseModel):
+    rows: Annotated[list[CampaignInput] | None, Field(None, max_length=MAX_SCENARIO_ROWS)]
+    grid: Annotated[dict[str, ScenarioLevers], Field(..., description="Ad Group -> lever multipliers")]
+
+
+class AllocationRequest(BaseModel):
+    rows: Annotated[list[CampaignInput] | None, Field(None, max_length=MAX_SCENARIO_ROWS)]
+    budget: Annotated[float | None, Field(None, ge=0, description="Default: current total Cost")]
+    min_multiplier: Annotated[float, Field(ALLOCATION_MIN_MULTIPLIER, ge=0)]
+    max_multiplier: Annotated[float, Field(ALLOCATION_MAX_MULTIPLIER, ge=0)]
+    steps: Annotated[int, Field(ALLOCATION_STEPS, ge=2, le=1000)]
+    groups: list[str] | None = None
+
+
+def scenario_base(records: list[dict] | None, dataset_id: str | None) -> pd.DataFrame:
+    if dataset_id is not None:
+        with span("dataset_load") as load:
+            df = dataset_store.get(dataset_id, columns=REQUIRED_COLUMNS)
+            load.rows = len(df)
+    else:
+        df = pd.DataFrame(columns_from_records(records))
+    validate_csv_columns(df)
+    if df.empty:
+        raise InvalidInput("No base rows to perturb")
+    return df
+
+
+def run_scenarios(records: list[dict] | None, dataset_id: str | None, grid: dict, top: int | None,
+                  output_format: str, orient: str = "records", nonfinite: str = "null",
+                  columns: list | None = None):
+    df = scenario_base(records, dataset_id)
+    with span("scenarios", rows=len(df)):
+        result, base_revenue, base_cost = score_scenarios(current_bundle(), df, grid, top)
+    return encode_predictions(result, output_format, orient, nonfinite, columns), base_revenue, base_cost
+
+
+def run_allocation(records: list[dict] | None, dataset_id: str | None, options: dict) -> bytes:
+    df = scenario_base(records, dataset_id)
+    with span("allocate", rows=len(df)):
+        allocation = allocate_budget(current_bundle(), df, **options)
+    with span("serialize"):
+        groups = handle_nonfinite(allocation.pop("groups"), "null")
+        return encode_json({**allocation, "groups": columns_data(groups)})
+
+
+def scenario_input(body, dataset_id: str | None):
+    if (body.rows is None) == (dataset_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of 'rows' or 'dataset_id'")
+    if dataset_id is not None:
+        require_input(None, dataset_id)
+        return None
+    return [row.model_dump() for row in body.rows]
+
+
+@app.post("/whatif/scenarios")
+async def whatif_scenarios(
+    request: Request,
+    body: ScenarioRequest,
+    dataset_id: str | None = None,
+    top: Annotated[int | None, Query(gt=0)] = None,
+    output_format: OutputFormat | None = None,
+    orient: Literal["records", "columns"] = "records",
+    nonfinite: NonFinitePolicy = "null",
+    columns: str | None = None,
+):
+    records = scenario_input(body, dataset_id)
+    output_format = response_format(request, output_format)
+    try:
+        grid = {group: levers.model_dump() for group, levers in body.grid.items()}
+        content, base_revenue, base_cost = await run_backend(
+            run_scenarios, records, dataset_id, grid, top, output_format, orient, nonfinite, parse_columns(columns))
+        headers = {"X-MTA-Base-Revenue": f"{base_revenue:.2f}", "X-MTA-Base-Cost": f"{base_cost:.2f}"}
+        return Response(status_code=200, content=content, media_type=MEDIA_TYPES[output_format], headers=headers)
+
+    except (BackendBusy, asyncio.TimeoutError) as e:
+        raise overload_error(e)
+    except Exception as e:
+        raise processing_error(e, "scenarios")
+
+
+@app.post("/whatif/allocate")
+async def whatif_allocate(body: AllocationRequest, dataset_id: str | None = None):
+    records = scenario_input(body, dataset_id)
+    try:
+        options = body.model_dump(exclude={"rows"})
+        content = await run_backend(run_allocation, records, dataset_id, options)
+        return Response(status_code=200, content=content, media_type="application/json")
+
+    except (BackendBusy, asyncio.TimeoutError) as e:
+        raise overload_error(e)
+    except Exception as e:
+        raise processing_error(e, "allocation")
+
+
+# ------------------- Manual Input Helpers -------------------
+def campaign_features(records: list[CampaignInput], bundle) -> np.ndarray:
+    # Same compiled kernel as CSV scoring and training, one row per record
+    with span("features", rows=len(records)):
+        columns = columns_from_records([data.model_dump() for data in records])
+        return feature_kernel(bundle.features)(columns, bundle.encoders)
+
+
+def campaign_result(features: np.ndarray, bundle, prediction) -> dict:
+    # Computed KPIs are the input-side KPI features the model was given
+    index = {name: j for j, name in enumerate(bundle.features)}
+    return {
+        "Predicted_Revenue": round(float(prediction), 2),
+        "Computed_KPIs": {name: round(float(features[index[name]]), 2) for name in KPI_SPEC if name in index}
+    }
+
+
+# Opt-in dynamic batching of concurrent /predict_from_manual calls
+# Rows are grouped by the bundle their features were built with, so a reload
+# between submit and batch never scores old features with a new model
+batcher = MicroBatcher(predict_rows) if batching_enabled() else None
 
 
 # ------------------- Predict from Manual Input -------------------
 @app.post("/predict_from_manual")
-def predict_from_manual(data: CampaignInput):
+async def predict_from_manual(data: CampaignInput):
     try:
-        # Encode categorical vars
-        ad_group_encoded = le_adgroup.transform([data.Ad_Group])[0] if data.Ad_Group in le_adgroup.classes_ else -1
-        month_encoded = le_month.transform([data.Month])[0] if data.Month in le_month.classes_ else -1
-
-        # Prepare feature vector in correct order
-        features = np.array([[
-            data.Impressions, data.Clicks, data.CTR, data.Conversions, data.Conv_Rate,
-            data.Cost, data.CPC, data.Sale_Amount, data.PnL,
-            data.ROI, data.Profit_Margin, data.CPM,
-            data.Revenue_per_Click, data.Revenue_per_Conversion,
-            ad_group_encoded, month_encoded
-        ]])
+        bundle = registry.get()
+        features = campaign_features([data], bundle)
 
         # Predict revenue
-        prediction = model.predict(features)[0]
-
-        return {
-            "Predicted_Revenue": round(float(prediction), 2),
-            "Computed_KPIs": {
-                "ROI": data.ROI,
-                "Profit_Margin": data.Profit_Margin,
-                "CPM": data.CPM,
-                "Revenue_per_Click": data.Revenue_per_Click,
-                "Revenue_per_Conversion": data.Revenue_per_Conversion
-            }
-        }
+        if batcher is not None:
+            prediction = await batcher.submit(features, bundle)
+        else:
+            prediction = (await run_in_threadpool(predict_rows, bundle, features))[0]
+
+        return campaign_result(features[0], bundle, prediction)
+
+    except Exception as e:
+        raise processing_error(e, "data")
+
+
+# ------------------- Batch Prediction -------------------
+@app.post("/predict_batch")
+def predict_batch(records: Annotated[list[CampaignInput], Body(..., max_length=MAX_BATCH_RECORDS)]):
+    if not records:
+        return []
+    try:
+        bundle = registry.get()
+        features = campaign_features(records, bundle)
+        predictions = predict_rows(bundle, features)
+        return [campaign_result(row, bundle, pred) for row, pred in zip(features, predictions)]
+
+    except Exception as e:
+        raise processing_error(e, "data")
+
+
+@app.get("/batching/stats")
+def batching_stats():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
 
+@app.get("/cache/stats")
+def cache_stats():
+    return prediction_cache.stats()
+
+
+@app.get("/executor/stats")
+def executor_stats():
+    return backend.stats()
+
+# ------------------- Model Admin -------------------
+@app.get("/admin/model")
+def model_info():
+    return {"registry": registry.stats(), "active": registry.get().info()}
+
+
+@app.post("/admin/model/reload")
+def reload_model(version: str | None = None):
+    try:
+        bundle = registry.reload(version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing data: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error loading model: {str(e)}")
+    return {"version": bundle.version, "load_seconds": round(bundle.load_seconds, 4)}
@@ -0,0 +1,477 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+from dataio import detect_format, iter_frames
+from encoding import CategoryEncoder
+
+# ------------------- Journey Schema -------------------
+# One row per journey (or per distinct path with counts): the Ad Group
+# touchpoints in order, how many of those journeys converted and how many
+# ended in null. Without a Nulls column a row is one journey, converted when
+# Conversions > 0.
+PATH_COLUMN = 'Path'
+MONTH_COLUMN = 'Month'
+CONVERSIONS_COLUMN = 'Conversions'
+NULLS_COLUMN = 'Nulls'
+VALUE_COLUMN = 'Revenue'
+PATH_SEPARATOR = r'\s*>\s*'
+PATH_JOINER = ' > '
+ALL_MONTHS = 'All'
+
+MODELS = ('first_touch', 'last_touch', 'linear', 'time_decay', 'markov', 'shapley')
+RESULT_COLUMNS = ['Month', 'Ad Group', 'Model', 'Conversions', 'Revenue', 'Share']
+
+# Shapley values are exact up to this many channels, sampled beyond it
+SHAPLEY_EXACT_MAX = 12
+SHAPLEY_SAMPLES = 1000
+TIME_DECAY_HALF_LIFE = 2.0
+
+
+class InvalidPaths(ValueError):
+    pass
+
+
+def parse_models(models):
+    # "markov,shapley" or ["markov"] -> tuple, every model when not given
+    if models is None:
+        return MODELS
+    if isinstance(models, str):
+        models = models.split(",")
+    models = tuple(m.strip() for m in models if m.strip())
+    unknown = [m for m in models if m not in MODELS]
+    if unknown:
+        raise InvalidPaths(f"Unknown attribution models: {unknown}; available: {list(MODELS)}")
+    return models or MODELS
+
+
+def path_keys(paths):
+    # Parquet and Arrow list columns arrive as arrays, which cannot be grouped
+    # on; join them the way CSV paths are written so both group the same
+    sequence = paths.map(lambda p: isinstance(p, (list, tuple, np.ndarray))).to_numpy(dtype=bool)
+    if not sequence.any():
+        return paths.to_numpy()
+    keys = paths.to_numpy(dtype=object, copy=True)
+    keys[sequence] = [PATH_JOINER.join(str(t).strip() for t in p if t is not None and str(t).strip())
+                      for p in keys[sequence]]
+    return keys
+
+
+def journey_frame(df):
+    """Normalize raw journey rows to Month, Path, Conversions, Nulls, Revenue."""
+    if PATH_COLUMN not in df.columns:
+        raise InvalidPaths(f"Missing column in journeys: {PATH_COLUMN!r}")
+    if CONVERSIONS_COLUMN not in df.columns:
+        raise InvalidPaths(f"Missing column in journeys: {CONVERSIONS_COLUMN!r}")
+
+    conversions = pd.to_numeric(df[CONVERSIONS_COLUMN], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    if NULLS_COLUMN in df.columns:
+        nulls = pd.to_numeric(df[NULLS_COLUMN], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    else:
+        nulls = (conversions <= 0).astype(np.float64)
+    if (conversions < 0).any() or (nulls < 0).any():
+        raise InvalidPaths("Conversions and Nulls must be non-negative")
+    value = (pd.to_numeric(df[VALUE_COLUMN], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+             if VALUE_COLUMN in df.columns else np.zeros(len(df)))
+    month = df[MONTH_COLUMN].astype(str).to_numpy() if MONTH_COLUMN in df.columns else ALL_MONTHS
+
+    return pd.DataFrame({
+        MONTH_COLUMN: month,
+        PATH_COLUMN: path_keys(df[PATH_COLUMN]),
+        CONVERSIONS_COLUMN: conversions,
+        NULLS_COLUMN: nulls,
+        VALUE_COLUMN: value,
+    }, index=df.index)
+
+
+# ------------------- Path Accumulator -------------------
+class PathAccumulator:
+    """Streams journey chunks into per-(Month, Path) totals.
+
+    Every attribution model depends on the data only through how often each
+    distinct path converted, ended in null and what it earned, so chunks are
+    grouped on arrival and partial totals are re-grouped once they pass
+    `compact_rows`. Memory is bounded by the number of distinct paths per
+    month, not by the number of journeys, and accumulators over file shards
+    merge exactly.
+    """
+
+    def __init__(self, compact_rows=1_000_000):
+        self.compact_rows = compact_rows
+        self.journeys = 0
+        self._parts = []
+        self._rows = 0
+
+    def _group(self, df):
+        return (df.groupby([MONTH_COLUMN, PATH_COLUMN], sort=False, observed=True)
+                [[CONVERSIONS_COLUMN, NULLS_COLUMN, VALUE_COLUMN]].sum())
+
+    def _compact(self):
+        if len(self._parts) > 1:
+            self._parts = [self._group(pd.concat(self._parts).reset_index())]
+        self._rows = sum(len(part) for part in self._parts)
+
+    def update(self, df):
+        df = journey_frame(df)
+        df = df[df[PATH_COLUMN].notna()]
+        self.journeys += int(df[CONVERSIONS_COLUMN].sum() + df[NULLS_COLUMN].sum())
+        part = self._group(df)
+        self._parts.append(part)
+        self._rows += len(part)
+        if self._rows > self.compact_rows:
+            self._compact()
+        return self
+
+    def merge(self, other):
+        self.journeys += other.journeys
+        self._parts.extend(other._parts)
+        self._rows += other._rows
+        if self._rows > self.compact_rows:
+            self._compact()
+        return self
+
+    def paths(self):
+        self._compact()
+        if not self._parts:
+            return pd.DataFrame(columns=[MONTH_COLUMN, PATH_COLUMN, CONVERSIONS_COLUMN, NULLS_COLUMN, VALUE_COLUMN])
+        return self._parts[0].reset_index()
+
+
+# ------------------- Path Table -------------------
+class PathTable:
+    """Distinct paths as flat touchpoint codes in CSR layout.
+
+    Touchpoints of path p are codes[indptr[p]:indptr[p + 1]], encoded against
+    `channels`; conversions, nulls, value and month are per-path arrays. Every
+    model below is a handful of bincount/reduceat passes over these arrays.
+    """
+
+    def __init__(self, channels, codes, indptr, conversions, nulls, value, month, months):
+        self.channels = channels
+        self.codes = codes
+        self.indptr = indptr
+        self.conversions = conversions
+        self.nulls = nulls
+        self.value = value
+        self.month = month
+        self.months = months
+
+    @classmethod
+    def from_frame(cls, df):
+        df = journey_frame(df).reset_index(drop=True)
+        paths = df[PATH_COLUMN]
+        # Paths arrive as "A > B > C" strings or as lists of touchpoints
+        first = paths.dropna().iloc[0] if paths.notna().any() else ''
+        if isinstance(first, str):
+            paths = paths.astype('string').str.split(PATH_SEPARATOR, regex=True)
+        touches = paths.explode()
+        tokens = touches.astype('string').str.strip()
+        keep = (tokens.notna() & (tokens != '')).to_numpy()
+        tokens = tokens[keep].astype(object)
+        owner = touches.index.to_numpy()[keep]
+
+        lengths = np.bincount(owner, minlength=len(df))
+        nonempty = lengths > 0
+        encoder = CategoryEncoder().fit(tokens)
+        month_codes, months = pd.factorize(df[MONTH_COLUMN])
+        return cls(
+            channels=encoder.classes_,
+            codes=encoder.transform(tokens),
+            indptr=np.concatenate([[0], np.cumsum(lengths[nonempty])]).astype(np.int64),
+            conversions=df[CONVERSIONS_COLUMN].to_numpy()[nonempty],
+            nulls=df[NULLS_COLUMN].to_numpy()[nonempty],
+            value=df[VALUE_COLUMN].to_numpy()[nonempty],
+            month=month_codes[nonempty],
+            months=np.asarray(months, dtype=object),
+        )
+
+    def __len__(self):
+        return len(self.conversions)
+
+    @property
+    def lengths(self):
+        return np.diff(self.indptr)
+
+    def owners(self):
+        # Path index of every touchpoint
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def select(self, mask):
+        lengths = self.lengths[mask]
+        return PathTable(
+            channels=self.channels,
+            codes=self.codes[np.repeat(mask, self.lengths)],
+            indptr=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            conversions=self.conversions[mask],
+            nulls=self.nulls[mask],
+            value=self.value[mask],
+            month=self.month[mask],
+            months=self.months,
+        )
+
+
+# ------------------- Rule-Based Models -------------------
+def touch_weights(table, model, half_life=TIME_DECAY_HALF_LIFE):
+    # Per-touchpoint credit; each path's weights sum to one
+    owner = table.owners()
+    lengths = table.lengths[owner]
+    position = np.arange(len(table.codes)) - table.indptr[owner]
+    if model == 'first_touch':
+        return (position == 0).astype(np.float64)
+    if model == 'last_touch':
+        return (position == lengths - 1).astype(np.float64)
+    if model == 'linear':
+        return 1.0 / lengths
+    if model == 'time_decay':
+        # Credit halves every half_life touchpoints back from the conversion
+        weights = np.exp2(-(lengths - 1 - position) / half_life)
+        return weights / np.bincount(owner, weights, minlength=len(table))[owner]
+    raise InvalidPaths(f"Unknown rule-based model: {model}")
+
+
+def rule_based_credit(table, model, half_life=TIME_DECAY_HALF_LIFE):
+    n = len(table.channels)
+    owner = table.owners()
+    weights = touch_weights(table, model, half_life)
+    conversions = np.bincount(table.codes, weights * table.conversions[owner], minlength=n)
+    value = np.bincount(table.codes, weights * table.value[owner], minlength=n)
+    return conversions, value
+
+
+# ------------------- Markov Chain -------------------
+def transition_matrix(table):
+    """Row-stochastic sparse transitions over start, channels, conversion, null.
+
+    State 0 is the start, channel c is state c + 1, then conversion and null
+    are the two absorbing states.
+    """
+    n = len(table.channels)
+    size = n + 3
+    conversion, null = n + 1, n + 2
+    journeys = table.conversions + table.nulls
+    starts, ends = table.indptr[:-1], table.indptr[1:] - 1
+
+    # Consecutive touchpoints within a path: every touch except each path's last
+    inner = np.ones(len(table.codes), dtype=bool)
+    inner[ends] = False
+    inner_idx = np.flatnonzero(inner)
+    inner_weight = journeys[table.owners()[inner_idx]]
+
+    src = np.concatenate([np.zeros(len(table), dtype=np.int64), table.codes[inner_idx] + 1,
+                          table.codes[ends] + 1, table.codes[ends] + 1])
+    dst = np.concatenate([table.codes[starts] + 1, table.codes[inner_idx + 1] + 1,
+                          np.full(len(table), conversion), np.full(len(table), null)])
+    weight = np.concatenate([journeys, inner_weight, table.conversions, table.nulls])
+
+    # Duplicate (src, dst) pairs are summed on conversion to CSR
+    counts = sparse.csr_array((weight, (src, dst)), shape=(size, size))
+    totals = np.asarray(counts.sum(axis=1)).ravel()
+    with np.errstate(divide='ignore'):
+        scale = np.where(totals > 0, 1.0 / totals, 0.0)
+    return sparse.csr_array(sparse.diags_array(scale) @ counts)
+
+
+def conversion_probability(Q, r):
+    # Absorption probability into conversion from the start state: (I - Q) x = r
+    if not r.any():
+        return 0.0
+    system = sparse.identity(Q.shape[0], format='csc') - sparse.csc_array(Q)
+    return float(np.atleast_1d(spsolve(system, r))[0])
+
+
+def removal_effects(table):
+    """Markov removal effect of each channel, solved as sparse linear systems.
+
+    Removing a channel deletes its transient state: journeys that would have
+    reached it never convert. The effect is the relative drop in the start
+    state's conversion probability.
+    """
+    n = len(table.channels)
+    P = transition_matrix(table)
+    transient = np.arange(n + 1)
+    Q = P[transient][:, transient]
+    r = P[transient][:, [n + 1]].toarray().ravel()
+    base = conversion_probability(Q, r)
+    effects = np.zeros(n)
+    if base <= 0:
+        return effects, base
+    for c in range(n):
+        keep = transient[transient != c + 1]
+        effects[c] = 1.0 - conversion_probability(Q[keep][:, keep], r[keep]) / base
+    return np.clip(effects, 0.0, None), base
+
+
+def markov_credit(table):
+    effects, _ = removal_effects(table)
+    return _share_credit(table, effects)
+
+
+# ------------------- Shapley Values -------------------
+def channel_sets(table):
+    """Distinct channel sets with their converted and total journeys.
+
+    Returns (members, setptr, conversions, journeys): set s holds channels
+    members[setptr[s]:setptr[s + 1]]. Repeat touches collapse, and paths
+    with the same set are merged by an order-independent 64-bit set hash.
+    """
+    owner = table.owners()
+    order = np.lexsort((table.codes, owner))
+    owner, codes = owner[order], table.codes[order]
+    first = np.ones(len(codes), dtype=bool)
+    first[1:] = (owner[1:] != owner[:-1]) | (codes[1:] != codes[:-1])
+    owner, codes = owner[first], codes[first]
+
+    keys = np.random.default_rng(0).integers(0, np.iinfo(np.uint64).max, len(table.channels), dtype=np.uint64)
+    set_hash = np.zeros(len(table), dtype=np.uint64)
+    np.add.at(set_hash, owner, keys[codes])
+    _, representative, inverse = np.unique(set_hash, return_index=True, return_inverse=True)
+    conversions = np.bincount(inverse, table.conversions, minlength=len(representative))
+    journeys = np.bincount(inverse, table.conversions + table.nulls, minlength=len(representative))
+
+    lengths = np.bincount(owner, minlength=len(table))
+    set_lengths = lengths[representative]
+    setptr = np.concatenate([[0], np.cumsum(set_lengths)]).astype(np.int64)
+    # Gather each representative path's members into one flat array
+    offsets = (np.cumsum(lengths) - lengths)[representative] - setptr[:-1]
+    members = codes[np.repeat(offsets, set_lengths) + np.arange(setptr[-1])]
+    return members, setptr, conversions, journeys
+
+
+def shapley_exact(n, members, setptr, conversions, journeys):
+    """Exact Shapley values over all 2^n coalitions.
+
+    A coalition's value is the conversion rate of journeys confined to it,
+    accumulated over subsets with a zeta transform on bitmask-indexed arrays.
+    """
+    size = 1 << n
+    masks = np.bitwise_or.reduceat(np.left_shift(1, members.astype(np.int64)), setptr[:-1]) \
+        if len(members) else np.zeros(0, dtype=np.int64)
+    converted = np.bincount(masks, conversions, minlength=size)
+    total = np.bincount(masks, journeys, minlength=size)
+    for c in range(n):
+        for arr in (converted, total):
+            view = arr.reshape(-1, 2, 1 << c)
+            view[:, 1, :] += view[:, 0, :]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        value = np.where(total > 0, converted / total, 0.0)
+
+    coalitions = np.arange(size)
+    popcount = np.zeros(size, dtype=np.int64)
+    for c in range(n):
+        popcount += (coalitions >> c) & 1
+    # |S|! (n - |S| - 1)! / n! for every coalition size
+    weight = np.array([math.factorial(s) * math.factorial(n - s - 1) / math.factorial(n) for s in range(n)])
+
+    phi = np.zeros(n)
+    for c in range(n):
+        without = coalitions[(coalitions >> c) & 1 == 0]
+        phi[c] = np.dot(weight[popcount[without]], value[without | (1 << c)] - value[without])
+    return phi
+
+
+def shapley_sampled(n, members, setptr, conversions, journeys, samples=SHAPLEY_SAMPLES, seed=0):
+    """Monte Carlo Shapley values from random channel orderings.
+
+    For an ordering, a set joins the coalition when its latest member does,
+    so one reduceat gives every prefix's value at once. Each ordering is
+    paired with its reverse (antithetic sampling) to cut variance.
+    """
+    rng = np.random.default_rng(seed)
+    starts = setptr[:-1]
+    phi = np.zeros(n)
+    rank = np.empty(n, dtype=np.int64)
+    draws = 0
+    for _ in range(max(1, samples // 2)):
+        order = rng.permutation(n)
+        for perm in (order, order[::-1]):
+            rank[perm] = np.arange(n)
+            joins = np.maximum.reduceat(rank[members], starts) if len(members) else np.zeros(0, dtype=np.int64)
+            converted = np.cumsum(np.bincount(joins, conversions, minlength=n))
+            total = np.cumsum(np.bincount(joins, journeys, minlength=n))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                value = np.where(total > 0, converted / total, 0.0)
+            phi[perm] += np.diff(value, prepend=0.0)
+            draws += 1
+    return phi / draws
+
+
+def shapley_values(table, exact_max=SHAPLEY_EXACT_MAX, samples=SHAPLEY_SAMPLES, seed=0):
+    n = len(table.channels)
+    if n == 0:
+        return np.zeros(0)
+    members, setptr, conversions, journeys = channel_sets(table)
+    if n <= exact_max:
+        return shapley_exact(n, members, setptr, conversions, journeys)
+    return shapley_sampled(n, members, setptr, conversions, journeys, samples, seed)
+
+
+def shapley_credit(table, exact_max=SHAPLEY_EXACT_MAX, samples=SHAPLEY_SAMPLES, seed=0):
+    return _share_credit(table, shapley_values(table, exact_max, samples, seed))
+
+
+def _share_credit(table, scores):
+    # Scores become shares of total conversions and value; a channel that
+    # lowers the conversion rate keeps its negative Shapley share
+    total = scores.sum()
+    share = scores / total if total > 0 else np.zeros_like(scores)
+    return share * table.conversions.sum(), share * table.value.sum()
+
+
+# ------------------- Attribution -------------------
+def attribute_table(table, models=MODELS, half_life=TIME_DECAY_HALF_LIFE, exact_max=SHAPLEY_EXACT_MAX,
+                    samples=SHAPLEY_SAMPLES, seed=0, month=ALL_MONTHS):
+    # One long-format frame: a row per (Ad Group, model) for this set of paths
+    frames = []
+    total = table.conversions.sum()
+    for model in models:
+        if model == 'markov':
+            conversions, value = markov_credit(table)
+        elif model == 'shapley':
+            conversions, value = shapley_credit(table, exact_max, samples, seed)
+        else:
+            conversions, value = rule_based_credit(table, model, half_life)
+        frames.append(pd.DataFrame({
+            'Month': month,
+            'Ad Group': table.channels,
+            'Model': model,
+            'Conversions': conversions,
+            'Revenue': value,
+            'Share': conversions / total if total > 0 else np.zeros(len(conversions)),
+        }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RESULT_COLUMNS)
+
+
+def attribute(paths, models=MODELS, by_month=True, **kwargs):
+    """Credit per Ad Group under each model, overall and (optionally) per Month."""
+    models = parse_models(models)
+    table = paths if isinstance(paths, PathTable) else PathTable.from_frame(paths)
+    frames = [attribute_table(table, models, **kwargs)]
+    if by_month and not (len(table.months) == 1 and table.months[0] == ALL_MONTHS):
+        for code, month in enumerate(table.months):
+            frames.append(attribute_table(table.select(table.month == code), models, month=month, **kwargs))
+    return pd.concat(frames, ignore_index=True)[RESULT_COLUMNS]
+
+
+# ------------------- Drivers -------------------
+def accumulate_frames(frames, **kwargs):
+    acc = PathAccumulator(**kwargs)
+    for frame in frames:
+        acc.update(frame)
+    return acc
+
+
+def accumulate_file(path, chunk_rows=500_000):
+    return accumulate_frames(iter_frames(path, detect_format(path), chunk_rows))
+
+
+def attribute_files(files, chunk_rows=500_000, workers=None, **kwargs):
+    # One process per file shard; partial path totals merge exactly
+    files = list(files)
+    with ProcessPoolExecutor(workers) as pool:
+        partials = list(pool.map(accumulate_file, files, [chunk_rows] * len(files)))
+    total = PathAccumulator()
+    for partial in partials:
+        total.merge(partial)
+    return attribute(total.paths(), **kwargs)
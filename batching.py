@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+import numpy as np
+
+
+# ------------------- Configuration -------------------
+def batching_enabled():
+    return os.getenv("MTA_MICROBATCH", "0").lower() in ("1", "true", "yes")
+
+
+MAX_BATCH_SIZE = int(os.getenv("MTA_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.getenv("MTA_MAX_WAIT_MS", "5"))
+
+
+# ------------------- Micro-Batcher -------------------
+class MicroBatcher:
+    """Coalesce concurrent single-row predictions into one model call.
+
+    Requests wait until either max_batch_size rows are queued or the oldest
+    one has waited max_wait_ms; the batch is then scored off the event loop
+    with one predict_fn(key, X) call per distinct submit key (e.g. the model
+    bundle a row's features were built for) and each caller gets its own row
+    back.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self._batches = 0
+        self._rows = 0
+        self._max_batch = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self._batches,
+            "rows": self._rows,
+            "mean_batch_size": round(self._rows / self._batches, 2) if self._batches else 0.0,
+            "largest_batch": self._max_batch,
+            "mean_queue_wait_ms": round(self._wait_total / self._rows * 1000, 3) if self._rows else 0.0,
+            "max_queue_wait_ms": round(self._wait_max * 1000, 3),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    async def submit(self, row, key=None):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, key, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = batch[0][3] + self.max_wait
+
+        # Drain whatever is already queued, then wait out the rest of the window
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            rows, keys, futures, enqueued = zip(*batch)
+
+            groups = {}
+            for i, key in enumerate(keys):
+                groups.setdefault(key, []).append(i)
+            for key, members in groups.items():
+                try:
+                    X = np.vstack([rows[i] for i in members])
+                    preds = await loop.run_in_executor(None, self.predict_fn, key, X)
+                except Exception as e:
+                    for i in members:
+                        if not futures[i].done():
+                            futures[i].set_exception(e)
+                    continue
+
+                for i, pred in zip(members, preds):
+                    if not futures[i].done():
+                        futures[i].set_result(pred)
+
+            waits = [started - t for t in enqueued]
+            self._batches += 1
+            self._rows += len(batch)
+            self._max_batch = max(self._max_batch, len(batch))
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
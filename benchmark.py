@@ -0,0 +1,304 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+# ------------------- Stages -------------------
+# Each stage's setup runs untimed and returns (run, rows); run() is what gets
+# measured. Every stage executes in a fresh spawned process so peak RSS is its own.
+
+
+def _frame(ctx):
+    from dataio import read_frame
+    return read_frame(ctx['parquet'], 'parquet')
+
+
+def _bundle():
+    from model_registry import registry
+    return registry.get()
+
+
+def setup_parse_csv(ctx):
+    from dataio import read_frame
+    return (lambda: read_frame(ctx['csv'], 'csv')), ctx['rows']
+
+
+def setup_parse_parquet(ctx):
+    from dataio import read_frame
+    return (lambda: read_frame(ctx['parquet'], 'parquet')), ctx['rows']
+
+
+def setup_encode(ctx):
+    from encoding import encode_frame
+    df, bundle = _frame(ctx), _bundle()
+    return (lambda: encode_frame(df.copy(deep=False), bundle.encoders)), len(df)
+
+
+def setup_features(ctx):
+    from featureengineering import feature_kernel
+    df, bundle = _frame(ctx), _bundle()
+    kernel = feature_kernel(bundle.features)
+    return (lambda: kernel(df, bundle.encoders)), len(df)
+
+
+def setup_predict(ctx):
+    from featureengineering import build_features
+    bundle = _bundle()
+    X = build_features(_frame(ctx), bundle.encoders, bundle.features)
+    return (lambda: bundle.predict(X)), len(X)
+
+
+def _setup_predict_single(backend):
+    # One predict call per row, as /predict_from_manual makes; times per-request latency
+    def setup(ctx):
+        from featureengineering import build_features
+        from model_registry import ModelBundle
+        active = _bundle()
+        bundle = ModelBundle(active.booster, active.encoders, active.features, active.manifest, backend=backend)
+        if bundle.backend != backend:
+            raise RuntimeError(f"{backend} backend unavailable for this model")
+        X = build_features(_frame(ctx).head(ctx['manual_requests']), bundle.encoders, bundle.features)
+        rows = [X[i:i + 1] for i in range(len(X))]
+
+        def run():
+            for row in rows:
+                bundle.predict(row)
+        return run, len(rows)
+    return setup
+
+
+def setup_score(ctx):
+    import app
+    df = _frame(ctx)
+    return (lambda: app.score_frame(df.copy(deep=False))), len(df)
+
+
+def _setup_serialize(fmt, orient="records"):
+    def setup(ctx):
+        import app
+        scored = app.score_frame(_frame(ctx))
+        return (lambda: app.encode_predictions(scored, fmt, orient)), len(scored)
+    return setup
+
+
+def setup_api_csv(ctx):
+    from fastapi.testclient import TestClient
+    import app
+    client = TestClient(app.app)
+    with open(ctx['csv'], 'rb') as f:
+        body = f.read()
+
+    def run():
+        response = client.post('/predict_from_csv', files={'file': ('bench.csv', body, 'text/csv')})
+        response.raise_for_status()
+    return run, ctx['rows']
+
+
+def _setup_api_manual(backend):
+    def setup(ctx):
+        # Read when model_registry is imported, which happens below in this fresh process
+        os.environ['MTA_INFERENCE_BACKEND'] = backend
+        from fastapi.testclient import TestClient
+        import app
+        client = TestClient(app.app)
+        df = _frame(ctx).head(ctx['manual_requests'])
+        fields = {'Sale Amount': 'Sale_Amount', 'P&L': 'PnL', 'Conv Rate': 'Conv_Rate', 'Ad Group': 'Ad_Group'}
+        records = json.loads(df.rename(columns=fields).drop(columns=['Revenue']).to_json(orient='records'))
+
+        def run():
+            for record in records:
+                client.post('/predict_from_manual', json=record).raise_for_status()
+        return run, len(records)
+    return setup
+
+
+STAGES = {
+    'parse_csv': setup_parse_csv,
+    'parse_parquet': setup_parse_parquet,
+    'encode': setup_encode,
+    'features': setup_features,
+    'predict': setup_predict,
+    'predict_single_xgboost': _setup_predict_single('xgboost'),
+    'predict_single_flat': _setup_predict_single('flat'),
+    'score': setup_score,
+    'serialize_json': _setup_serialize('json'),
+    'serialize_json_columns': _setup_serialize('json', 'columns'),
+    'serialize_csv': _setup_serialize('csv'),
+    'serialize_parquet': _setup_serialize('parquet'),
+    'serialize_arrow': _setup_serialize('arrow'),
+    'api_predict_csv': setup_api_csv,
+    'api_predict_manual': _setup_api_manual('xgboost'),
+    'api_predict_manual_flat': _setup_api_manual('flat'),
+}
+
+
+def _rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_stage(name, ctx, repeats, warmup):
+    try:
+        run, rows = STAGES[name](ctx)
+        for _ in range(warmup):
+            run()
+    except Exception as exc:
+        return {'skipped': f"{type(exc).__name__}: {exc}"}
+    setup_rss = _rss_mb()
+
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+    peak_rss = _rss_mb()
+
+    # Allocations are traced on one extra run so tracing overhead stays out of the timings
+    tracemalloc.start()
+    run()
+    traced, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(times)
+    return {
+        'rows': rows,
+        'repeats': repeats,
+        'median_seconds': median,
+        'min_seconds': min(times),
+        'rows_per_second': rows / median if median > 0 else None,
+        'us_per_row': median / rows * 1e6 if rows else None,
+        'peak_rss_mb': round(peak_rss, 1),
+        'stage_rss_mb': round(peak_rss - setup_rss, 1),
+        'alloc_peak_mb': round(traced_peak / (1024 * 1024), 2),
+        'alloc_retained_mb': round(traced / (1024 * 1024), 2),
+    }
+
+
+# ------------------- Feature parity -------------------
+def check_feature_parity(ctx):
+    # Timing a pipeline whose serving features drift from training is moot
+    from encoding import fit_encoders
+    from featureengineering import check_parity, FeatureParityError
+    df = _frame(ctx)
+    try:
+        return check_parity(df, fit_encoders(df))
+    except FeatureParityError as e:
+        raise SystemExit(f"Feature parity check failed: {e}")
+
+
+# ------------------- Regression check -------------------
+def compare(current, baseline, threshold):
+    # A stage regresses when throughput drops, or allocation peak grows, by more than threshold
+    failures = []
+    for name, result in current['stages'].items():
+        before = baseline.get('stages', {}).get(name)
+        if not before or 'skipped' in result or 'skipped' in before:
+            continue
+        if before.get('rows') != result.get('rows'):
+            continue
+        if result['rows_per_second'] < before['rows_per_second'] * (1 - threshold):
+            failures.append(f"{name}: {before['rows_per_second']:,.0f} -> {result['rows_per_second']:,.0f} rows/s")
+        if result['alloc_peak_mb'] > max(before['alloc_peak_mb'], 1.0) * (1 + threshold):
+            failures.append(f"{name}: allocation peak {before['alloc_peak_mb']} -> {result['alloc_peak_mb']} MB")
+    return failures
+
+
+def print_results(results):
+    print(f"{'stage':<24}{'rows':>12}{'median s':>11}{'rows/s':>14}{'us/row':>10}"
+          f"{'peak RSS':>10}{'stage RSS':>11}{'alloc MB':>10}")
+    for name, r in results['stages'].items():
+        if 'skipped' in r:
+            print(f"{name:<24}  skipped ({r['skipped']})")
+            continue
+        print(f"{name:<24}{r['rows']:>12,}{r['median_seconds']:>11.4f}{r['rows_per_second']:>14,.0f}"
+              f"{r['us_per_row']:>10.1f}"
+              f"{r['peak_rss_mb']:>10.1f}{r['stage_rss_mb']:>11.1f}{r['alloc_peak_mb']:>10.2f}")
+
+
+# ------------------ Main ------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic data.")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--stages', default=','.join(STAGES), help="Comma-separated subset of: " + ', '.join(STAGES))
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--manual-requests', type=int, default=200,
+                        help="Requests timed by api_predict_manual* and predict_single_*")
+    parser.add_argument('--data-dir', help="Reuse/keep generated data here instead of a temp directory")
+    parser.add_argument('--cache', action='store_true', help="Keep the prediction cache on (off by default so repeats measure compute)")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="Previous results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Allowed relative regression (0.10 = 10%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    from synthdata import write_synthetic
+    from model_registry import current_version
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))}")
+    if not args.cache:
+        os.environ['MTA_CACHE_ENTRIES'] = '0'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        ctx = {'rows': args.rows, 'manual_requests': args.manual_requests}
+        for fmt in ('csv', 'parquet'):
+            ctx[fmt] = os.path.join(data_dir, f"synthetic_{args.rows}_{args.seed}.{fmt}")
+            if not os.path.exists(ctx[fmt]):
+                write_synthetic(ctx[fmt], args.rows, seed=args.seed)
+        parity_rows = check_feature_parity(ctx)
+
+        results = {
+            'meta': {
+                'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'rows': args.rows,
+                'seed': args.seed,
+                'repeats': args.repeats,
+                'model_version': current_version(),
+                'feature_parity_rows': parity_rows,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+            },
+            'stages': {},
+        }
+        for name in stages:
+            with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as pool:
+                results['stages'][name] = pool.submit(run_stage, name, ctx, args.repeats, args.warmup).result()
+
+    print_results(results)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved as {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.threshold)
+        if failures:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import io
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# ------------------- Formats -------------------
+FORMAT_EXTENSIONS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+FORMAT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/vnd.apache.arrow.stream": "arrow",
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+def detect_format(filename=None, content_type=None, default="csv"):
+    # Content type wins when it is specific; otherwise fall back to the extension
+    if content_type:
+        fmt = FORMAT_CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+        if fmt:
+            return fmt
+    if filename:
+        fmt = FORMAT_EXTENSIONS.get(os.path.splitext(str(filename))[1].lower())
+        if fmt:
+            return fmt
+    return default
+
+
+# ------------------- Readers -------------------
+def _project(available, columns):
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return [col for col in available if col in wanted]
+
+
+def _open_arrow(source):
+    # Arrow IPC comes in file (random access) and stream flavours
+    if isinstance(source, (str, os.PathLike)):
+        source = pa.memory_map(str(source))
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+
+def read_frame(source, fmt="csv", columns=None, dtype=None):
+    """Read CSV, Parquet or Arrow IPC, loading only `columns` when given.
+
+    `dtype` is passed to the CSV parser; Parquet and Arrow carry their own types.
+    """
+    if fmt == "parquet":
+        schema = pq.read_schema(source)
+        if hasattr(source, "seek"):
+            source.seek(0)
+        table = pq.read_table(source, columns=_project(schema.names, columns))
+        return table.to_pandas()
+    if fmt == "arrow":
+        table = _open_arrow(source).read_all()
+        projected = _project(table.column_names, columns)
+        return (table.select(projected) if projected is not None else table).to_pandas()
+    if columns is not None:
+        wanted = set(columns)
+        return pd.read_csv(source, usecols=lambda col: col in wanted, dtype=dtype)
+    return pd.read_csv(source, dtype=dtype)
+
+
+def iter_frames(source, fmt="csv", chunk_rows=50_000, columns=None, dtype=None, skiprows=None):
+    # Bounded-memory iteration: CSV chunks, Parquet row batches, Arrow record batches
+    if fmt == "parquet":
+        parquet = pq.ParquetFile(source)
+        batches = parquet.iter_batches(batch_size=chunk_rows,
+                                       columns=_project(parquet.schema_arrow.names, columns))
+        for batch in batches:
+            yield batch.to_pandas()
+    elif fmt == "arrow":
+        reader = _open_arrow(source)
+        projected = _project(reader.schema.names, columns)
+        if isinstance(reader, pa.ipc.RecordBatchFileReader):
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            batches = iter(reader)
+        for batch in batches:
+            if projected is not None:
+                batch = batch.select(projected)
+            yield batch.to_pandas()
+    else:
+        usecols = None
+        if columns is not None:
+            wanted = set(columns)
+            usecols = lambda col: col in wanted  # noqa: E731
+        with pd.read_csv(source, chunksize=chunk_rows, usecols=usecols, dtype=dtype, skiprows=skiprows) as reader:
+            yield from reader
+
+
+def count_units(source, fmt):
+    # Independently readable pieces: Parquet row groups or Arrow IPC file
+    # record batches. None for CSV and Arrow streams, which only read in order.
+    if fmt == "parquet":
+        return pq.ParquetFile(source).metadata.num_row_groups
+    if fmt == "arrow":
+        reader = _open_arrow(source)
+        if isinstance(reader, pa.ipc.RecordBatchFileReader):
+            return reader.num_record_batches
+    return None
+
+
+def unit_slices(source, fmt, max_rows=None):
+    """(unit, offset, rows) pieces covering every row group / record batch.
+
+    A unit longer than max_rows is split into consecutive slices of at most
+    max_rows. None for CSV and Arrow streams, like count_units.
+    """
+    if fmt == "parquet":
+        metadata = pq.ParquetFile(source).metadata
+        sizes = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+    elif fmt == "arrow":
+        reader = _open_arrow(source)
+        if not isinstance(reader, pa.ipc.RecordBatchFileReader):
+            return None
+        sizes = [reader.get_batch(i).num_rows for i in range(reader.num_record_batches)]
+    else:
+        return None
+    step = max_rows or max(sizes, default=1) or 1
+    return [(unit, offset, min(step, size - offset))
+            for unit, size in enumerate(sizes) for offset in range(0, max(size, 1), step)]
+
+
+def read_unit(source, fmt, index, columns=None, offset=0, rows=None):
+    """Read one row group (Parquet) or record batch (Arrow IPC file), or rows [offset, offset + rows) of it."""
+    if fmt == "parquet":
+        parquet = pq.ParquetFile(source)
+        projected = _project(parquet.schema_arrow.names, columns)
+        if offset == 0 and rows is None:
+            return parquet.read_row_group(index, columns=projected).to_pandas()
+        # Stream the row group and stop after the slice: memory stays near one slice
+        stop = parquet.metadata.row_group(index).num_rows if rows is None else offset + rows
+        pieces, seen = [], 0
+        for batch in parquet.iter_batches(batch_size=max(stop - offset, 1), row_groups=[index], columns=projected):
+            start = max(offset - seen, 0)
+            end = min(stop - seen, batch.num_rows)
+            if end > start:
+                pieces.append(batch.slice(start, end - start))
+            seen += batch.num_rows
+            if seen >= stop:
+                break
+        if not pieces:
+            return parquet.read_row_group(index, columns=projected).slice(0, 0).to_pandas()
+        return pa.Table.from_batches(pieces).to_pandas()
+    reader = _open_arrow(source)
+    batch = reader.get_batch(index)
+    projected = _project(batch.schema.names, columns)
+    batch = batch.select(projected) if projected is not None else batch
+    return (batch if offset == 0 and rows is None else batch.slice(offset, rows)).to_pandas()
+
+
+# ------------------- Writers -------------------
+def write_frame(df, target=None, fmt="csv"):
+    """Write `df` to a path, or return the encoded bytes when target is None."""
+    sink = io.BytesIO() if target is None else target
+    if fmt == "parquet":
+        df.to_parquet(sink, index=False)
+    elif fmt == "arrow":
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        df.to_csv(sink, index=False)
+    return sink.getvalue() if target is None else None
+
+
+def write_frames(frames, target, fmt="csv"):
+    """Stream DataFrame chunks to one file at `target` without holding them all."""
+    writer = None
+    rows = 0
+    try:
+        for df in frames:
+            if fmt == "parquet":
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(target, table.schema)
+                writer.write_table(table)
+            elif fmt == "arrow":
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pa.ipc.new_file(target, table.schema)
+                writer.write_table(table)
+            else:
+                df.to_csv(target, mode="w" if rows == 0 else "a", header=rows == 0, index=False)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
@@ -0,0 +1,217 @@
+import hashlib
+import io
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import pyarrow.parquet as pq
+from dataio import read_frame
+from ingest import read_typed
+
+# ------------------- Configuration -------------------
+DATASET_DIR = os.getenv("MTA_DATASET_DIR", "datasets")
+DATASET_MEMORY_MB = float(os.getenv("MTA_DATASET_MEMORY_MB", "512"))
+DATASET_DISK_MB = float(os.getenv("MTA_DATASET_DISK_MB", "4096"))
+RESULT_MEMORY_MB = float(os.getenv("MTA_RESULT_MEMORY_MB", "256"))
+
+HASH_BLOCK_BYTES = 1 << 20
+
+
+def _hash_source(source):
+    digest = hashlib.sha256()
+    if isinstance(source, bytes):
+        digest.update(source)
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()[:32]
+
+
+def _nbytes(value):
+    # Containers are sized by their parts, so a (frame, facets) result weighs
+    # what its frame does rather than the length of its repr
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(k) + _nbytes(v) for k, v in value.items())
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(_nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class _BoundedLRU:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            return value[0]
+        return None
+
+    def peek(self, key):
+        # A read that leaves the recency order alone
+        value = self.entries.get(key)
+        return None if value is None else value[0]
+
+    def put(self, key, value):
+        nbytes = _nbytes(value)
+        if nbytes > self.max_bytes:
+            return
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+        self.entries[key] = (value, nbytes)
+        self.size += nbytes
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+
+    def drop(self, predicate):
+        for key in [k for k in self.entries if predicate(k)]:
+            self.size -= self.entries.pop(key)[1]
+
+
+# ------------------- Dataset Store -------------------
+class DatasetStore:
+    """Content-addressed store of parsed uploads.
+
+    An upload is hashed, parsed once and kept as Parquet on local disk plus a
+    DataFrame in memory; both tiers evict least-recently-used datasets past
+    their byte budget. Derived results (EDA summaries, prediction bodies) are
+    cached under (dataset id, kind, model version, ...).
+    """
+
+    def __init__(self, root=DATASET_DIR, memory_mb=DATASET_MEMORY_MB,
+                 disk_mb=DATASET_DISK_MB, result_mb=RESULT_MEMORY_MB):
+        self.root = Path(root)
+        self.disk_bytes = disk_mb * 1024 * 1024
+        self._frames = _BoundedLRU(memory_mb * 1024 * 1024)
+        self._results = _BoundedLRU(result_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.parses = 0
+        self.result_hits = 0
+        self.result_misses = 0
+
+    def path(self, dataset_id):
+        return self.root / f"{dataset_id}.parquet"
+
+    def exists(self, dataset_id):
+        with self._lock:
+            cached = self._frames.peek(dataset_id) is not None
+        return cached or self.path(dataset_id).exists()
+
+    def put(self, source, fmt="csv"):
+        dataset_id = _hash_source(source)
+        if self.exists(dataset_id):
+            if self.path(dataset_id).exists():
+                os.utime(self.path(dataset_id))
+            return dataset_id
+
+        # Parsed once with the campaign schema, so cached frames hold compact dtypes
+        df = read_typed(io.BytesIO(source) if isinstance(source, bytes) else source, fmt)
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".{dataset_id}.tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, self.path(dataset_id))
+        with self._lock:
+            self.parses += 1
+            self._frames.put(dataset_id, df)
+        self._evict_disk(keep=dataset_id)
+        return dataset_id
+
+    def get(self, dataset_id, columns=None):
+        with self._lock:
+            df = self._frames.get(dataset_id)
+        if df is None:
+            path = self.path(dataset_id)
+            if not path.exists():
+                raise KeyError(dataset_id)
+            df = read_frame(str(path), "parquet")
+            os.utime(path)
+            with self._lock:
+                self._frames.put(dataset_id, df)
+        # Callers add columns to what they get back; never hand out the cached frame
+        if columns is not None:
+            wanted = set(columns)
+            return df[[col for col in df.columns if col in wanted]]
+        return df.copy(deep=False)
+
+    def info(self, dataset_id):
+        # Parquet metadata when the file is on disk, else the cached frame
+        with self._lock:
+            df = self._frames.peek(dataset_id)
+        path = self.path(dataset_id)
+        try:
+            meta, stored = pq.read_metadata(path), path.stat().st_size
+        except FileNotFoundError:
+            if df is None:
+                raise KeyError(dataset_id)
+            rows, columns, stored = len(df), list(df.columns), 0
+        else:
+            rows, columns = meta.num_rows, meta.schema.to_arrow_schema().names
+        return {
+            "dataset_id": dataset_id,
+            "rows": rows,
+            "columns": columns,
+            "stored_bytes": stored,
+            "in_memory": df is not None,
+        }
+
+    def _evict_disk(self, keep=None):
+        # The dataset just written stays, even on its own over budget
+        files = sorted((p for p in self.root.glob("*.parquet") if p.stem != keep), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        if keep is not None and self.path(keep).exists():
+            total += self.path(keep).stat().st_size
+        while files and total > self.disk_bytes:
+            oldest = files.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink(missing_ok=True)
+            dataset_id = oldest.stem
+            with self._lock:
+                self._frames.drop(lambda key: key == dataset_id)
+                self._results.drop(lambda key: key[0] == dataset_id)
+
+    # -------- Derived results --------
+    def get_result(self, key):
+        with self._lock:
+            value = self._results.get(key)
+            if value is None:
+                self.result_misses += 1
+            else:
+                self.result_hits += 1
+        return value
+
+    def put_result(self, key, value):
+        with self._lock:
+            self._results.put(key, value)
+
+    def stats(self):
+        files = list(self.root.glob("*.parquet")) if self.root.exists() else []
+        return {
+            "root": str(self.root),
+            "datasets_on_disk": len(files),
+            "disk_bytes": sum(p.stat().st_size for p in files),
+            "disk_limit_bytes": int(self.disk_bytes),
+            "datasets_in_memory": len(self._frames.entries),
+            "memory_bytes": self._frames.size,
+            "memory_limit_bytes": int(self._frames.max_bytes),
+            "cached_results": len(self._results.entries),
+            "result_hits": self.result_hits,
+            "result_misses": self.result_misses,
+            "parses": self.parses,
+        }
+
+
+dataset_store = DatasetStore()
@@ -1,70 +1,242 @@
+import argparse
+import html
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+from edastats import EDAAccumulator, PlotAccumulator, summarize_paths, plot_paths, plot_ranges
+
+DEFAULT_DATA = "data/final_shop_6modata.csv"
+
+NUM_COLS = ['Impressions', 'Clicks', 'CTR', 'Conversions', 'Conv Rate',
+            'Cost', 'CPC', 'Revenue', 'Sale Amount', 'P&L']
+CAT_COLS = ['Ad Group', 'Month']
+
+# Count plots keep the most frequent categories so the label axis stays readable
+MAX_CATEGORIES = 50
+REPORT_FORMATS = ('png', 'svg')
+
+def print_summary(summary):
+    print("Shape of dataset:", tuple(summary["Shape"]))
+    print("\nMissing values:\n", pd.Series(summary["Missing_Values"]))
+    print("\nDescription:\n", pd.DataFrame(summary["Numeric_Summary"]))
+
+# ------------------- Figures -------------------
+# A figure spec is a small picklable dict of pre-aggregated data and the name
+# of its draw function, so drawing cost does not depend on the row count and
+# the same spec renders on screen or in a headless worker process.
+
+def figure_specs(summary, plots):
+    specs = []
+    sums = plots.group_sums
+    if 'Impressions' in sums:
+        top = sums['Impressions'].sort_values(ascending=False).head(15)
+        specs.append({'name': 'top_impressions', 'title': "Top 15 Ad Groups by Impressions", 'draw': 'bars',
+                      'figsize': (12, 6), 'labels': top.index.astype(str).tolist(), 'values': top.to_numpy()})
+
+    specs.append({'name': 'correlation', 'title': "Feature Correlation Matrix", 'draw': 'heatmap',
+                  'figsize': (12, 8), 'matrix': pd.DataFrame(summary["Correlation"], dtype=float)})
+
+    histograms = {col: (plots.edges[col], plots.counts[col]) for col in NUM_COLS if col in plots.edges}
+    specs.append({'name': 'distributions', 'title': "Distribution of Numerical Features", 'draw': 'histograms',
+                  'figsize': (16, 12), 'histograms': histograms})
+
+    for col in CAT_COLS:
+        counts = plots.category_counts.get(col)
+        if counts is None or not len(counts):
+            continue
+        counts = counts[counts.index.isin(counts.nlargest(MAX_CATEGORIES).index)]
+        spec = {'name': f"count_{col.lower().replace(' ', '_')}", 'title': f"Count Plot of {col}", 'draw': 'bars',
+                'figsize': (8, 4), 'labels': counts.index.astype(str).tolist(), 'values': counts.to_numpy(),
+                'palette': 'Set2', 'rotation': 90}
+        if len(counts) > 12:
+            # Long category lists read better as rows than as rotated labels
+            spec.update(figsize=(10, 0.3 * len(counts) + 1), horizontal=True)
+        specs.append(spec)
+
+    if 'Revenue' in sums:
+        top = sums['Revenue'].sort_values(ascending=False).head(10)
+        specs.append({'name': 'top_revenue', 'title': "Top 10 Ad Groups by Total Revenue", 'draw': 'bars',
+                      'figsize': (12, 6), 'labels': top.index.astype(str).tolist(), 'values': top.to_numpy(),
+                      'palette': 'viridis', 'horizontal': True, 'xlabel': "Total Revenue", 'ylabel': "Ad Group"})
+
+    # Raw points while the data is small, binned density once it is not
+    points = plots.points()
+    scatter = {'name': 'revenue_vs_cost', 'title': "Revenue vs. Cost", 'figsize': (8, 6),
+               'xlabel': "Ad Cost", 'ylabel': "Revenue"}
+    if points is not None and len(points):
+        specs.append({**scatter, 'draw': 'scatter', 'points': points})
+    elif plots.density is not None:
+        specs.append({**scatter, 'draw': 'density', 'edges': plots.density_edges, 'counts': plots.density})
+    return specs
+
+def draw_bars(fig, spec):
+    ax = fig.subplots()
+    labels, values = spec['labels'], spec['values']
+    colors = {'hue': labels, 'palette': spec['palette'], 'legend': False} if spec.get('palette') else {}
+    if spec.get('horizontal'):
+        sns.barplot(x=values, y=labels, ax=ax, **colors)
+    else:
+        sns.barplot(x=labels, y=values, ax=ax, **colors)
+        rotation = spec.get('rotation', 45)
+        plt.setp(ax.get_xticklabels(), rotation=rotation, ha='right' if rotation < 90 else 'center')
+    ax.set_title(spec['title'])
+    ax.set_xlabel(spec.get('xlabel', ''))
+    ax.set_ylabel(spec.get('ylabel', ''))
+
+def draw_heatmap(fig, spec):
+    ax = fig.subplots()
+    sns.heatmap(spec['matrix'], annot=True, fmt='.2f', cmap='coolwarm', ax=ax)
+    ax.set_title(spec['title'])
+
+def draw_histograms(fig, spec):
+    # Bars straight from precomputed bin counts
+    histograms = spec['histograms']
+    ncols = 3
+    axes = fig.subplots(max(math.ceil(len(histograms) / ncols), 1), ncols, squeeze=False).ravel()
+    for ax, (col, (edges, counts)) in zip(axes, histograms.items()):
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', edgecolor='black')
+        ax.set_title(col)
+        ax.grid(True)
+    for ax in axes[len(histograms):]:
+        ax.set_visible(False)
+    fig.suptitle(spec['title'], fontsize=16)
+
+def draw_scatter(fig, spec):
+    ax = fig.subplots()
+    sns.scatterplot(data=spec['points'], x='Cost', y='Revenue', hue='Ad Group', alpha=0.7, ax=ax)
+    ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    _label_scatter(ax, spec)
+
+def draw_density(fig, spec):
+    # 2-D histogram on a log colour scale; empty bins stay blank
+    ax = fig.subplots()
+    x_edges, y_edges = spec['edges']
+    counts = np.ma.masked_equal(spec['counts'].T, 0)
+    mesh = ax.pcolormesh(x_edges, y_edges, counts, norm=LogNorm(), cmap='viridis')
+    fig.colorbar(mesh, ax=ax, label="Rows")
+    _label_scatter(ax, spec)
+
+def _label_scatter(ax, spec):
+    ax.set_title(spec['title'])
+    ax.set_xlabel(spec['xlabel'])
+    ax.set_ylabel(spec['ylabel'])
+    ax.grid(True)
+
+DRAW = {
+    'bars': draw_bars,
+    'heatmap': draw_heatmap,
+    'histograms': draw_histograms,
+    'scatter': draw_scatter,
+    'density': draw_density,
+}
+
+def render_figure(spec, out_dir, formats=('png',)):
+    # A bare Figure carries no pyplot state or GUI backend, so workers stay headless
+    fig = Figure(figsize=spec['figsize'], layout='tight')
+    DRAW[spec['draw']](fig, spec)
+    files = []
+    for fmt in formats:
+        path = Path(out_dir) / f"{spec['name']}.{fmt}"
+        fig.savefig(path, format=fmt, bbox_inches='tight')
+        files.append(path.name)
+    return spec['name'], files
+
+# ------------------- EDA -------------------
 
 def perform_eda(df):
-    print("Shape of dataset:", df.shape)
+    # Summary statistics come from the one-pass engine shared with /eda
+    summary = EDAAccumulator().update(df).summary()
+    print_summary(summary)
     print("\nData types:\n", df.dtypes)
-    print("\nMissing values:\n", df.isnull().sum())
-    print("\nDescription:\n", df.describe())
-    
-    # Top 15 Ad Groups by Impressions
-    top_15 = df.groupby('Ad Group')['Impressions'].sum().sort_values(ascending=False).head(15).index
-    filtered_df = df[df['Ad Group'].isin(top_15)]
-    
-    plt.figure(figsize=(12,6))
-    sns.barplot(data=filtered_df, x='Ad Group', y='Impressions', estimator=sum)
-    plt.xticks(rotation=45, ha='right')
-    plt.title("Top 15 Ad Groups by Impressions")
-    plt.tight_layout()
-    plt.show()
-    
-    # Correlation Heatmap
-    corr = df.corr(numeric_only=True)
-    plt.figure(figsize=(12,8))
-    sns.heatmap(corr, annot=True, cmap='coolwarm')
-    plt.title("Feature Correlation Matrix")
-    plt.show()
-    
-    # Numerical Feature Distribution
-    num_cols = ['Impressions', 'Clicks', 'CTR', 'Conversions', 'Conv Rate', 
-                'Cost', 'CPC', 'Revenue', 'Sale Amount', 'P&L']
-    df[num_cols].hist(bins=20, figsize=(16,12), edgecolor='black')
-    plt.suptitle('Distribution of Numerical Features', fontsize=16)
-    plt.show()
-    
-    # Categorical Feature Distribution
-    cat_cols = ['Ad Group', 'Month']
-    for col in cat_cols:
-        plt.figure(figsize=(8,4))
-        sns.countplot(data=df, x=col, palette='Set2')
-        plt.title(f'Count Plot of {col}')
-        plt.xticks(rotation=90)
-        plt.tight_layout()
-        plt.show()
-    
-    # Revenue by Ad Group
-    revenue_by_adgroup = df.groupby('Ad Group')['Revenue'].sum().sort_values(ascending=False).head(10)
-    plt.figure(figsize=(12,6))
-    sns.barplot(x=revenue_by_adgroup.values, y=revenue_by_adgroup.index, palette='viridis')
-    plt.title('Top 10 Ad Groups by Total Revenue')
-    plt.xlabel('Total Revenue')
-    plt.ylabel('Ad Group')
-    plt.show()
-    
-    # Revenue vs Cost Scatter
-    plt.figure(figsize=(8,6))
-    sns.scatterplot(data=df, x='Cost', y='Revenue', hue='Ad Group', alpha=0.7)
-    plt.title('Revenue vs. Cost')
-    plt.xlabel('Ad Cost')
-    plt.ylabel('Revenue')
-    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.grid(True)
-    plt.tight_layout()
+
+    plots = PlotAccumulator(plot_ranges(summary, NUM_COLS)).update(df)
+    for spec in figure_specs(summary, plots):
+        DRAW[spec['draw']](plt.figure(figsize=spec['figsize'], layout='tight'), spec)
     plt.show()
 
-def main():
-    df = pd.read_csv("data/final_shop_6modata.csv")
+def write_html(path, summary, specs, rendered):
+    # Figures are linked by relative path, preferring PNG over SVG
+    sections = [
+        "<h1>Exploratory Data Analysis</h1>",
+        f"<p>Shape: {html.escape(str(tuple(summary['Shape'])))}</p>",
+        "<h2>Missing values</h2>",
+        pd.Series(summary["Missing_Values"], name="Missing").to_frame().to_html(),
+        "<h2>Description</h2>",
+        pd.DataFrame(summary["Numeric_Summary"]).to_html(float_format=lambda v: f"{v:,.4g}"),
+    ]
+    for spec in specs:
+        files = sorted(rendered[spec['name']], key=lambda name: not name.endswith('.png'))
+        sections.append(f"<h2>{html.escape(spec['title'])}</h2>")
+        sections.append(f'<img src="{html.escape(files[0])}" alt="{html.escape(spec["title"])}">')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>EDA report</title>"
+                "<style>body{font-family:sans-serif;margin:2em}img{max-width:100%}"
+                "table{border-collapse:collapse}td,th{padding:2px 8px}</style></head><body>\n")
+        f.write("\n".join(sections))
+        f.write("\n</body></html>\n")
+
+def write_report(paths, out_dir, formats=('png',), html_report=False, chunk_rows=100_000, workers=None):
+    """Summarize `paths`, bin them for plotting, and render every figure into out_dir.
+
+    Two parallel passes over the shards (statistics, then plot bins over the
+    ranges the first pass found) keep memory and drawing time flat as rows
+    grow; figures are then rendered concurrently, one per worker process.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    summary = summarize_paths(paths, chunk_rows, workers)
+    plots = plot_paths(paths, plot_ranges(summary, NUM_COLS), chunk_rows, workers)
+    specs = figure_specs(summary, plots)
+
+    workers = min(workers or os.cpu_count() or 1, len(specs))
+    with ProcessPoolExecutor(workers) as pool:
+        rendered = dict(pool.map(render_figure, specs, [out_dir] * len(specs), [formats] * len(specs)))
+    if html_report:
+        write_html(out_dir / "index.html", summary, specs, rendered)
+    return summary, rendered
+
+# ------------------ Main ------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Exploratory data analysis of campaign data.")
+    parser.add_argument('paths', nargs='*',
+                        help="CSV, Parquet or Arrow shards to summarize in parallel (report default: "
+                             f"{DEFAULT_DATA}); without paths or --report, plots {DEFAULT_DATA} interactively")
+    parser.add_argument('--report', metavar='DIR', help="Render every figure headlessly into DIR")
+    parser.add_argument('--format', default='png', help="Comma-separated figure formats: " + ', '.join(REPORT_FORMATS))
+    parser.add_argument('--html', action='store_true', help="Also write DIR/index.html with figures and tables")
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+    args.format = tuple(fmt.strip() for fmt in args.format.split(',') if fmt.strip())
+    unknown = set(args.format) - set(REPORT_FORMATS)
+    if unknown or not args.format:
+        parser.error(f"--format must be drawn from: {', '.join(REPORT_FORMATS)}")
+    return args
+
+def main(argv=None):
+    # `python eda.py shard1.parquet shard2.csv ...` summarizes larger-than-memory
+    # data in parallel without plotting; --report DIR also renders the figures
+    # to files; no arguments runs the interactive EDA.
+    args = parse_args(argv)
+    if args.report:
+        summary, rendered = write_report(args.paths or [DEFAULT_DATA], args.report, args.format, args.html,
+                                         args.chunk_rows, args.workers)
+        print_summary(summary)
+        print(f"\n{sum(len(files) for files in rendered.values())} figure files written to {args.report}"
+              + (f" (index: {os.path.join(args.report, 'index.html')})" if args.html else ""))
+        return
+    if args.paths:
+        print_summary(summarize_paths(args.paths, args.chunk_rows, args.workers))
+        return
+    df = pd.read_csv(DEFAULT_DATA)
     perform_eda(df)
 
 if __name__ == "__main__":
@@ -0,0 +1,406 @@
+import copy
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from dataio import detect_format, iter_frames
+
+CATEGORICAL_COLUMNS = ('Ad Group', 'Month')
+SUMMARY_QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _finite_or_none(value):
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+# ------------------- Quantile Sketch -------------------
+class QuantileSketch:
+    """Log-bucketed quantile sketch (DDSketch) for one column.
+
+    Every estimate is within `alpha` relative error, and merging two sketches
+    just adds bucket counts, so shard results combine exactly.
+    """
+
+    def __init__(self, alpha=0.01):
+        self.alpha = alpha
+        self.log_gamma = math.log((1 + alpha) / (1 - alpha))
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def _add(self, store, values):
+        keys, counts = np.unique(np.ceil(np.log(values) / self.log_gamma).astype(np.int64), return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.zeros += int(np.count_nonzero(values == 0))
+        if (values > 0).any():
+            self._add(self.positive, values[values > 0])
+        if (values < 0).any():
+            self._add(self.negative, -values[values < 0])
+
+    def merge(self, other):
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def _value(self, key):
+        gamma = math.exp(self.log_gamma)
+        return 2 * gamma ** key / (gamma + 1)
+
+    def quantile(self, q):
+        if not self.count:
+            return float('nan')
+        rank = q * (self.count - 1)
+        seen = 0
+        # Ascending order: most negative first, then zeros, then positives
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+
+# ------------------- Heavy Hitters -------------------
+class HeavyHitters:
+    """Misra-Gries frequent-items summary with `capacity` counters.
+
+    Counts are exact while the column has at most `capacity` distinct values;
+    beyond that every count is underestimated by at most rows / capacity.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+
+    def _prune(self):
+        if len(self.counts) <= self.capacity:
+            return
+        cutoff = sorted(self.counts.values(), reverse=True)[self.capacity]
+        self.counts = {k: c - cutoff for k, c in self.counts.items() if c > cutoff}
+
+    def update(self, values):
+        for key, count in values.value_counts().items():
+            self.counts[key] = self.counts.get(key, 0) + int(count)
+        self._prune()
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self._prune()
+        return self
+
+    def top(self, k):
+        return dict(sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:k])
+
+
+# ------------------- EDA Accumulator -------------------
+class EDAAccumulator:
+    """One-pass, mergeable replacement for describe()/corr()/isnull()/value_counts().
+
+    For every pair of numeric columns it keeps the pairwise-complete count,
+    means, sums of squared deviations and co-moment, updated per chunk with
+    Chan's parallel Welford merge. The diagonal gives count/mean/std, the
+    off-diagonal the same pairwise correlation pandas computes. Memory is
+    O(columns^2) regardless of row count.
+    """
+
+    def __init__(self, categorical_columns=CATEGORICAL_COLUMNS, top_k=5, capacity=1000, alpha=0.01):
+        self.categorical_columns = tuple(categorical_columns)
+        self.top_k = top_k
+        self.capacity = capacity
+        self.alpha = alpha
+        self.rows = 0
+        self.columns = None
+        self.numeric_columns = None
+        self.nulls = None
+        self.minimum = None
+        self.maximum = None
+        self.n = None
+        self.mean_i = None
+        self.mean_j = None
+        self.m2_i = None
+        self.m2_j = None
+        self.comoment = None
+        self.sketches = None
+        self.hitters = {col: HeavyHitters(capacity) for col in self.categorical_columns}
+
+    def _init_columns(self, df):
+        self.columns = list(df.columns)
+        self.numeric_columns = list(df.select_dtypes(include='number').columns)
+        k = len(self.numeric_columns)
+        self.nulls = np.zeros(len(self.columns), dtype=np.int64)
+        self.minimum = np.full(k, np.inf)
+        self.maximum = np.full(k, -np.inf)
+        self.n = np.zeros((k, k))
+        self.mean_i = np.zeros((k, k))
+        self.mean_j = np.zeros((k, k))
+        self.m2_i = np.zeros((k, k))
+        self.m2_j = np.zeros((k, k))
+        self.comoment = np.zeros((k, k))
+        self.sketches = [QuantileSketch(self.alpha) for _ in range(k)]
+
+    def _pair_moments(self, X):
+        # Pairwise-complete moments of one chunk, centred on the chunk means for accuracy
+        present = ~np.isnan(X)
+        M = present.astype(np.float64)
+        center = np.nan_to_num(np.nanmean(X, axis=0)) if present.any() else np.zeros(X.shape[1])
+        Xc = np.where(present, X - center, 0.0)
+
+        n = M.T @ M
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s_i = Xc.T @ M
+            mean_i = np.where(n > 0, s_i / n, 0.0)
+            m2_i = np.where(n > 0, (Xc * Xc).T @ M - s_i * mean_i, 0.0)
+            comoment = np.where(n > 0, Xc.T @ Xc - s_i * mean_i.T, 0.0)
+        mean_i = mean_i + center[:, None]
+        return n, mean_i, mean_i.T, m2_i, m2_i.T, comoment
+
+    def _merge_moments(self, n_b, mean_i_b, mean_j_b, m2_i_b, m2_j_b, comoment_b):
+        n_a = self.n
+        n = n_a + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, n_a * n_b / n, 0.0)
+            share = np.where(n > 0, n_b / n, 0.0)
+        d_i = mean_i_b - self.mean_i
+        d_j = mean_j_b - self.mean_j
+        self.mean_i = self.mean_i + d_i * share
+        self.mean_j = self.mean_j + d_j * share
+        self.m2_i = self.m2_i + m2_i_b + d_i * d_i * weight
+        self.m2_j = self.m2_j + m2_j_b + d_j * d_j * weight
+        self.comoment = self.comoment + comoment_b + d_i * d_j * weight
+        self.n = n
+
+    def update(self, df):
+        if self.columns is None:
+            self._init_columns(df)
+        self.rows += len(df)
+        self.nulls += df.reindex(columns=self.columns).isnull().to_numpy().sum(axis=0)
+
+        X = df.reindex(columns=self.numeric_columns).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        if len(X):
+            with np.errstate(invalid='ignore'):
+                self.minimum = np.fmin(self.minimum, np.nanmin(np.where(np.isnan(X), np.inf, X), axis=0))
+                self.maximum = np.fmax(self.maximum, np.nanmax(np.where(np.isnan(X), -np.inf, X), axis=0))
+            self._merge_moments(*self._pair_moments(X))
+            for sketch, column in zip(self.sketches, X.T):
+                sketch.update(column)
+
+        for col, hitters in self.hitters.items():
+            if col in df.columns:
+                hitters.update(df[col])
+        return self
+
+    def merge(self, other):
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.__dict__.update(copy.deepcopy(other.__dict__))
+            return self
+        if other.numeric_columns != self.numeric_columns or other.columns != self.columns:
+            raise ValueError("Cannot merge EDA accumulators over different columns")
+
+        self.rows += other.rows
+        self.nulls = self.nulls + other.nulls
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        self._merge_moments(other.n, other.mean_i, other.mean_j, other.m2_i, other.m2_j, other.comoment)
+        for sketch, other_sketch in zip(self.sketches, other.sketches):
+            sketch.merge(other_sketch)
+        for col, hitters in other.hitters.items():
+            self.hitters.setdefault(col, HeavyHitters(self.capacity)).merge(hitters)
+        return self
+
+    def correlation(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.sqrt(self.m2_i * self.m2_j)
+        corr[self.n < 2] = np.nan
+        return corr
+
+    def summary(self):
+        # Same JSON shape as the in-memory describe()/corr() summary in app.run_eda
+        if self.columns is None:
+            return {"Shape": [0, 0], "Missing_Values": {}, "Numeric_Summary": {},
+                    "Top_Ad_Groups": {}, "Top_Months": {}, "Correlation": {}}
+
+        count = np.diag(self.n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.diag(self.m2_i) / (count - 1))
+        numeric_summary = {}
+        for idx, col in enumerate(self.numeric_columns):
+            has_rows = count[idx] > 0
+            stats = {
+                "count": float(count[idx]),
+                "mean": np.diag(self.mean_i)[idx] if has_rows else np.nan,
+                "std": std[idx],
+                "min": self.minimum[idx] if has_rows else np.nan,
+            }
+            for q in SUMMARY_QUANTILES:
+                stats[f"{q:.0%}"] = self.sketches[idx].quantile(q)
+            stats["max"] = self.maximum[idx] if has_rows else np.nan
+            numeric_summary[col] = {k: _finite_or_none(v) for k, v in stats.items()}
+
+        corr = self.correlation()
+        return {
+            "Shape": [self.rows, len(self.columns)],
+            "Missing_Values": dict(zip(self.columns, self.nulls.tolist())),
+            "Numeric_Summary": numeric_summary,
+            "Top_Ad_Groups": self.hitters["Ad Group"].top(self.top_k) if "Ad Group" in self.hitters else {},
+            "Top_Months": self.hitters["Month"].top(self.top_k) if "Month" in self.hitters else {},
+            "Correlation": {
+                col_j: {col_i: _finite_or_none(corr[i, j]) for i, col_i in enumerate(self.numeric_columns)}
+                for j, col_j in enumerate(self.numeric_columns)
+            },
+        }
+
+
+# ------------------- Plot Accumulator -------------------
+class PlotAccumulator:
+    """Mergeable inputs for every EDA chart, independent of row count.
+
+    Histograms and the 2-D density of `scatter` are bin counts over fixed
+    ranges (taken from a first EDAAccumulator pass), group totals and category
+    counts are exact sums, and raw points are kept only while the data has at
+    most `sample_rows` rows, so small data can still be drawn as a scatter.
+    """
+
+    def __init__(self, ranges, bins=20, density_bins=60, sample_rows=50_000, group_column='Ad Group',
+                 sum_columns=('Impressions', 'Revenue'), count_columns=CATEGORICAL_COLUMNS,
+                 scatter=('Cost', 'Revenue')):
+        self.edges = {col: np.linspace(lo, hi if hi > lo else lo + 1, bins + 1) for col, (lo, hi) in ranges.items()}
+        self.counts = {col: np.zeros(bins, dtype=np.int64) for col in self.edges}
+        self.scatter = tuple(scatter)
+        self.density_edges = tuple(np.linspace(*self.edges[col][[0, -1]], density_bins + 1)
+                                   for col in self.scatter) if set(self.scatter) <= set(self.edges) else None
+        self.density = np.zeros((density_bins, density_bins), dtype=np.int64) if self.density_edges else None
+        self.group_column = group_column
+        self.sum_columns = list(sum_columns)
+        self.group_sums = pd.DataFrame(columns=self.sum_columns, dtype=np.float64)
+        self.category_counts = {col: pd.Series(dtype=np.int64) for col in count_columns}
+        self.sample_rows = sample_rows
+        self.sample = []
+        self.rows = 0
+
+    def _numeric(self, df, col):
+        if col not in df.columns:
+            return np.full(len(df), np.nan)
+        return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+
+    @staticmethod
+    def _add(total, part):
+        # Sum by label, keeping labels in order of first appearance
+        return pd.concat([total, part]).groupby(level=0, sort=False).sum() if len(total) else part
+
+    def update(self, df):
+        self.rows += len(df)
+        for col, edges in self.edges.items():
+            values = self._numeric(df, col)
+            self.counts[col] += np.histogram(values[np.isfinite(values)], edges)[0]
+        if self.density is not None:
+            x, y = (self._numeric(df, col) for col in self.scatter)
+            finite = np.isfinite(x) & np.isfinite(y)
+            self.density += np.histogram2d(x[finite], y[finite], self.density_edges)[0].astype(np.int64)
+
+        sums = [col for col in self.sum_columns if col in df.columns]
+        if self.group_column in df.columns and sums:
+            numeric = df[sums].apply(pd.to_numeric, errors='coerce')
+            self.group_sums = self._add(self.group_sums, numeric.groupby(df[self.group_column], sort=False).sum())
+        for col in self.category_counts:
+            if col in df.columns:
+                self.category_counts[col] = self._add(self.category_counts[col], df[col].value_counts(sort=False))
+
+        if self.sample is not None:
+            if self.rows > self.sample_rows:
+                self.sample = None
+            else:
+                keep = [col for col in (*self.scatter, self.group_column) if col in df.columns]
+                self.sample.append(df[keep])
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        for col in self.counts:
+            self.counts[col] += other.counts[col]
+        if self.density is not None:
+            self.density += other.density
+        self.group_sums = self._add(self.group_sums, other.group_sums)
+        for col, counts in other.category_counts.items():
+            self.category_counts[col] = self._add(self.category_counts.get(col, counts.iloc[:0]), counts)
+        if self.sample is None or other.sample is None or self.rows > self.sample_rows:
+            self.sample = None
+        else:
+            self.sample.extend(other.sample)
+        return self
+
+    def points(self):
+        # Raw scatter points, or None once the data outgrew sample_rows
+        if self.sample is None:
+            return None
+        return pd.concat(self.sample, ignore_index=True) if self.sample else pd.DataFrame()
+
+
+def plot_ranges(summary, columns=None):
+    # (min, max) of each numeric column with data, from an EDA summary
+    ranges = {}
+    for col, stats in summary["Numeric_Summary"].items():
+        if (columns is None or col in columns) and stats["min"] is not None and stats["max"] is not None:
+            ranges[col] = (stats["min"], stats["max"])
+    return ranges
+
+
+# ------------------- Drivers -------------------
+def accumulate_frames(frames, **kwargs):
+    acc = EDAAccumulator(**kwargs)
+    for frame in frames:
+        acc.update(frame)
+    return acc
+
+
+def accumulate_path(path, chunk_rows=100_000):
+    return accumulate_frames(iter_frames(path, detect_format(path), chunk_rows))
+
+
+def accumulate_plot_path(path, ranges, chunk_rows=100_000):
+    acc = PlotAccumulator(ranges)
+    for frame in iter_frames(path, detect_format(path), chunk_rows):
+        acc.update(frame)
+    return acc
+
+
+def plot_paths(paths, ranges, chunk_rows=100_000, workers=None):
+    # Second pass over file shards, once ranges are known from summarize_paths
+    paths = list(paths)
+    with ProcessPoolExecutor(workers) as pool:
+        partials = list(pool.map(accumulate_plot_path, paths, [ranges] * len(paths), [chunk_rows] * len(paths)))
+    total = PlotAccumulator(ranges)
+    for partial in partials:
+        total.merge(partial)
+    return total
+
+
+def summarize_paths(paths, chunk_rows=100_000, workers=None):
+    # One process per file shard; partial accumulators merge exactly
+    paths = list(paths)
+    with ProcessPoolExecutor(workers) as pool:
+        partials = list(pool.map(accumulate_path, paths, [chunk_rows] * len(paths)))
+    total = EDAAccumulator()
+    for partial in partials:
+        total.merge(partial)
+    return total.summary()
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import joblib
+
+# Code assigned to categories the encoder has never seen
+UNKNOWN_CODE = -1
+
+# Raw categorical column -> encoded model feature
+ENCODED_COLUMNS = {
+    'Ad Group': 'Ad_Group_Encoded',
+    'Month': 'Month_Encoded',
+}
+
+
+# ------------------- Category Encoder -------------------
+class CategoryEncoder:
+    """Drop-in replacement for a fitted LabelEncoder.
+
+    Holds the vocabulary as a flat array and encodes whole columns in a single
+    hash-table pass (pandas Categorical codes). fit() sorts, so codes are
+    identical to LabelEncoder's; extend() appends without renumbering. Unknown
+    values map to UNKNOWN_CODE row by row.
+    """
+
+    def __init__(self, classes=()):
+        # Order is preserved: a code is the position of its class in classes_
+        self.classes_ = np.asarray(list(dict.fromkeys(classes)), dtype=object)
+        self._index = pd.Index(self.classes_)
+
+    @classmethod
+    def from_label_encoder(cls, le):
+        if isinstance(le, cls):
+            return le
+        return cls(le.classes_)
+
+    def __len__(self):
+        return len(self.classes_)
+
+    def __contains__(self, value):
+        return value in self._index
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._index = pd.Index(self.classes_)
+
+    def __getstate__(self):
+        return {'classes_': self.classes_}
+
+    def fit(self, values):
+        self.classes_ = np.asarray(np.sort(pd.Series(values).dropna().unique()), dtype=object)
+        self._index = pd.Index(self.classes_)
+        return self
+
+    def transform(self, values):
+        codes = pd.Categorical(values, categories=self._index).codes
+        return np.where(codes < 0, UNKNOWN_CODE, codes).astype(np.int32)
+
+    def extend(self, values):
+        # Append unseen categories after the existing ones; existing codes never change
+        seen = pd.Index(pd.Series(values).dropna().unique())
+        new = seen[self._index.get_indexer(seen) < 0]
+        if len(new):
+            self.classes_ = np.concatenate([self.classes_, np.asarray(sorted(new), dtype=object)])
+            self._index = pd.Index(self.classes_)
+        return self
+
+    def fit_transform(self, values):
+        return self.fit(values).transform(values)
+
+    def transform_one(self, value):
+        loc = self._index.get_indexer([value])[0]
+        return int(loc) if loc >= 0 else UNKNOWN_CODE
+
+    def inverse_transform(self, codes):
+        codes = np.asarray(codes)
+        out = np.full(codes.shape, None, dtype=object)
+        valid = (codes >= 0) & (codes < len(self.classes_))
+        out[valid] = self.classes_[codes[valid]]
+        return out
+
+
+# ------------------- Helpers -------------------
+def load_encoder(path):
+    return CategoryEncoder.from_label_encoder(joblib.load(path))
+
+
+def fit_encoders(df):
+    return {col: CategoryEncoder().fit(df[col]) for col in ENCODED_COLUMNS}
+
+
+def encode_frame(df, encoders):
+    # Encode every categorical column in one vectorized pass per column;
+    # a missing column encodes as unknown for every row.
+    for col, encoded_col in ENCODED_COLUMNS.items():
+        if col in df.columns:
+            df[encoded_col] = encoders[col].transform(df[col])
+        else:
+            df[encoded_col] = UNKNOWN_CODE
+    return df
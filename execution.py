@@ -0,0 +1,114 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# ------------------- Configuration -------------------
+EXECUTOR_KIND = os.getenv("MTA_EXECUTOR", "thread")
+EXECUTOR_WORKERS = int(os.getenv("MTA_EXECUTOR_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+EXECUTOR_QUEUE = int(os.getenv("MTA_EXECUTOR_QUEUE", "8"))
+EXECUTOR_TIMEOUT = float(os.getenv("MTA_EXECUTOR_TIMEOUT", "120"))
+
+
+class BackendBusy(Exception):
+    pass
+
+
+# ------------------- Execution Backend -------------------
+class ExecutionBackend:
+    """Bounded pool for CPU-bound request work (parsing, EDA, inference).
+
+    At most max_workers jobs run and max_queue wait; anything beyond that is
+    rejected immediately with BackendBusy so the event loop, health checks and
+    small requests are never stuck behind a backlog of large uploads.
+    """
+
+    def __init__(self, kind=EXECUTOR_KIND, max_workers=EXECUTOR_WORKERS,
+                 max_queue=EXECUTOR_QUEUE, timeout=EXECUTOR_TIMEOUT):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _executor(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    if self.kind == "process":
+                        # spawn: forking a process that already runs threads is unsafe
+                        self._pool = ProcessPoolExecutor(
+                            self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+                    else:
+                        self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="mta-work")
+        return self._pool
+
+    def _acquire(self):
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise BackendBusy(f"{self._in_flight} jobs in flight; try again shortly")
+            self._in_flight += 1
+            self.submitted += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+
+    def hold(self):
+        """Take a slot for work that runs outside the pool, such as a streamed response.
+
+        Raises BackendBusy like run(); returns a release function that is
+        safe to call more than once.
+        """
+        self._acquire()
+        released = threading.Lock()
+
+        def release():
+            if released.acquire(blocking=False):
+                self._release()
+        return release
+
+    async def run(self, fn, *args, timeout=None):
+        self._acquire()
+
+        # The slot is freed when the job really ends, not when the caller gives up
+        future = self._executor().submit(fn, *args)
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "timeout_seconds": self.timeout,
+            "in_flight": self._in_flight,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+backend = ExecutionBackend()
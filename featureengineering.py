@@ -1,14 +1,216 @@
-def add_features(df, is_training=True):
-    # Basic features
-    df['Conv Rate'] = df['Conversions'] / (df['Clicks'] + 1e-6)
-    df['CPC'] = df['Cost'] / (df['Clicks'] + 1e-6)
-    df['CPM'] = (df['Cost'] / (df['Impressions'] + 1e-6)) * 1000
-
-    # Always compute KPIs for training
-    df['ROI'] = (df['Revenue'] - df['Cost']) / (df['Cost'] + 1e-6)
-    df['Profit_Margin'] = (df['Revenue'] - df['Cost']) / (df['Revenue'] + 1e-6)
-    df['Revenue_per_Click'] = df['Revenue'] / (df['Clicks'] + 1e-6)
-    df['Revenue_per_Conversion'] = df['Revenue'] / (df['Conversions'] + 1e-6)
-
-    df.fillna(0, inplace=True)
+from functools import lru_cache
+import numpy as np
+from encoding import UNKNOWN_CODE
+
+EPS = 1e-6
+
+# ------------------- Feature Specification -------------------
+# Single source of truth for every derived value, used by training, batch
+# prediction and every API endpoint.
+#
+# The revenue basis is 'Revenue' = Cost + P&L, which equals the Revenue column
+# of the training data and is available at serving time; 'Profit' = P&L.
+# After prediction the same KPI ratios are evaluated on predicted revenue.
+
+# KPI ratios: name -> (numerator, denominator, scale)
+KPI_SPEC = {
+    'ROI': ('Profit', 'Cost', 1.0),
+    'Profit_Margin': ('Profit', 'Revenue', 1.0),
+    'CPM': ('Cost', 'Impressions', 1000.0),
+    'Revenue_per_Click': ('Revenue', 'Clicks', 1.0),
+    'Revenue_per_Conversion': ('Revenue', 'Conversions', 1.0),
+}
+
+# Model features in training order:
+# ('input', column) | ('ratio', numerator, denominator, scale) | ('kpi', name) | ('encoded', column)
+FEATURE_SPEC = {
+    'Impressions': ('input', 'Impressions'),
+    'Clicks': ('input', 'Clicks'),
+    'CTR': ('input', 'CTR'),
+    'Conversions': ('input', 'Conversions'),
+    'Conv Rate': ('ratio', 'Conversions', 'Clicks', 1.0),
+    'Cost': ('input', 'Cost'),
+    'CPC': ('ratio', 'Cost', 'Clicks', 1.0),
+    'Sale Amount': ('input', 'Sale Amount'),
+    'P&L': ('input', 'P&L'),
+    'ROI': ('kpi', 'ROI'),
+    'Profit_Margin': ('kpi', 'Profit_Margin'),
+    'CPM': ('kpi', 'CPM'),
+    'Revenue_per_Click': ('kpi', 'Revenue_per_Click'),
+    'Revenue_per_Conversion': ('kpi', 'Revenue_per_Conversion'),
+    'Ad_Group_Encoded': ('encoded', 'Ad Group'),
+    'Month_Encoded': ('encoded', 'Month'),
+}
+
+FEATURES = list(FEATURE_SPEC)
+
+# Raw columns the specification reads
+NUMERIC_INPUTS = ['Impressions', 'Clicks', 'CTR', 'Conversions', 'Cost', 'Sale Amount', 'P&L']
+CATEGORICAL_INPUTS = ['Ad Group', 'Month']
+
+# API field names (CampaignInput) -> raw column names
+FIELD_ALIASES = {'Sale_Amount': 'Sale Amount', 'PnL': 'P&L', 'Conv_Rate': 'Conv Rate', 'Ad_Group': 'Ad Group'}
+
+
+def columns_from_records(records):
+    # Column-wise arrays from API records, so single rows go through the same kernel
+    columns = {}
+    for field in records[0] if records else ():
+        values = [record[field] for record in records]
+        name = FIELD_ALIASES.get(field, field)
+        columns[name] = np.asarray(values, dtype=object if name in CATEGORICAL_INPUTS else np.float64)
+    return columns
+
+
+def _length(data):
+    return len(data) if hasattr(data, 'columns') else len(next(iter(data.values()), ()))
+
+
+def _numeric(data, name, n):
+    if name not in data:
+        return np.zeros(n)
+    values = data[name]
+    if hasattr(values, 'to_numpy'):
+        return values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.asarray(values, dtype=np.float64)
+
+
+# ------------------- Compiled Kernel -------------------
+class FeatureKernel:
+    """FEATURE_SPEC compiled for one feature order.
+
+    Calling the kernel writes every feature straight into a preallocated
+    float32 matrix, column by column through one float64 scratch buffer;
+    NaN becomes 0 as the training pipeline always did.
+    """
+
+    def __init__(self, features=FEATURES):
+        self.features = list(features)
+        self.steps = []
+        for name in self.features:
+            op, *args = FEATURE_SPEC[name]
+            if op == 'kpi':
+                op, args = 'ratio', list(KPI_SPEC[args[0]])
+            self.steps.append((op, args))
+
+    def _basis(self, data, n, revenue=None):
+        cache = {}
+
+        def column(name):
+            if name not in cache:
+                if name == 'Revenue':
+                    cache[name] = column('Cost') + column('P&L') if revenue is None else revenue
+                elif name == 'Profit':
+                    cache[name] = column('P&L') if revenue is None else revenue - column('Cost')
+                else:
+                    cache[name] = _numeric(data, name, n)
+            return cache[name]
+        return column
+
+    @staticmethod
+    def _ratio(column, numerator, denominator, scale, out):
+        np.add(column(denominator), EPS, out=out)
+        np.divide(column(numerator), out, out=out)
+        if scale != 1.0:
+            out *= scale
+        np.copyto(out, 0.0, where=np.isnan(out))
+        return out
+
+    def __call__(self, data, encoders, out=None):
+        n = _length(data)
+        if out is None:
+            out = np.empty((n, len(self.features)), dtype=np.float32)
+        column = self._basis(data, n)
+        scratch = np.empty(n)
+
+        for j, (op, args) in enumerate(self.steps):
+            if op == 'input':
+                np.copyto(scratch, column(args[0]))
+                np.copyto(scratch, 0.0, where=np.isnan(scratch))
+                out[:, j] = scratch
+            elif op == 'ratio':
+                out[:, j] = self._ratio(column, *args, out=scratch)
+            elif op == 'encoded':
+                col = args[0]
+                out[:, j] = encoders[col].transform(data[col]) if col in data else UNKNOWN_CODE
+        return out
+
+    def kpis(self, data, revenue):
+        # KPI_SPEC evaluated on a given (e.g. predicted) revenue
+        revenue = np.asarray(revenue, dtype=np.float64)
+        column = self._basis(data, len(revenue), revenue=revenue)
+        return {name: self._ratio(column, *spec, out=np.empty(len(revenue)))
+                for name, spec in KPI_SPEC.items()}
+
+
+@lru_cache(maxsize=16)
+def _kernel(features):
+    return FeatureKernel(features)
+
+
+def feature_kernel(features=FEATURES):
+    return _kernel(tuple(features))
+
+
+def build_features(data, encoders, features=FEATURES):
+    return feature_kernel(features)(data, encoders)
+
+
+def add_features(df):
+    # Frame-based helper kept for notebooks; model code calls build_features
+    kernel = feature_kernel([name for name, spec in FEATURE_SPEC.items() if spec[0] != 'encoded'])
+    X = kernel(df, encoders={})
+    for j, name in enumerate(kernel.features):
+        df[name] = X[:, j]
     return df
+
+
+# ------------------- Parity Check -------------------
+# Rows compared per check; the single-record path is the slow one
+PARITY_SAMPLE_ROWS = 2_000
+
+
+class FeatureParityError(ValueError):
+    pass
+
+
+def check_parity(df, encoders, features=FEATURES, sample_rows=PARITY_SAMPLE_ROWS):
+    """Raise FeatureParityError unless train- and serve-time features of `df` are bit-identical.
+
+    The frame path (training, CSV scoring) is compared with the API record
+    path, batched and one record at a time, on up to `sample_rows` rows
+    spread evenly over `df`. Training runs it on every fit and the
+    benchmark before any stage; returns the number of rows compared.
+    """
+    step = max(1, -(-len(df) // sample_rows))
+    df = df.iloc[::step]
+    train_X = build_features(df, encoders, features)
+
+    inverse = {v: k for k, v in FIELD_ALIASES.items()}
+    fields = NUMERIC_INPUTS + CATEGORICAL_INPUTS
+    records = [{inverse.get(c, c): row[c] for c in fields} for row in df[fields].to_dict(orient='records')]
+    serve_X = build_features(columns_from_records(records), encoders, features)
+    single_X = np.vstack([build_features(columns_from_records([r]), encoders, features) for r in records]) \
+        if records else serve_X
+
+    if train_X.shape != (len(df), len(features)):
+        raise FeatureParityError(f"training features have shape {train_X.shape}, "
+                                 f"expected {(len(df), len(features))}")
+    if not np.array_equal(train_X, serve_X, equal_nan=True):
+        raise FeatureParityError("batch serving features differ from training")
+    if not np.array_equal(train_X, single_X, equal_nan=True):
+        raise FeatureParityError("single-row serving features differ from training")
+    # The revenue basis reproduces the Revenue column used to train (it is rounded)
+    if 'Revenue' in df.columns and not np.allclose(df['Cost'] + df['P&L'], df['Revenue'], atol=0.5):
+        raise FeatureParityError("Cost + P&L does not reproduce the Revenue column")
+    return len(df)
+
+
+if __name__ == "__main__":
+    import sys
+    from dataio import read_frame, detect_format
+    from encoding import fit_encoders
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "data/final_shop_6modata.csv"
+    data = read_frame(path, detect_format(path))
+    print(f"Feature parity OK: {check_parity(data, fit_encoders(data))} rows x {len(FEATURES)} features")
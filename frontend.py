@@ -1,33 +1,133 @@
+import hashlib
+import os
 import streamlit as st
 import pandas as pd
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import matplotlib.pyplot as plt
 import seaborn as sns
 
 # ---------------------------
 # Backend URLs
 # ---------------------------
-FASTAPI_URL = "http://127.0.0.1:8000"
+FASTAPI_URL = os.getenv("MTA_API_URL", "http://127.0.0.1:8000")
 EDA_URL = f"{FASTAPI_URL}/eda"
-PREDICT_CSV_URL = f"{FASTAPI_URL}/predict_from_csv"
+DATASETS_URL = f"{FASTAPI_URL}/datasets"
+MODEL_URL = f"{FASTAPI_URL}/admin/model"
 PREDICT_MANUAL_URL = f"{FASTAPI_URL}/predict_from_manual"
 
+UPLOAD_CHUNK_BYTES = 1 << 20
+PAGE_SIZES = [25, 50, 100, 250, 500]
+SORT_COLUMNS = ["Predicted_Revenue", "ROI", "Profit_Margin", "CPM", "Revenue_per_Click",
+                "Revenue_per_Conversion", "Cost", "Impressions", "Clicks", "Conversions"]
+
+# ---------------------------
+# Pooled HTTP Session
+# ---------------------------
+# Streamlit reruns this script on every widget change; the session (and its
+# keep-alive connection pool) is created once per server process instead.
+@st.cache_resource
+def http_session():
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(503,), allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def model_version():
+    response = http_session().get(MODEL_URL, timeout=10)
+    response.raise_for_status()
+    return response.json()["active"]["version"]
+
+
+def file_hash(data):
+    # Same id the backend's content-addressed dataset store assigns
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+# ---------------------------
+# Upload with Progress
+# ---------------------------
+class ProgressBody:
+    """Multipart body read by requests in chunks, advancing a progress bar."""
+
+    def __init__(self, name, data, progress):
+        boundary = f"mta-{file_hash(data)}"
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        head = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{name}"\r\n'
+                f'Content-Type: application/octet-stream\r\n\r\n').encode()
+        self.parts = memoryview(head + data + f"\r\n--{boundary}--\r\n".encode())
+        self.sent = 0
+        self.progress = progress
+
+    def __len__(self):
+        return len(self.parts)
+
+    def read(self, size=-1):
+        size = UPLOAD_CHUNK_BYTES if size is None or size < 0 else min(size, UPLOAD_CHUNK_BYTES)
+        chunk = self.parts[self.sent:self.sent + size].tobytes()
+        self.sent += len(chunk)
+        self.progress.progress(self.sent / len(self.parts), text=f"Uploading… {self.sent / 1e6:.1f} MB")
+        return chunk
+
+
+def ensure_dataset(uploaded_file):
+    """Upload once per file content; later reruns and pages only send the dataset id."""
+    data = uploaded_file.getvalue()
+    dataset_id = file_hash(data)
+    known = st.session_state.setdefault("datasets", {})
+    if dataset_id in known:
+        return dataset_id
+
+    session = http_session()
+    if session.get(f"{DATASETS_URL}/{dataset_id}", timeout=10).status_code != 200:
+        progress = st.progress(0.0, text="Uploading…")
+        body = ProgressBody(uploaded_file.name, data, progress)
+        response = session.post(DATASETS_URL, data=body, headers={"Content-Type": body.content_type},
+                                timeout=600)
+        progress.empty()
+        response.raise_for_status()
+        dataset_id = response.json()["dataset_id"]
+    known[dataset_id] = uploaded_file.name
+    return dataset_id
+
+
 # ---------------------------
-# Helper Function for File Upload
+# Cached Backend Calls
 # ---------------------------
-def upload_file(url, uploaded_file):
-    if uploaded_file is not None:
-        files = {"file": (uploaded_file.name, uploaded_file.getvalue(), "text/csv")}
+@st.cache_data(max_entries=32, show_spinner="Running EDA…")
+def fetch_eda(dataset_id):
+    response = http_session().post(EDA_URL, params={"dataset_id": dataset_id}, timeout=600)
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def fetch_page(dataset_id, version, offset, limit, sort_by, descending, ad_groups, months):
+    # `version` only keys the cache: a new model means new predictions
+    params = {"offset": offset, "limit": limit, "descending": descending,
+              "ad_group": list(ad_groups), "month": list(months)}
+    if sort_by:
+        params["sort_by"] = sort_by
+    response = http_session().get(f"{DATASETS_URL}/{dataset_id}/predictions", params=params, timeout=600)
+    response.raise_for_status()
+    page = response.json()
+    return pd.DataFrame(page["data"], columns=page["columns"]), page["total"], page["facets"]
+
+
+def show_error(e):
+    detail = None
+    if isinstance(e, requests.HTTPError) and e.response is not None:
         try:
-            response = requests.post(url, files=files, timeout=20)
-            return response
-        except requests.exceptions.RequestException as e:
-            st.error(f"Connection error: {e}")
-            return None
-    else:
-        st.warning("Please upload a CSV file.")
-        return None
+            detail = e.response.json().get("detail")
+        except ValueError:
+            detail = e.response.text
+    st.error(f"Error: {detail or e}")
+
 
 # ---------------------------
 # Streamlit UI
@@ -41,12 +141,15 @@ option = st.sidebar.radio("Choose an option", ["EDA on CSV", "Predict from CSV",
 # --------------------- EDA on CSV ---------------------
 if option == "EDA on CSV":
     st.header("Exploratory Data Analysis (EDA)")
-    uploaded_file = st.file_uploader("Upload CSV file", type="csv")
+    uploaded_file = st.file_uploader("Upload CSV file", type=["csv", "parquet", "arrow"])
     if uploaded_file:
-        response = upload_file(EDA_URL, uploaded_file)
-        if response and response.status_code == 200:
-            eda_data = response.json()
+        try:
+            eda_data = fetch_eda(ensure_dataset(uploaded_file))
+        except requests.RequestException as e:
+            show_error(e)
+            eda_data = None
 
+        if eda_data:
             # Extract processed data from backend
             shape = eda_data.get("Shape", None)
             missing_values = eda_data.get("Missing_Values", None)
@@ -87,22 +190,53 @@ if option == "EDA on CSV":
                 fig, ax = plt.subplots(figsize=(8, 5))
                 sns.heatmap(corr_df, cmap="coolwarm", annot=True, ax=ax)
                 st.pyplot(fig)
-        else:
-            st.error(f"Error: {response.status_code if response else 'No response'}")
+                plt.close(fig)
 
 # --------------------- Predict from CSV ---------------------
 if option == "Predict from CSV":
     st.subheader("Predict Revenue from CSV")
-    uploaded_file = st.file_uploader("Upload CSV for Prediction", type=["csv"], key="predict_csv")
-    if st.button("Predict from CSV"):
-        if uploaded_file:
-            response = upload_file(PREDICT_CSV_URL, uploaded_file)
-            if response and response.status_code == 200:
-                pred_result = response.json()
-                st.success("Prediction Results:")
-                st.write(pred_result)
-            else:
-                st.error(f"Error: {response.json() if response else 'No response'}")
+    uploaded_file = st.file_uploader("Upload CSV for Prediction", type=["csv", "parquet", "arrow"], key="predict_csv")
+    if uploaded_file:
+        try:
+            dataset_id = ensure_dataset(uploaded_file)
+            version = model_version()
+        except requests.RequestException as e:
+            show_error(e)
+            dataset_id = None
+
+        if dataset_id:
+            # Only the visible page is transferred; sorting and filtering run on the server
+            facets = st.session_state.get(("facets", dataset_id), {})
+            left, middle, right = st.columns(3)
+            sort_by = left.selectbox("Sort by", ["(file order)"] + SORT_COLUMNS, index=1)
+            descending = middle.toggle("Descending", value=True)
+            page_size = right.selectbox("Rows per page", PAGE_SIZES, index=2)
+            ad_groups = st.multiselect("Ad Group", facets.get("Ad Group", []))
+            months = st.multiselect("Month", facets.get("Month", []))
+
+            filter_key = (dataset_id, sort_by, descending, page_size, tuple(ad_groups), tuple(months))
+            if st.session_state.get("page_filter") != filter_key:
+                st.session_state["page_filter"] = filter_key
+                st.session_state["page"] = 1
+            page_number = st.session_state.get("page", 1)
+
+            try:
+                page, total, facets = fetch_page(
+                    dataset_id, version, (page_number - 1) * page_size, page_size,
+                    None if sort_by == "(file order)" else sort_by, descending,
+                    tuple(ad_groups), tuple(months))
+            except requests.RequestException as e:
+                show_error(e)
+                page = None
+
+            if page is not None:
+                if ("facets", dataset_id) not in st.session_state:
+                    st.session_state[("facets", dataset_id)] = facets
+                    st.rerun()
+                pages = max(1, -(-total // page_size))
+                st.success(f"Predictions for {total:,} rows (model {version})")
+                st.dataframe(page, use_container_width=True, hide_index=True)
+                st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, step=1, key="page")
 
 # --------------------- Manual Prediction ---------------------
 if option == "Manual Prediction":
@@ -111,9 +245,9 @@ if option == "Manual Prediction":
     # User inputs
     impressions = st.number_input("Impressions", min_value=0)
     clicks = st.number_input("Clicks", min_value=0)
-    ctr = st.number_input("CTR (%)", min_value=0.0, format="%.2f")
+    ctr = st.number_input("CTR (%)", min_value=0.0, max_value=100.0, format="%.2f")
     conversions = st.number_input("Conversions", min_value=0)
-    conv_rate = st.number_input("Conversion Rate (%)", min_value=0.0, format="%.2f")
+    conv_rate = st.number_input("Conversion Rate (%)", min_value=0.0, max_value=100.0, format="%.2f")
     cost = st.number_input("Cost", min_value=0.0, format="%.2f")
     cpc = st.number_input("CPC", min_value=0.0, format="%.2f")
     sale_amount = st.number_input("Sale Amount", min_value=0.0, format="%.2f")
@@ -125,9 +259,10 @@ if option == "Manual Prediction":
         input_data = {
             "Impressions": impressions,
             "Clicks": clicks,
-            "CTR": ctr,
+            # Percent on screen, fractions in the API and the training data
+            "CTR": ctr / 100,
             "Conversions": conversions,
-            "Conv_Rate": conv_rate,
+            "Conv_Rate": conv_rate / 100,
             "Cost": cost,
             "CPC": cpc,
             "Sale_Amount": sale_amount,
@@ -136,7 +271,7 @@ if option == "Manual Prediction":
             "Month": month
         }
         try:
-            response = requests.post(PREDICT_MANUAL_URL, json=input_data, timeout=20)
+            response = http_session().post(PREDICT_MANUAL_URL, json=input_data, timeout=20)
             if response.status_code == 200:
                 st.success("Manual Prediction Result:")
                 st.write(response.json())
@@ -0,0 +1,361 @@
+import os
+import numpy as np
+import pandas as pd
+from dataio import read_frame, iter_frames, read_unit
+
+# ------------------- Campaign Schema -------------------
+# Storage dtype of every campaign column. Counts are whole numbers far inside
+# int32 and the labels repeat, so both narrow; every decimal column stays
+# float64 so values echoed back to clients read exactly as they were sent
+# (0.41, not 0.4099999964). Only the model's feature matrix is float32.
+CAMPAIGN_SCHEMA = {
+    'Ad Group': 'category',
+    'Month': 'category',
+    'Impressions': 'int32',
+    'Clicks': 'int32',
+    'CTR': 'float64',
+    'Conversions': 'int32',
+    'Conv Rate': 'float64',
+    'Cost': 'float64',
+    'CPC': 'float64',
+    'Revenue': 'float64',
+    'Sale Amount': 'float64',
+    'P&L': 'float64',
+}
+
+COUNT_COLUMNS = [col for col, dtype in CAMPAIGN_SCHEMA.items() if dtype == 'int32']
+NUMERIC_COLUMNS = [col for col, dtype in CAMPAIGN_SCHEMA.items() if dtype != 'category']
+INT32_MAX = np.iinfo(np.int32).max
+
+# The CSV parser reads counts as float64: a blank, fractional or oversized count
+# then reaches the rules instead of failing the parse or wrapping around in int32
+PARSE_DTYPES = {col: 'float64' if dtype == 'int32' else dtype for col, dtype in CAMPAIGN_SCHEMA.items()}
+
+# Revenue should equal Cost + P&L; the source data rounds Revenue to whole units
+REVENUE_TOLERANCE = 1.0
+
+ON_INVALID = ('keep', 'drop', 'quarantine', 'raise')
+REJECTED_RULE_COLUMN = 'Rejected_Rule'
+
+# frame.attrs key: {column: rows whose text conform() could not read as a number}
+MALFORMED_ATTR = 'malformed_cells'
+
+
+class InvalidRows(ValueError):
+    pass
+
+
+# ------------------- Typed Parsing -------------------
+def parse_dtypes(columns=None):
+    return {col: dtype for col, dtype in PARSE_DTYPES.items() if columns is None or col in columns}
+
+
+def text_dtypes(columns=None):
+    # Fallback when a strict parse meets a malformed number: numeric columns
+    # are read as text and coerced, so the bad value rejects its row, not the file
+    return {col: 'category' if dtype == 'category' else object for col, dtype in parse_dtypes(columns).items()}
+
+
+def conform(df):
+    """Cast schema columns of `df` to their storage dtypes.
+
+    Text that is not a number becomes NaN and is recorded per column in
+    df.attrs[MALFORMED_ATTR] for the malformed_value rule. A count column
+    holding a NaN, a fraction or a value beyond int32 stays float64 until
+    those rows are gone. Columns outside the schema are left alone.
+    """
+    malformed = {}
+    for col, dtype in CAMPAIGN_SCHEMA.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if dtype == 'category':
+            df[col] = df[col].astype('category')
+            continue
+        raw = df[col]
+        values = pd.to_numeric(raw, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        if raw.dtype == object or pd.api.types.is_string_dtype(raw.dtype):
+            unparsed = np.isnan(values) & raw.notna().to_numpy()
+            if unparsed.any():
+                malformed[col] = unparsed
+        if dtype == 'int32':
+            whole = np.isfinite(values).all() and (values == np.round(values)).all() \
+                and np.abs(values).max(initial=0) <= INT32_MAX
+            df[col] = values.astype(np.int32) if whole else values
+        else:
+            with np.errstate(over='ignore'):
+                df[col] = values.astype(dtype)
+    if malformed:
+        # Conforming twice (read, then validate) keeps what the first pass found
+        previous = df.attrs.get(MALFORMED_ATTR) or {}
+        df.attrs[MALFORMED_ATTR] = {**{col: mask for col, mask in previous.items() if len(mask) == len(df)},
+                                    **malformed}
+    return df
+
+
+def _retry_as_text(error, source):
+    # Only a value the typed parser could not convert is worth a second, text
+    # read; undecodable or badly tokenized input fails the same way again
+    if isinstance(error, (UnicodeDecodeError, pd.errors.ParserError)):
+        return False
+    if hasattr(source, 'seek'):
+        source.seek(0)
+        return True
+    return isinstance(source, (str, os.PathLike))
+
+
+def read_typed(source, fmt='csv', columns=None):
+    """read_frame with the schema's dtypes passed to the CSV parser; other formats are cast after reading."""
+    if fmt != 'csv':
+        return conform(read_frame(source, fmt, columns))
+    try:
+        return conform(read_frame(source, fmt, columns, dtype=parse_dtypes(columns)))
+    except (ValueError, TypeError) as e:
+        if not _retry_as_text(e, source):
+            raise
+        return conform(read_frame(source, fmt, columns, dtype=text_dtypes(columns)))
+
+
+def iter_typed(source, fmt='csv', chunk_rows=50_000, columns=None):
+    # iter_frames with schema dtypes; after a malformed number the rest of the
+    # file is re-read as text, skipping the rows already yielded
+    if fmt != 'csv':
+        for frame in iter_frames(source, fmt, chunk_rows, columns):
+            yield conform(frame)
+        return
+    done = 0
+    try:
+        for frame in iter_frames(source, fmt, chunk_rows, columns, dtype=parse_dtypes(columns)):
+            done += len(frame)
+            yield conform(frame)
+    except (ValueError, TypeError) as e:
+        if not _retry_as_text(e, source):
+            raise
+        for frame in iter_frames(source, fmt, chunk_rows, columns, dtype=text_dtypes(columns),
+                                 skiprows=range(1, done + 1)):
+            yield conform(frame)
+
+
+def read_unit_typed(source, fmt, index, columns=None, offset=0, rows=None):
+    return conform(read_unit(source, fmt, index, columns, offset, rows))
+
+
+# ------------------- Rules -------------------
+# Each rule maps a conformed frame to a boolean mask of offending rows, or None
+# when the columns it needs are absent. All are whole-column numpy operations.
+def _numeric(df, columns):
+    present = [col for col in columns if col in df.columns]
+    if not present:
+        return None
+    return df[present].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _any(mask):
+    return None if mask is None else mask.any(axis=1)
+
+
+def _malformed(df):
+    # conform()'s record of unreadable text, if it still describes these rows
+    cells = df.attrs.get(MALFORMED_ATTR) or {}
+    return {col: mask for col, mask in cells.items() if col in df.columns and len(mask) == len(df)}
+
+
+def malformed_value(df):
+    cells = _malformed(df)
+    return np.logical_or.reduce(list(cells.values())) if cells else None
+
+
+def missing_value(df):
+    # Blank cells only: a cell holding unreadable text is a malformed_value
+    present = [col for col in CAMPAIGN_SCHEMA if col in df.columns]
+    if not present:
+        return None
+    missing = df[present].isna().to_numpy()
+    for col, mask in _malformed(df).items():
+        missing[:, present.index(col)] &= ~mask
+    return missing.any(axis=1)
+
+
+def non_finite(df):
+    values = _numeric(df, NUMERIC_COLUMNS)
+    return _any(None if values is None else np.isinf(values))
+
+
+def invalid_count(df):
+    values = _numeric(df, COUNT_COLUMNS)
+    if values is None:
+        return None
+    with np.errstate(invalid='ignore'):
+        return _any((values < 0) | (values > INT32_MAX) | (np.isfinite(values) & (values != np.round(values))))
+
+
+def negative_amount(df):
+    values = _numeric(df, ['Cost', 'Sale Amount', 'Revenue'])
+    with np.errstate(invalid='ignore'):
+        return _any(None if values is None else values < 0)
+
+
+def rate_out_of_range(df):
+    # CTR and Conv Rate are fractions, so a percentage-scaled file fails here; CPC is a price
+    fractions = _numeric(df, ['CTR', 'Conv Rate'])
+    price = _numeric(df, ['CPC'])
+    with np.errstate(invalid='ignore'):
+        masks = [m for m in (None if fractions is None else (fractions < 0) | (fractions > 1),
+                             None if price is None else price < 0) if m is not None]
+    return np.concatenate(masks, axis=1).any(axis=1) if masks else None
+
+
+def _exceeds(df, smaller, larger):
+    if smaller not in df.columns or larger not in df.columns:
+        return None
+    values = _numeric(df, [smaller, larger])
+    with np.errstate(invalid='ignore'):
+        return values[:, 0] > values[:, 1]
+
+
+def clicks_exceed_impressions(df):
+    return _exceeds(df, 'Clicks', 'Impressions')
+
+
+def conversions_exceed_clicks(df):
+    return _exceeds(df, 'Conversions', 'Clicks')
+
+
+def revenue_mismatch(df):
+    values = _numeric(df, ['Revenue', 'Cost', 'P&L'])
+    if values is None or values.shape[1] < 3:
+        return None
+    with np.errstate(invalid='ignore'):
+        return np.abs(values[:, 0] - values[:, 1] - values[:, 2]) > REVENUE_TOLERANCE
+
+
+RULES = {
+    'malformed_value': malformed_value,
+    'missing_value': missing_value,
+    'non_finite': non_finite,
+    'invalid_count': invalid_count,
+    'negative_amount': negative_amount,
+    'rate_out_of_range': rate_out_of_range,
+    'clicks_exceed_impressions': clicks_exceed_impressions,
+    'conversions_exceed_clicks': conversions_exceed_clicks,
+    'revenue_mismatch': revenue_mismatch,
+}
+
+
+def check(df, rules=RULES):
+    # (rule names, rows x rules mask) for the rules that apply to df's columns
+    masks = {name: rule(df) for name, rule in rules.items()}
+    masks = {name: mask for name, mask in masks.items() if mask is not None}
+    if not masks:
+        return [], np.zeros((len(df), 0), dtype=bool)
+    return list(masks), np.column_stack(list(masks.values()))
+
+
+# ------------------- Rejection -------------------
+class IngestReport:
+    """Per-rule rejection counts, mergeable across chunks and processes.
+
+    A row failing several rules counts once in `rejected` and once under
+    every rule it failed.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.rejected = 0
+        self.rules = dict.fromkeys(RULES, 0)
+
+    def update(self, names, mask):
+        self.rows += len(mask)
+        self.rejected += int(mask.any(axis=1).sum())
+        for name, count in zip(names, mask.sum(axis=0).tolist()):
+            self.rules[name] = self.rules.get(name, 0) + count
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.rejected += other.rejected
+        for name, count in other.rules.items():
+            self.rules[name] = self.rules.get(name, 0) + count
+        return self
+
+    def summary(self):
+        return {
+            'rows': self.rows,
+            'accepted': self.rows - self.rejected,
+            'rejected': self.rejected,
+            'rules': {name: count for name, count in self.rules.items() if count},
+        }
+
+    def __str__(self):
+        rules = ', '.join(f"{name}: {count}" for name, count in self.summary()['rules'].items())
+        return f"{self.rejected} of {self.rows} rows rejected" + (f" ({rules})" if rules else "")
+
+
+def validate(df, on_invalid='drop', report=None):
+    """Conform `df` and apply every rule in one vectorized pass.
+
+    on_invalid: 'keep' only counts, 'drop' removes failing rows, 'quarantine'
+    also returns them with the first rule they failed in Rejected_Rule, and
+    'raise' raises InvalidRows with the per-rule counts. Returns
+    (accepted, quarantined or None).
+    """
+    if on_invalid not in ON_INVALID:
+        raise ValueError(f"on_invalid must be one of {ON_INVALID}")
+    df = conform(df)
+    names, mask = check(df)
+    chunk_report = IngestReport().update(names, mask)
+    if report is not None:
+        report.merge(chunk_report)
+    if on_invalid == 'keep' or not chunk_report.rejected:
+        return df, None
+    if on_invalid == 'raise':
+        hint = "; rates must be fractions (0.41, not 41)" if chunk_report.rules['rate_out_of_range'] else ""
+        raise InvalidRows(f"{chunk_report}{hint}")
+
+    bad = mask.any(axis=1)
+    quarantined = None
+    if on_invalid == 'quarantine':
+        quarantined = df[bad].copy()
+        quarantined[REJECTED_RULE_COLUMN] = np.asarray(names, dtype=object)[mask[bad].argmax(axis=1)]
+    # Dropping a count's bad rows can let its column narrow to int32; every
+    # malformed row is gone, and with it the record of them
+    accepted = df[~bad].reset_index(drop=True)
+    accepted.attrs.pop(MALFORMED_ATTR, None)
+    return conform(accepted), quarantined
+
+
+def read_campaign(source, fmt='csv', columns=None, on_invalid='drop', report=None):
+    return validate(read_typed(source, fmt, columns), on_invalid, report)
+
+
+# ------------------- Memory -------------------
+def _default_dtype(series):
+    # What pandas infers without a schema: wide numbers, categories as plain strings
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.categories.dtype
+    return np.float64 if series.dtype.kind == 'f' else np.int64 if series.dtype.kind in 'iu' else series.dtype
+
+
+def memory_per_million_rows(df, sample_rows=100_000):
+    """MB per million rows of `df` as typed here vs. with pandas' default inference.
+
+    Measured on up to `sample_rows` rows and scaled; a categorical's dictionary
+    is a one-off cost and is counted once rather than per row.
+    """
+    sample = df.head(sample_rows)
+    rows = max(len(sample), 1)
+    typed = default = 0.0
+    for col in sample.columns:
+        series = sample[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            typed += series.cat.codes.memory_usage(index=False) / rows * 1e6 \
+                + series.cat.categories.memory_usage(deep=True)
+        else:
+            typed += series.memory_usage(index=False, deep=True) / rows * 1e6
+        default += series.astype(_default_dtype(series)).memory_usage(index=False, deep=True) / rows * 1e6
+    mb = 1024 * 1024
+    return {
+        'typed_mb': round(typed / mb, 1),
+        'default_mb': round(default / mb, 1),
+        'saved_mb': round((default - typed) / mb, 1),
+        'saved_fraction': round(1 - typed / default, 3) if default else 0.0,
+    }
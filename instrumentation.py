@@ -0,0 +1,302 @@
+import cProfile
+import contextvars
+import os
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# ------------------- Configuration -------------------
+PROFILE_MODE = os.getenv("MTA_PROFILE", "")  # "", "cprofile" or "tracemalloc"
+PROFILE_SAMPLE = float(os.getenv("MTA_PROFILE_SAMPLE", "1.0"))
+PROFILE_SLOW_MS = float(os.getenv("MTA_PROFILE_SLOW_MS", "1000"))
+PROFILE_DIR = os.getenv("MTA_PROFILE_DIR", "profiles")
+PROFILE_HEADER = "x-mta-profile"
+# The header lets any client turn on a profiler, so it is honoured only when enabled
+PROFILE_HEADER_ENABLED = os.getenv("MTA_PROFILE_HEADER", "0") == "1"
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+
+# ------------------- Metric Types -------------------
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, count, total) in sorted(self._series.items()):
+                for bound, c in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', f'{bound:g}')])} {c}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total:.6f}")
+        return lines
+
+
+class Gauge:
+    # Read at scrape time from a callback returning {label values tuple: value}
+    def __init__(self, name, documentation, labelnames, collect):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {float(value):g}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.register(Histogram(
+    "mta_stage_seconds", "Time spent per pipeline stage.", ("stage", "model_version")))
+STAGE_ROWS = metrics.register(Counter(
+    "mta_stage_rows_total", "Rows processed per pipeline stage; rate() over mta_stage_seconds_sum gives rows/s.",
+    ("stage", "model_version")))
+STAGE_ERRORS = metrics.register(Counter(
+    "mta_stage_errors_total", "Exceptions raised inside a pipeline stage.", ("stage", "exception")))
+REQUEST_SECONDS = metrics.register(Histogram(
+    "mta_request_seconds", "HTTP request latency.", ("method", "route", "status")))
+PROFILES_WRITTEN = metrics.register(Counter(
+    "mta_profiles_written_total", "Profiles dumped for slow requests.", ("mode",)))
+PROFILES_SKIPPED = metrics.register(Counter(
+    "mta_profiles_skipped_total", "Requests not profiled because another profile was running.", ("mode",)))
+
+# Label provider for the active model version, set by the app
+model_version = lambda: "none"  # noqa: E731
+
+
+# ------------------- Spans -------------------
+_capture = threading.local()
+
+
+def record(stage, seconds, rows=None, version=None):
+    # The version is resolved where the work ran, which may be a worker process
+    version = version or model_version()
+    spans = getattr(_capture, "spans", None)
+    if spans is not None:
+        spans.append((stage, seconds, rows, version))
+        return
+    labels = (stage, version)
+    STAGE_SECONDS.observe(seconds, labels)
+    if rows:
+        STAGE_ROWS.inc(labels, rows)
+
+
+def record_spans(spans):
+    for stage, seconds, rows, version in spans:
+        record(stage, seconds, rows, version)
+
+
+def stage_summary():
+    # {stage: {"seconds", "rows", "calls"}} across model versions, for CLI reports
+    summary = {}
+    with STAGE_SECONDS._lock:
+        for (stage, _), (_, count, total) in STAGE_SECONDS._series.items():
+            entry = summary.setdefault(stage, {"seconds": 0.0, "rows": 0, "calls": 0})
+            entry["seconds"] += total
+            entry["calls"] += count
+    with STAGE_ROWS._lock:
+        for (stage, _), rows in STAGE_ROWS._values.items():
+            summary.setdefault(stage, {"seconds": 0.0, "rows": 0, "calls": 0})["rows"] += int(rows)
+    return summary
+
+
+class Span:
+    """Times one pipeline stage; set `.rows` inside the block for throughput.
+
+    An exception leaving the block is counted per stage and tagged with
+    `mta_stage`, so the handler can say where a request failed. `version`
+    labels the span with the model that did the work when it is known.
+    """
+
+    def __init__(self, stage, rows=None, version=None):
+        self.stage = stage
+        self.rows = rows
+        self.version = version
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.stage, time.perf_counter() - self.started, self.rows, self.version)
+        if exc is not None:
+            STAGE_ERRORS.inc((self.stage, exc_type.__name__))
+            if getattr(exc, "mta_stage", None) is None:
+                exc.mta_stage = self.stage
+        return False
+
+
+def span(stage, rows=None, version=None):
+    return Span(stage, rows, version)
+
+
+def run_traced(fn, args, profile=None):
+    # Backend entry point: spans recorded in a worker (thread or process) are
+    # returned to the caller instead of landing in the worker's own registry
+    _capture.spans = spans = []
+    try:
+        with profiled(getattr(fn, "__name__", "job"), profile):
+            result = fn(*args)
+        return result, spans
+    except Exception as exc:
+        exc.mta_spans = spans
+        raise
+    finally:
+        _capture.spans = None
+
+
+# ------------------- Profiling Hook -------------------
+profile_mode = contextvars.ContextVar("mta_profile_mode", default=None)
+
+# One profiled request at a time per process: tracemalloc is process-wide and
+# overlapping profilers slow every request and skew each other's numbers
+_profile_slot = threading.Lock()
+
+
+def request_profile_mode(header_value=None):
+    # The header forces a mode for one request (with MTA_PROFILE_HEADER=1);
+    # MTA_PROFILE samples all requests
+    if PROFILE_HEADER_ENABLED and header_value in PROFILE_MODES:
+        return header_value
+    if PROFILE_MODE in PROFILE_MODES and random.random() < PROFILE_SAMPLE:
+        return PROFILE_MODE
+    return None
+
+
+@contextmanager
+def profile_slot(mode):
+    """Claim the profiling slot for a request: yields `mode`, or None when another profile is running."""
+    if mode not in PROFILE_MODES:
+        yield None
+        return
+    if not _profile_slot.acquire(blocking=False):
+        PROFILES_SKIPPED.inc((mode,))
+        yield None
+        return
+    try:
+        yield mode
+    finally:
+        _profile_slot.release()
+
+
+def _dump_path(label, suffix):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in label.strip("/")) or "root"
+    return os.path.join(PROFILE_DIR, f"{stamp}-{safe}-{os.getpid()}.{suffix}")
+
+
+@contextmanager
+def profiled(label, mode):
+    """Profile the block in this thread; keep the dump only if it took PROFILE_SLOW_MS or more.
+
+    cProfile output loads with pstats/snakeviz; tracemalloc snapshots with
+    tracemalloc.Snapshot.load. The dump path is left on the yielded dict.
+    """
+    result = {"path": None}
+    if mode not in PROFILE_MODES:
+        yield result
+        return
+
+    profiler = None
+    started_tracing = False
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one cProfile per interpreter; the request's covers this block
+            yield result
+            return
+    elif not tracemalloc.is_tracing():
+        tracemalloc.start(25)
+        started_tracing = True
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        slow = (time.perf_counter() - started) * 1000 >= PROFILE_SLOW_MS
+        if profiler is not None:
+            profiler.disable()
+            if slow:
+                result["path"] = _dump_path(label, "prof")
+                profiler.dump_stats(result["path"])
+        else:
+            if slow:
+                result["path"] = _dump_path(label, "tracemalloc")
+                tracemalloc.take_snapshot().dump(result["path"])
+            if started_tracing:
+                tracemalloc.stop()
+        if result["path"]:
+            PROFILES_WRITTEN.inc((mode,))
@@ -0,0 +1,370 @@
+import json
+import math
+import os
+import re
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from encoding import CategoryEncoder
+from featureengineering import KPI_SPEC
+from ingest import CAMPAIGN_SCHEMA
+
+# ------------------- Configuration -------------------
+CUBE_DIR = os.getenv("MTA_CUBE_DIR", "cubes")
+# A text column with more distinct values than this is an identifier, not a dimension
+MAX_DIMENSION_VALUES = int(os.getenv("MTA_CUBE_MAX_DIMENSION_VALUES", "10000"))
+# Cell spaces up to this size are grouped through a dense lookup table instead of a sort
+DENSE_CELLS = 1 << 20
+
+# ------------------- Cube Schema -------------------
+# Ad Group and Month always lead; any other text, categorical or boolean
+# column of the data becomes a further dimension. Only additive measures are
+# stored: rates and KPIs are ratios of sums, evaluated on read, so every
+# slice and roll-up is exact.
+DIMENSIONS = ['Ad Group', 'Month']
+MEASURES = ['Impressions', 'Clicks', 'Conversions', 'Cost', 'Revenue', 'Sale Amount', 'P&L']
+ROWS_MEASURE = 'Rows'
+CUBE_MEASURES = MEASURES + [ROWS_MEASURE]
+COUNT_MEASURES = ['Impressions', 'Clicks', 'Conversions', ROWS_MEASURE]
+MISSING = '(missing)'
+
+# KPI name -> (numerator, denominator, scale); the feature KPIs read Profit as P&L
+KPIS = {
+    'CTR': ('Clicks', 'Impressions', 1.0),
+    'Conv Rate': ('Conversions', 'Clicks', 1.0),
+    'CPC': ('Cost', 'Clicks', 1.0),
+    'CPA': ('Cost', 'Conversions', 1.0),
+    'ROAS': ('Revenue', 'Cost', 1.0),
+    **{name: ('P&L' if num == 'Profit' else num, 'P&L' if den == 'Profit' else den, scale)
+       for name, (num, den, scale) in KPI_SPEC.items()},
+}
+
+CUBE_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class InvalidCube(ValueError):
+    pass
+
+
+def dimensions_of(df, max_values=MAX_DIMENSION_VALUES):
+    dims = [col for col in DIMENSIONS if col in df.columns]
+    for col in df.columns:
+        if col in dims or col in CAMPAIGN_SCHEMA:
+            continue
+        dtype = df[col].dtype
+        if (isinstance(dtype, pd.CategoricalDtype) or dtype == object or dtype.kind == 'b'
+                or pd.api.types.is_string_dtype(dtype)) and df[col].nunique() <= max_values:
+            dims.append(col)
+    if not dims:
+        raise InvalidCube(f"No dimension columns; expected {DIMENSIONS} or other text columns")
+    return dims
+
+
+def measure_matrix(df):
+    # rows x CUBE_MEASURES float64; Revenue falls back to the feature basis Cost + P&L
+    columns = {col: df[col] for col in MEASURES if col in df.columns}
+    if 'Revenue' not in columns and 'Cost' in columns and 'P&L' in columns:
+        columns['Revenue'] = columns['Cost'] + columns['P&L']
+    missing = [col for col in MEASURES if col not in columns]
+    if missing:
+        raise InvalidCube(f"Missing measure columns: {missing}")
+    values = np.empty((len(df), len(CUBE_MEASURES)))
+    for j, col in enumerate(MEASURES):
+        values[:, j] = pd.to_numeric(columns[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    values[:, -1] = 1.0
+    # A blank measure adds nothing to its cell
+    return np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def _cells(codes, sizes):
+    # (distinct code rows, inverse). A small code space is grouped through a
+    # dense key table, a large one by sorting int64 keys, a huge one row-wise.
+    space = math.prod(sizes)
+    if space <= DENSE_CELLS:
+        keys = np.ravel_multi_index(codes.T, sizes) if len(codes) else np.zeros(0, dtype=np.intp)
+        present = np.flatnonzero(np.bincount(keys, minlength=space))
+        rank = np.zeros(space, dtype=np.intp)
+        rank[present] = np.arange(len(present))
+        cells = np.column_stack(np.unravel_index(present, sizes)) if len(sizes) else np.zeros((len(present), 0))
+        return cells.astype(np.int32), rank[keys]
+    if space < 2 ** 62:
+        keys = np.ravel_multi_index(codes.T, sizes) if len(codes) else np.zeros(0, dtype=np.int64)
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        return codes[first], inverse
+    return np.unique(codes, axis=0, return_inverse=True)
+
+
+def _sum_by(inverse, values, n):
+    out = np.empty((n, values.shape[1]))
+    for j in range(values.shape[1]):
+        out[:, j] = np.bincount(inverse, weights=values[:, j], minlength=n)
+    return out
+
+
+_KPI_NUMERATORS = [CUBE_MEASURES.index(num) for num, _, _ in KPIS.values()]
+_KPI_DENOMINATORS = [CUBE_MEASURES.index(den) for _, den, _ in KPIS.values()]
+_KPI_SCALES = np.array([scale for _, _, scale in KPIS.values()])
+
+
+def kpi_matrix(sums):
+    # Every KPI of every group in one divide (groups x KPIS); NaN where the denominator is zero
+    numerators = sums[:, _KPI_NUMERATORS] * _KPI_SCALES
+    denominators = sums[:, _KPI_DENOMINATORS]
+    out = np.full(numerators.shape, np.nan)
+    np.divide(numerators, denominators, out=out, where=denominators != 0)
+    return out
+
+
+# ------------------- KPI Cube -------------------
+class KPICube:
+    """Additive campaign measures summed per Ad Group x Month (x extra dimension) cell.
+
+    A cell is one row of two flat arrays: int32 dimension codes (cells x
+    dimensions, decoded through one CategoryEncoder per dimension) and float64
+    sums (cells x CUBE_MEASURES). update() folds in raw rows and merge()
+    another cube, both by regrouping cells, so cubes over shards or appended
+    batches merge exactly. query() reads only the cells.
+    """
+
+    def __init__(self, dimensions=None):
+        self.dimensions = None
+        self.vocab = {}
+        self.codes = np.zeros((0, 0), dtype=np.int32)
+        self.values = np.zeros((0, len(CUBE_MEASURES)))
+        self.rows = 0
+        self._lookup = {}
+        if dimensions:
+            self._set_dimensions(dimensions)
+
+    def _set_dimensions(self, dimensions):
+        self.dimensions = list(dimensions)
+        self.vocab = {dim: CategoryEncoder() for dim in self.dimensions}
+        self.codes = np.zeros((0, len(self.dimensions)), dtype=np.int32)
+        self._lookup = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        labels = sum(int(pd.Index(enc.classes_).memory_usage(deep=True)) for enc in self.vocab.values())
+        return self.codes.nbytes + self.values.nbytes + labels
+
+    def _codes_of(self, dim, values):
+        # Label -> code dicts, built on first query after the vocabulary last grew
+        lookup = self._lookup.get(dim)
+        if lookup is None:
+            lookup = self._lookup[dim] = {label: code for code, label in enumerate(self.vocab[dim].classes_)}
+        return [lookup[v] for v in map(str, values) if v in lookup]
+
+    def _sizes(self, dims):
+        return [max(len(self.vocab[dim]), 1) for dim in dims]
+
+    def _encode(self, dim, series):
+        # Work on the distinct labels only: each row costs one take
+        values = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+        labels = values.cat.categories.astype(str)
+        row_codes = values.cat.codes.to_numpy()
+        encoder = self.vocab[dim]
+        self._lookup.pop(dim, None)
+        missing = bool((row_codes < 0).any())
+        encoder.extend(list(labels) + ([MISSING] if missing else []))
+        # Code -1 (a blank) takes the last entry: MISSING's code
+        lookup = np.append(encoder.transform(labels), encoder.transform_one(MISSING) if missing else -1)
+        return lookup[row_codes]
+
+    def _add(self, codes, values):
+        codes = np.concatenate([self.codes, codes])
+        values = np.concatenate([self.values, values])
+        cells, inverse = _cells(codes, self._sizes(self.dimensions))
+        self.codes = cells.astype(np.int32, copy=False)
+        self.values = _sum_by(inverse, values, len(cells))
+
+    def update(self, df):
+        if self.dimensions is None:
+            self._set_dimensions(dimensions_of(df))
+        missing = [dim for dim in self.dimensions if dim not in df.columns]
+        if missing:
+            raise InvalidCube(f"Missing dimension columns: {missing}")
+        if len(df):
+            codes = np.column_stack([self._encode(dim, df[dim]) for dim in self.dimensions])
+            self._add(codes, measure_matrix(df))
+            self.rows += len(df)
+        return self
+
+    def merge(self, other):
+        if other.dimensions is None:
+            return self
+        if self.dimensions is None:
+            self._set_dimensions(other.dimensions)
+        if set(other.dimensions) != set(self.dimensions):
+            raise InvalidCube(f"Cube dimensions {other.dimensions} do not match {self.dimensions}")
+        codes = np.empty((len(other), len(self.dimensions)), dtype=np.int32)
+        for j, dim in enumerate(self.dimensions):
+            labels = other.vocab[dim].classes_
+            self.vocab[dim].extend(labels)
+            self._lookup.pop(dim, None)
+            codes[:, j] = self.vocab[dim].transform(labels)[other.codes[:, other.dimensions.index(dim)]]
+        self._add(codes, other.values)
+        self.rows += other.rows
+        return self
+
+    def copy(self):
+        cube = KPICube()
+        cube.dimensions = None if self.dimensions is None else list(self.dimensions)
+        cube.vocab = {dim: CategoryEncoder(enc.classes_) for dim, enc in self.vocab.items()}
+        cube.codes, cube.values, cube.rows = self.codes.copy(), self.values.copy(), self.rows
+        return cube
+
+    def query(self, by=(), filters=None, metrics=None, sort_by=None, top=None, descending=True):
+        """Roll the cells matching `filters` up to the `by` dimensions.
+
+        filters maps a dimension to the values to keep; metrics picks among
+        CUBE_MEASURES and KPIS (default: all). top keeps the first `top`
+        groups by sort_by (default Revenue). Returns {column: array}, one
+        entry per group, `by` columns first; pd.DataFrame() takes it as is.
+        """
+        dims = self.dimensions or []
+        by = list(dict.fromkeys(by or ()))
+        filters = {dim: values for dim, values in (filters or {}).items() if values}
+        unknown = [dim for dim in [*by, *filters] if dim not in dims]
+        if unknown:
+            raise InvalidCube(f"Unknown dimensions: {unknown}; the cube has {dims}")
+        metrics = list(dict.fromkeys(metrics or [*CUBE_MEASURES, *KPIS]))
+        if top is not None and sort_by is None:
+            sort_by = 'Revenue'
+        unknown = [name for name in [*metrics, *([sort_by] if sort_by else [])]
+                   if name not in CUBE_MEASURES and name not in KPIS and name not in by]
+        if unknown:
+            raise InvalidCube(f"Unknown metrics: {unknown}; available: {CUBE_MEASURES + list(KPIS)}")
+
+        mask = np.ones(len(self.codes), dtype=bool)
+        for dim, values in filters.items():
+            keep = np.zeros(len(self.vocab[dim]), dtype=bool)
+            keep[self._codes_of(dim, values)] = True
+            mask &= keep[self.codes[:, dims.index(dim)]]
+        codes, values = self.codes[mask], self.values[mask]
+        if by:
+            groups, inverse = _cells(codes[:, [dims.index(dim) for dim in by]], self._sizes(by))
+            sums = _sum_by(inverse, values, len(groups))
+        else:
+            groups, sums = np.zeros((1, 0), dtype=np.int32), values.sum(axis=0, keepdims=True)
+
+        kpis = kpi_matrix(sums)
+        columns = {dim: self.vocab[dim].classes_[groups[:, j]] for j, dim in enumerate(by)}
+        for name in [*metrics, *([sort_by] if sort_by and sort_by not in metrics else [])]:
+            if name in by:
+                continue
+            if name in KPIS:
+                columns[name] = kpis[:, list(KPIS).index(name)]
+            else:
+                values = sums[:, CUBE_MEASURES.index(name)]
+                columns[name] = values.astype(np.int64) if name in COUNT_MEASURES else values
+
+        if sort_by:
+            key = columns[sort_by]
+            if key.dtype == object:
+                order = np.argsort(key.astype(str), kind='stable')
+                order = order[::-1] if descending else order
+            else:
+                # NaN sorts last either way
+                order = np.argsort(-key if descending else key, kind='stable')
+            order = order[:top] if top is not None else order
+            columns = {name: values[order] for name, values in columns.items()}
+        return {name: columns[name] for name in [*by, *[name for name in metrics if name not in by]]}
+
+    def info(self):
+        return {
+            "dimensions": self.dimensions or [],
+            "cardinality": {dim: len(enc) for dim, enc in self.vocab.items()},
+            "cells": len(self),
+            "rows": self.rows,
+            "bytes": self.nbytes,
+            "measures": CUBE_MEASURES,
+            "kpis": list(KPIS),
+        }
+
+    # ------------------- Persistence -------------------
+    def save(self, path):
+        # Written whole and renamed, so a reader never loads a half-written cube
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {"dimensions": self.dimensions, "rows": self.rows,
+                "vocab": {dim: [str(c) for c in enc.classes_] for dim, enc in self.vocab.items()}}
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, codes=self.codes, values=self.values, meta=np.array(json.dumps(meta)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            cube = cls()
+            if meta["dimensions"] is not None:
+                cube._set_dimensions(meta["dimensions"])
+                cube.vocab = {dim: CategoryEncoder(classes) for dim, classes in meta["vocab"].items()}
+            cube.codes, cube.values, cube.rows = data["codes"], data["values"], meta["rows"]
+        return cube
+
+
+# ------------------- Cube Store -------------------
+class CubeStore:
+    """Named cubes grown by appends, held in memory and persisted under root as <name>.npz.
+
+    An append merges into a copy and swaps it in, so queries never see a half
+    merged cube; a cube another process appended to is reloaded on next use.
+    """
+
+    def __init__(self, root=CUBE_DIR):
+        self.root = Path(root)
+        self._cubes = {}
+        self._lock = threading.Lock()
+        self.appends = 0
+
+    def path(self, name):
+        if not CUBE_NAME.match(name):
+            raise InvalidCube("Cube names are 1-64 letters, digits, '-' or '_'")
+        return self.root / f"{name}.npz"
+
+    def get(self, name):
+        path = self.path(name)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise KeyError(name)
+        cached = self._cubes.get(name)
+        if cached is None or cached[1] != mtime:
+            cached = (KPICube.load(path), mtime)
+            self._cubes[name] = cached
+        return cached[0]
+
+    def append(self, name, cube):
+        path = self.path(name)
+        with self._lock:
+            try:
+                current = self.get(name).copy()
+            except KeyError:
+                current = KPICube()
+            current.merge(cube)
+            current.save(path)
+            self._cubes[name] = (current, path.stat().st_mtime_ns)
+            self.appends += 1
+        return current
+
+    def delete(self, name):
+        path = self.path(name)
+        with self._lock:
+            self._cubes.pop(name, None)
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                raise KeyError(name)
+
+    def stats(self):
+        names = sorted(p.stem for p in self.root.glob("*.npz")) if self.root.exists() else []
+        return {"root": str(self.root), "cubes": names, "loaded": sorted(self._cubes), "appends": self.appends}
+
+
+kpi_cubes = CubeStore()
@@ -0,0 +1,407 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import httpx
+import numpy as np
+
+# ------------------- Payloads -------------------
+FIELD_NAMES = {'Sale Amount': 'Sale_Amount', 'P&L': 'PnL', 'Conv Rate': 'Conv_Rate', 'Ad Group': 'Ad_Group'}
+
+ENDPOINTS = {
+    'manual': '/predict_from_manual',
+    'csv': '/predict_from_csv',
+    'eda': '/eda',
+}
+
+
+class Payloads:
+    """Request bodies per endpoint: synthetic rows, or a replayed request log.
+
+    A replay log is JSON lines of {"endpoint": "manual"|"csv"|"eda", and
+    either "json": {...} or "file": "<path to upload>"}.
+    """
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self._next = {name: 0 for name in bodies}
+
+    @classmethod
+    def synthetic(cls, manual_records=1000, csv_rows=1000, eda_rows=10_000, seed=42):
+        from synthdata import generate
+        df = generate(max(manual_records, csv_rows, eda_rows), seed=seed)
+        manual = json.loads(df.head(manual_records).drop(columns=['Revenue'])
+                            .rename(columns=FIELD_NAMES).to_json(orient='records'))
+        return cls({
+            'manual': [{'json': record} for record in manual],
+            'csv': [{'file': df.head(csv_rows).to_csv(index=False).encode()}],
+            'eda': [{'file': df.head(eda_rows).to_csv(index=False).encode()}],
+        })
+
+    @classmethod
+    def replay(cls, path):
+        bodies = {}
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                body = {'json': entry['json']} if 'json' in entry else {'file': open(entry['file'], 'rb').read()}
+                bodies.setdefault(entry['endpoint'], []).append(body)
+        return cls(bodies)
+
+    def next(self, endpoint):
+        bodies = self.bodies[endpoint]
+        i = self._next[endpoint]
+        self._next[endpoint] = (i + 1) % len(bodies)
+        return bodies[i]
+
+
+async def send(client, endpoint, body):
+    if 'json' in body:
+        return await client.post(ENDPOINTS[endpoint], json=body['json'])
+    return await client.post(ENDPOINTS[endpoint], files={'file': ('load.csv', body['file'], 'text/csv')})
+
+
+# ------------------- Server -------------------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers=1, port=None, env=None, timeout=60):
+    port = port or _free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app:app', '--host', '127.0.0.1', '--port', str(port),
+         '--workers', str(workers), '--log-level', 'warning'],
+        env={**os.environ, **(env or {})},
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+        try:
+            if httpx.get(url + '/', timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"uvicorn did not become ready within {timeout}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+class ProcessSampler:
+    """Samples CPU % and RSS of a process tree (uvicorn master + workers) from /proc."""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+        self.available = os.path.exists(f"/proc/{pid}/stat")
+
+    def _tree(self):
+        pids, children = [self.pid], {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+                except OSError:
+                    continue
+                children.setdefault(ppid, []).append(int(entry))
+        for pid in pids:
+            pids.extend(children.get(pid, []))
+        return pids
+
+    def _read(self):
+        ticks, rss = 0, 0
+        for pid in self._tree():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                ticks += int(fields[11]) + int(fields[12])
+                rss += int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+            except OSError:
+                continue
+        return ticks / os.sysconf('SC_CLK_TCK'), rss
+
+    def _loop(self):
+        started = time.monotonic()
+        cpu_before, _ = self._read()
+        while not self._stop.wait(self.interval):
+            cpu, rss = self._read()
+            self.samples.append({
+                't': round(time.monotonic() - started, 2),
+                'cpu_percent': round(100 * (cpu - cpu_before) / self.interval, 1),
+                'rss_mb': round(rss / (1024 * 1024), 1),
+            })
+            cpu_before = cpu
+
+    def __enter__(self):
+        if self.available:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        cpu = [s['cpu_percent'] for s in self.samples]
+        rss = [s['rss_mb'] for s in self.samples]
+        return {'cpu_percent_mean': round(float(np.mean(cpu)), 1), 'cpu_percent_max': max(cpu),
+                'rss_mb_max': max(rss), 'rss_mb_last': rss[-1]}
+
+
+# ------------------- Load generation -------------------
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.error_kinds = {}
+
+    def record(self, endpoint, seconds, ok, kind=None):
+        if ok:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+        else:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            self.error_kinds[kind] = self.error_kinds.get(kind, 0) + 1
+
+    def report(self, elapsed):
+        report = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            lat = np.array(self.latencies.get(endpoint, [])) * 1000
+            errors = self.errors.get(endpoint, 0)
+            total = len(lat) + errors
+            report[endpoint] = {
+                'requests': total,
+                'throughput_rps': round(len(lat) / elapsed, 2),
+                'error_rate': round(errors / total, 4) if total else 0.0,
+                **({f'p{q}_ms': round(float(np.percentile(lat, q)), 2) for q in (50, 95, 99)} if len(lat) else {}),
+                'max_ms': round(float(lat.max()), 2) if len(lat) else None,
+            }
+        return report
+
+
+def pick_endpoint(mix, rng):
+    return rng.choices(list(mix), weights=list(mix.values()))[0]
+
+
+async def _call(client, recorder, endpoint, body, started):
+    try:
+        response = await send(client, endpoint, body)
+        ok = response.status_code < 400
+        recorder.record(endpoint, time.perf_counter() - started, ok, None if ok else response.status_code)
+    except httpx.HTTPError as exc:
+        recorder.record(endpoint, time.perf_counter() - started, False, type(exc).__name__)
+
+
+async def closed_loop(url, payloads, mix, concurrency, duration, timeout=60, seed=0):
+    # `concurrency` virtual users, each sending its next request as soon as the last returns
+    recorder, rng = Recorder(), random.Random(seed)
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        async def user():
+            while time.perf_counter() < deadline:
+                endpoint = pick_endpoint(mix, rng)
+                await _call(client, recorder, endpoint, payloads.next(endpoint), time.perf_counter())
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    return recorder, time.perf_counter() - started
+
+
+async def open_loop(url, payloads, mix, rate, duration, max_in_flight=1000, timeout=60, seed=0):
+    # Poisson arrivals at `rate` req/s regardless of responses; latency counts from the
+    # scheduled send time, so queueing delay on the client is not hidden
+    recorder, rng = Recorder(), random.Random(seed)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    tasks = set()
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        scheduled = started
+        while scheduled < started + duration:
+            scheduled += rng.expovariate(rate)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            endpoint = pick_endpoint(mix, rng)
+            if len(tasks) >= max_in_flight:
+                recorder.record(endpoint, 0.0, False, 'client_saturated')
+                continue
+            task = asyncio.create_task(_call(client, recorder, endpoint, payloads.next(endpoint), scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    return recorder, time.perf_counter() - started
+
+
+def run_load(url, payloads, mix, args, server_pid=None):
+    sampler = ProcessSampler(server_pid, args.sample_interval) if server_pid else None
+    if args.warmup:
+        asyncio.run(closed_loop(url, payloads, mix, min(args.concurrency, 4), args.warmup, args.timeout))
+    with sampler or _Null():
+        if args.rate:
+            recorder, elapsed = asyncio.run(open_loop(url, payloads, mix, args.rate, args.duration,
+                                                      args.max_in_flight, args.timeout, args.seed))
+        else:
+            recorder, elapsed = asyncio.run(closed_loop(url, payloads, mix, args.concurrency, args.duration,
+                                                        args.timeout, args.seed))
+    return {
+        'elapsed_seconds': round(elapsed, 2),
+        'endpoints': recorder.report(elapsed),
+        'error_kinds': {str(k): v for k, v in recorder.error_kinds.items()},
+        'server': sampler.summary() if sampler else {},
+        'server_timeline': sampler.samples if sampler else [],
+    }
+
+
+class _Null:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+# ------------------- Saturation sweep -------------------
+def sweep(payloads, args):
+    """For each worker count and endpoint, raise concurrency until throughput stops growing.
+
+    The saturation point is the lowest concurrency reaching the best
+    throughput within 5%, before errors pass 1% or p99 passes the SLO.
+    """
+    results = []
+    for workers in args.sweep_workers:
+        process, url = start_server(workers, env=args.server_env)
+        try:
+            for endpoint in args.mix:
+                steps, best = [], None
+                for concurrency in args.sweep_concurrency:
+                    sampler = ProcessSampler(process.pid, args.sample_interval)
+                    with sampler:
+                        recorder, elapsed = asyncio.run(closed_loop(url, payloads, {endpoint: 1}, concurrency,
+                                                                    args.step_duration, args.timeout, args.seed))
+                    stats = recorder.report(elapsed).get(endpoint, {})
+                    step = {'concurrency': concurrency, **stats, **sampler.summary()}
+                    steps.append(step)
+                    print(f"workers={workers} {endpoint:<7} c={concurrency:<4} "
+                          f"{stats.get('throughput_rps', 0):>9.1f} rps  p99={stats.get('p99_ms')} ms  "
+                          f"errors={stats.get('error_rate', 0):.2%}  cpu={step.get('cpu_percent_mean')}%")
+                    healthy = stats.get('error_rate', 1) <= 0.01 and (stats.get('p99_ms') or 0) <= args.slo_ms
+                    if healthy and (best is None or stats['throughput_rps'] > best['throughput_rps'] * 1.05):
+                        best = step
+                    elif not healthy or concurrency >= 2 * best['concurrency']:
+                        break
+                results.append({'workers': workers, 'endpoint': endpoint, 'saturation': best, 'steps': steps})
+        finally:
+            stop_server(process)
+    return results
+
+
+# ------------------ Main ------------------
+
+def _mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _ints(text):
+    return [int(x) for x in text.split(',') if x]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP load test for the prediction API.")
+    parser.add_argument('--url', help="Target an already running server instead of starting app:app")
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn workers when starting the server")
+    parser.add_argument('--mix', type=_mix, default=_mix('manual=8,csv=1,eda=1'),
+                        help="Request mix as endpoint=weight, endpoints: " + ', '.join(ENDPOINTS))
+    parser.add_argument('--concurrency', type=int, default=16, help="Closed-loop virtual users")
+    parser.add_argument('--rate', type=float, help="Open-loop Poisson arrival rate (req/s) instead of closed loop")
+    parser.add_argument('--max-in-flight', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--manual-records', type=int, default=1000)
+    parser.add_argument('--csv-rows', type=int, default=1000, help="Rows per /predict_from_csv upload")
+    parser.add_argument('--eda-rows', type=int, default=10_000, help="Rows per /eda upload")
+    parser.add_argument('--replay', help="JSON-lines request log to replay instead of synthetic payloads")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sample-interval', type=float, default=0.5)
+    parser.add_argument('--server-env', type=json.loads, default={}, help='Extra server env as JSON, e.g. \'{"MTA_EXECUTOR": "process"}\'')
+    parser.add_argument('--sweep-workers', type=_ints, help="Sweep these worker counts, e.g. 1,2,4")
+    parser.add_argument('--sweep-concurrency', type=_ints, default=_ints('1,2,4,8,16,32,64,128'))
+    parser.add_argument('--step-duration', type=float, default=10)
+    parser.add_argument('--slo-ms', type=float, default=1000, help="p99 latency beyond which a step counts as saturated")
+    parser.add_argument('--output', default='loadtest_results.json')
+    return parser.parse_args(argv)
+
+
+def print_report(result):
+    print(f"{'endpoint':<10}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>9}")
+    for name, r in result['endpoints'].items():
+        print(f"{name:<10}{r['requests']:>10}{r['throughput_rps']:>10.1f}{r.get('p50_ms', 0):>10.1f}"
+              f"{r.get('p95_ms', 0):>10.1f}{r.get('p99_ms', 0):>10.1f}{r['max_ms'] or 0:>10.1f}{r['error_rate']:>9.2%}")
+    if result['server']:
+        s = result['server']
+        print(f"Server CPU mean {s['cpu_percent_mean']}% (max {s['cpu_percent_max']}%), RSS max {s['rss_mb_max']} MB")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    payloads = (Payloads.replay(args.replay) if args.replay
+                else Payloads.synthetic(args.manual_records, args.csv_rows, args.eda_rows, args.seed))
+    args.mix = {name: weight for name, weight in args.mix.items() if name in payloads.bodies}
+
+    if args.sweep_workers:
+        output = {'sweep': sweep(payloads, args)}
+        print("\nSaturation points:")
+        for r in output['sweep']:
+            best = r['saturation'] or {}
+            print(f"  workers={r['workers']} {r['endpoint']:<7} concurrency={best.get('concurrency')} "
+                  f"throughput={best.get('throughput_rps')} rps p99={best.get('p99_ms')} ms")
+    elif args.url:
+        output = run_load(args.url, payloads, args.mix, args)
+        print_report(output)
+    else:
+        process, url = start_server(args.workers, env=args.server_env)
+        try:
+            output = run_load(url, payloads, args.mix, args, server_pid=process.pid)
+        finally:
+            stop_server(process)
+        print_report(output)
+
+    with open(args.output, 'w') as f:
+        json.dump({'args': {k: v for k, v in vars(args).items()}, **output}, f, indent=2)
+    print(f"Results saved as {args.output}")
+
+
+if __name__ == "__main__":
+    main()
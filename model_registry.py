@@ -0,0 +1,319 @@
+import json
+import os
+import shutil
+import threading
+import time
+import warnings
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import xgboost as xgb
+
+from encoding import CategoryEncoder, load_encoder
+from tree_inference import FlatEnsemble
+
+# Bundle layout: <MODEL_DIR>/<version>/{model.ubj, vocab.json, manifest.json}
+# and <MODEL_DIR>/CURRENT holding the active version name.
+MODEL_DIR = os.getenv("MTA_MODEL_DIR", "models")
+MODEL_WATCH_SECONDS = float(os.getenv("MTA_MODEL_WATCH_SECONDS", "0"))
+# Bundles other than the active one kept loaded for work pinned to them
+PINNED_BUNDLES = int(os.getenv("MTA_PINNED_BUNDLES", "2"))
+# Most recent loads kept for /admin/model stats
+LOAD_HISTORY = int(os.getenv("MTA_MODEL_LOAD_HISTORY", "20"))
+
+# Inference backend: "xgboost", or "flat" to score up to FLAT_MAX_ROWS rows
+# with the NumPy tree walker (tree_inference) and larger batches with XGBoost
+INFERENCE_BACKEND = os.getenv("MTA_INFERENCE_BACKEND", "xgboost")
+FLAT_MAX_ROWS = int(os.getenv("MTA_FLAT_MAX_ROWS", "64"))
+CURRENT_FILE = "CURRENT"
+BOOSTER_FILE = "model.ubj"
+VOCAB_FILE = "vocab.json"
+MANIFEST_FILE = "manifest.json"
+
+# Pre-bundle artifacts, used when no bundle has been written yet
+LEGACY_MODEL = "xgb_model.pkl"
+LEGACY_ENCODERS = {"Ad Group": "le_adgroup.pkl", "Month": "le_month.pkl"}
+LEGACY_VERSION = "legacy"
+
+_PROCESS_START = time.perf_counter()
+
+
+# ------------------- Model Bundle -------------------
+class ModelBundle:
+    def __init__(self, booster, encoders, features, manifest, load_seconds=0.0, backend=INFERENCE_BACKEND):
+        self.booster = booster
+        self.encoders = encoders
+        self.features = list(features)
+        self.manifest = manifest
+        self.version = manifest["version"]
+        self.load_seconds = load_seconds
+        self.flat = None
+        self.flat_error = None
+        if backend == "flat":
+            self._build_flat()
+        elif backend != "xgboost":
+            raise ValueError(f"Unknown inference backend: {backend}")
+
+    def _build_flat(self):
+        # The flat ensemble is only used once it reproduces XGBoost's output
+        try:
+            flat = FlatEnsemble.from_booster(self.booster)
+            self.flat_error = flat.verify(self.booster)
+            self.flat = flat
+        except ValueError as e:
+            warnings.warn(f"Flat inference disabled for {self.version}: {e}")
+
+    @property
+    def backend(self):
+        return "flat" if self.flat is not None else "xgboost"
+
+    def predict(self, X):
+        if self.flat is not None and len(X) <= FLAT_MAX_ROWS:
+            return self.flat.predict(X)
+        # inplace_predict skips DMatrix construction and is thread-safe
+        return self.booster.inplace_predict(X)
+
+    def info(self):
+        return {
+            "version": self.version,
+            "load_seconds": round(self.load_seconds, 4),
+            "inference_backend": self.backend,
+            "flat_max_error": self.flat_error,
+            "features": self.features,
+            "vocab_sizes": {col: len(enc) for col, enc in self.encoders.items()},
+            "manifest": self.manifest,
+        }
+
+
+def _write_json(path, obj):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2, default=str)
+
+
+def _atomic_write_text(path, text):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+# Attempts at a unique version name when saves collide within the same microsecond
+SAVE_ATTEMPTS = 100
+
+
+def _new_version(attempt=0):
+    # UTC timestamp to the microsecond; sorts chronologically after older second-precision names
+    version = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S-%f")
+    return f"{version}-{attempt}" if attempt else version
+
+
+def _stage_bundle(staging, booster, encoders, features, metadata, version):
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+    booster.save_model(staging / BOOSTER_FILE)
+    _write_json(staging / VOCAB_FILE, {col: enc.classes_.tolist() for col, enc in encoders.items()})
+    _write_json(staging / MANIFEST_FILE, {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "features": list(features),
+        "xgboost_version": xgb.__version__,
+        "num_boosted_rounds": booster.num_boosted_rounds(),
+        "metadata": metadata or {},
+    })
+
+
+def save_bundle(model, encoders, features, metadata=None, root=MODEL_DIR, version=None, activate=True):
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+
+    # Write into a staging directory and rename, so readers never see a partial
+    # bundle. A generated name that is already taken (a concurrent or
+    # back-to-back save) is retried with a suffix; an explicit one is an error.
+    for attempt in range(SAVE_ATTEMPTS):
+        name = version or _new_version(attempt)
+        target = root / name
+        if target.exists():
+            if version:
+                raise FileExistsError(f"Model bundle '{version}' already exists in {root}")
+            continue
+        staging = root / f".{name}.staging"
+        _stage_bundle(staging, booster, encoders, features, metadata, name)
+        try:
+            # Renaming onto an existing directory fails, so only one writer wins a name
+            os.rename(staging, target)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if version or not target.exists():
+                raise
+            continue
+        break
+    else:
+        raise FileExistsError(f"No free model version name in {root} after {SAVE_ATTEMPTS} attempts")
+
+    if activate:
+        set_current_version(name, root)
+    return name
+
+
+def load_bundle(version, root=MODEL_DIR):
+    started = time.perf_counter()
+    path = Path(root) / version
+    if not (path / MANIFEST_FILE).exists():
+        raise FileNotFoundError(f"No model bundle '{version}' in {root}")
+
+    booster = xgb.Booster()
+    booster.load_model(path / BOOSTER_FILE)
+    with open(path / VOCAB_FILE, encoding="utf-8") as f:
+        encoders = {col: CategoryEncoder(classes) for col, classes in json.load(f).items()}
+    with open(path / MANIFEST_FILE, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    return ModelBundle(booster, encoders, manifest["features"], manifest,
+                       load_seconds=time.perf_counter() - started)
+
+
+def load_legacy_bundle():
+    started = time.perf_counter()
+    booster = joblib.load(LEGACY_MODEL).get_booster()
+
+    encoders = {}
+    for col, path in LEGACY_ENCODERS.items():
+        if os.path.exists(path):
+            encoders[col] = load_encoder(path)
+        else:
+            # Serve with every category treated as unknown rather than failing
+            warnings.warn(f"{path} not found; '{col}' will encode as unknown")
+            encoders[col] = CategoryEncoder()
+
+    manifest = {"version": LEGACY_VERSION, "source": LEGACY_MODEL}
+    return ModelBundle(booster, encoders, booster.feature_names or [], manifest,
+                       load_seconds=time.perf_counter() - started)
+
+
+def current_version(root=MODEL_DIR):
+    pointer = Path(root) / CURRENT_FILE
+    if pointer.exists():
+        return pointer.read_text(encoding="utf-8").strip() or None
+    return None
+
+
+def set_current_version(version, root=MODEL_DIR):
+    if not (Path(root) / version / MANIFEST_FILE).exists():
+        raise FileNotFoundError(f"No model bundle '{version}' in {root}")
+    _atomic_write_text(Path(root) / CURRENT_FILE, version)
+
+
+def list_versions(root=MODEL_DIR):
+    root = Path(root)
+    if not root.exists():
+        return []
+    return sorted(p.name for p in root.iterdir() if (p / MANIFEST_FILE).exists())
+
+
+# ------------------- Registry -------------------
+class ModelRegistry:
+    """Lazily loads the active bundle and hot-swaps it on reload.
+
+    Callers take a reference with get() and keep using it for the whole
+    request, so a swap never affects in-flight work; the old bundle is freed
+    once the last request holding it finishes.
+    """
+
+    def __init__(self, root=MODEL_DIR):
+        self.root = root
+        self._bundle = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._pinned = OrderedDict()
+        self.startup_seconds = None
+        self.loads = deque(maxlen=LOAD_HISTORY)
+
+    def _load(self, version):
+        bundle = load_bundle(version, self.root) if version else load_legacy_bundle()
+        self.loads.append({"version": bundle.version, "load_seconds": round(bundle.load_seconds, 4),
+                           "loaded_at": datetime.now(timezone.utc).isoformat()})
+        return bundle
+
+    def get(self):
+        bundle = self._bundle
+        if bundle is None:
+            with self._lock:
+                if self._bundle is None:
+                    self._bundle = self._load(current_version(self.root))
+                    self.startup_seconds = time.perf_counter() - _PROCESS_START
+                bundle = self._bundle
+        return bundle
+
+    def pinned(self, version):
+        """The bundle for `version`, whichever version is active here.
+
+        Work pinned in one process (or before a reload) runs on the model it
+        was pinned to: the active bundle when it matches, otherwise a loaded
+        copy kept in a small LRU next to it.
+        """
+        bundle = self.get()
+        if version is None or bundle.version == version:
+            return bundle
+        with self._lock:
+            bundle = self._pinned.get(version)
+            if bundle is not None:
+                self._pinned.move_to_end(version)
+                return bundle
+        bundle = self._load(None if version == LEGACY_VERSION else version)
+        with self._lock:
+            self._pinned[version] = bundle
+            while len(self._pinned) > PINNED_BUNDLES:
+                self._pinned.popitem(last=False)
+        return bundle
+
+    @property
+    def version(self):
+        return self.get().version
+
+    @property
+    def loaded_version(self):
+        # Active version without triggering a load (None before first use)
+        bundle = self._bundle
+        return bundle.version if bundle is not None else None
+
+    def reload(self, version=None):
+        # Load outside the lock; only the reference swap is serialized
+        bundle = self._load(version or current_version(self.root))
+        if version is not None:
+            set_current_version(version, self.root)
+        with self._lock:
+            self._bundle = bundle
+        return bundle
+
+    def watch(self, interval=MODEL_WATCH_SECONDS):
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                version = current_version(self.root)
+                loaded = self.loaded_version
+                if version and version != loaded:
+                    try:
+                        self.reload()
+                    except Exception as e:
+                        warnings.warn(f"Model reload to '{version}' failed: {e}")
+
+        self._watcher = threading.Thread(target=poll, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stats(self):
+        return {
+            "root": str(self.root),
+            "active_version": self.loaded_version,
+            "current_pointer": current_version(self.root),
+            "available_versions": list_versions(self.root),
+            "startup_seconds": round(self.startup_seconds, 4) if self.startup_seconds is not None else None,
+            "loads": list(self.loads),
+        }
+
+
+registry = ModelRegistry()
@@ -1,56 +1,329 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+import xgboost as xgb
 from sklearn.model_selection import train_test_split
-from xgboost import XGBRegressor
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-import joblib
-from featureengineering import add_features
-from preprocessing import encode_columns, load_data
-
-# Load and preprocess
-df = load_data('data/final_shop_6modata.csv')
-df = add_features(df, is_training=True)   # ✅ Now adds KPIs
-df, le_adgroup, le_month = encode_columns(df)
-
-# Features & target
-features = [
-    'Impressions', 'Clicks', 'CTR', 'Conversions', 'Conv Rate',
-    'Cost', 'CPC', 'Sale Amount', 'P&L',
-    'ROI', 'Profit_Margin', 'CPM', 'Revenue_per_Click', 'Revenue_per_Conversion',
-    'Ad_Group_Encoded', 'Month_Encoded'
-]
+from featureengineering import FEATURES, build_features, check_parity
+from preprocessing import load_data
+from encoding import fit_encoders
+from model_registry import save_bundle, load_bundle, current_version, set_current_version
+
+# Features (shared specification, see featureengineering) & target
+features = FEATURES
 
 target = 'Revenue'
 
-X = df[features]
-y = df[target]
-
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Model
-xgb_model = XGBRegressor(
-    n_estimators=100,
-    learning_rate=0.1,
-    max_depth=4,
-    random_state=42,
-    objective='reg:squarederror'
-)
-xgb_model.fit(X_train, y_train)
-
-# Evaluation
-y_pred = xgb_model.predict(X_test)
-mse = mean_squared_error(y_test, y_pred)
-rmse = np.sqrt(mse)
-mae = mean_absolute_error(y_test, y_pred)
-r2 = r2_score(y_test, y_pred)
-
-print(f"R² Score: {r2:.4f}")
-print(f"RMSE: {rmse:.2f}")
-print(f"MAE: {mae:.2f}")
-
-# Save model and encoders
-joblib.dump(xgb_model, "xgb_model.pkl")
-joblib.dump(le_adgroup, "le_adgroup.pkl")
-joblib.dump(le_month, "le_month.pkl")
-print("Model and encoders saved successfully!")
+# Parameters of the original fixed model, used when no search is requested
+BASE_PARAMS = {
+    'objective': 'reg:squarederror',
+    'tree_method': 'hist',
+    'learning_rate': 0.1,
+    'max_depth': 4,
+    'seed': 42,
+}
+BASE_ROUNDS = 100
+
+# Search space: ('choice', values) | ('uniform', lo, hi) | ('log', lo, hi)
+PARAM_SPACE = {
+    'max_depth': ('choice', [3, 4, 5, 6, 8]),
+    'learning_rate': ('log', 0.01, 0.3),
+    'subsample': ('uniform', 0.6, 1.0),
+    'colsample_bytree': ('uniform', 0.6, 1.0),
+    'min_child_weight': ('log', 0.5, 10.0),
+    'reg_lambda': ('log', 0.1, 10.0),
+}
+
+
+# ------------------ Data ------------------
+
+def build_dataset(path, on_invalid='raise'):
+    # Load and preprocess
+    df = load_data(path, on_invalid=on_invalid)
+    encoders = fit_encoders(df)
+    # A model is only saved if serving will compute exactly the features it trains on
+    check_parity(df, encoders, features)
+
+    X = build_features(df, encoders, features)
+    y = df[target].to_numpy(dtype=np.float32)
+    return X, y, encoders, data_slice(path, df, 'full')
+
+
+def data_slice(path, df, mode):
+    # Lineage record of the rows a model version was trained on
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return {
+        'source': str(path),
+        'sha256': digest.hexdigest(),
+        'mode': mode,
+        'rows': int(len(df)),
+        'months': sorted(df['Month'].dropna().unique().tolist()),
+    }
+
+
+# ------------------ Trials ------------------
+
+# Per-process training matrix, built once by the pool initializer and reused by every trial
+_DTRAIN = None
+
+
+def _init_worker(X, y):
+    global _DTRAIN
+    _DTRAIN = xgb.DMatrix(X, label=y, feature_names=features)
+
+
+def sample_params(rng, space=PARAM_SPACE):
+    params = {}
+    for name, spec in space.items():
+        if spec[0] == 'choice':
+            params[name] = spec[1][rng.integers(len(spec[1]))]
+        elif spec[0] == 'log':
+            params[name] = float(math.exp(rng.uniform(math.log(spec[1]), math.log(spec[2]))))
+        else:
+            params[name] = float(rng.uniform(spec[1], spec[2]))
+    return params
+
+
+def run_trial(trial_id, params, num_boost_round, nfold, early_stopping_rounds, n_jobs, seed):
+    started = time.perf_counter()
+    history = xgb.cv(
+        {**BASE_PARAMS, **params, 'nthread': n_jobs, 'eval_metric': 'rmse'},
+        _DTRAIN,
+        num_boost_round=num_boost_round,
+        nfold=nfold,
+        early_stopping_rounds=early_stopping_rounds,
+        seed=seed,
+        as_pandas=False,
+    )
+    best = len(history['test-rmse-mean'])
+    return {
+        'trial': trial_id,
+        'params': params,
+        'num_boost_round': num_boost_round,
+        'best_rounds': best,
+        'cv_rmse_mean': float(history['test-rmse-mean'][-1]),
+        'cv_rmse_std': float(history['test-rmse-std'][-1]),
+        'train_rmse_mean': float(history['train-rmse-mean'][-1]),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def run_trials(X, y, trials, num_boost_round, args):
+    # `trials` is a list of (trial_id, params); processes x n_jobs threads share the cores
+    jobs = [(tid, params, num_boost_round, args.folds, args.early_stopping, args.n_jobs, args.seed)
+            for tid, params in trials]
+    if args.workers <= 1:
+        _init_worker(X, y)
+        return [run_trial(*job) for job in jobs]
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(X, y)) as pool:
+        return list(pool.map(run_trial, *zip(*jobs)))
+
+
+def search(X, y, args):
+    rng = np.random.default_rng(args.seed)
+    candidates = [(i, sample_params(rng)) for i in range(args.trials)]
+
+    if args.search == 'random':
+        return run_trials(X, y, candidates, args.max_rounds, args)
+
+    # Successive halving: every rung keeps the best 1/eta configs and
+    # multiplies their boosting budget by eta, ending at max_rounds.
+    rungs = math.ceil(math.log(args.trials, args.eta))
+    report = []
+    for rung in range(rungs + 1):
+        budget = max(1, int(args.max_rounds / args.eta ** (rungs - rung)))
+        results = run_trials(X, y, candidates, budget, args)
+        for result in results:
+            result['rung'] = rung
+        report.extend(results)
+        if len(candidates) <= 1:
+            break
+        keep = max(1, len(candidates) // args.eta)
+        best_ids = {r['trial'] for r in sorted(results, key=lambda r: r['cv_rmse_mean'])[:keep]}
+        candidates = [(tid, params) for tid, params in candidates if tid in best_ids]
+    return report
+
+
+# ------------------ Incremental & Rollback ------------------
+
+def trained_months(manifest):
+    return {month for item in manifest.get('metadata', {}).get('lineage', []) for month in item['months']}
+
+
+def incremental(args):
+    # Continue boosting the active bundle on rows it has not seen yet
+    started = time.perf_counter()
+    parent_version = args.parent or current_version()
+    if parent_version is None:
+        raise SystemExit("No model bundle to continue from; run a full training first.")
+    parent = load_bundle(parent_version)
+
+    path = args.new_data or args.data
+    df = load_data(path, on_invalid=args.on_invalid)
+    if args.new_data is None:
+        # Data grows by Month: keep only months absent from the parent's lineage
+        df = df[~df['Month'].isin(trained_months(parent.manifest))]
+    if df.empty:
+        raise SystemExit(f"No new rows to train on relative to {parent_version}.")
+
+    # Extend vocabularies in place of refitting, so existing codes are stable
+    encoders = {col: type(enc)(enc.classes_).extend(df[col]) for col, enc in parent.encoders.items()}
+    check_parity(df, encoders, parent.features)
+    X = build_features(df, encoders, parent.features)
+    y = df[target].to_numpy(dtype=np.float32)
+
+    params = dict(parent.manifest.get('metadata', {}).get('params', BASE_PARAMS))
+    dnew = xgb.QuantileDMatrix(X, label=y, feature_names=parent.features)
+    before = float(np.sqrt(mean_squared_error(y, parent.booster.inplace_predict(X))))
+    booster = xgb.train({**params, 'nthread': args.n_jobs}, dnew,
+                        num_boost_round=args.rounds, xgb_model=parent.booster)
+    after = float(np.sqrt(mean_squared_error(y, booster.inplace_predict(X))))
+    elapsed = time.perf_counter() - started
+
+    print(f"New rows: {len(df)} (months: {sorted(df['Month'].unique().tolist())})")
+    print(f"RMSE on new rows: {before:.2f} -> {after:.2f}")
+
+    parent_meta = parent.manifest.get('metadata', {})
+    version = save_bundle(
+        booster,
+        encoders,
+        parent.features,
+        metadata={
+            'params': params,
+            'num_boost_round': booster.num_boosted_rounds(),
+            'added_rounds': args.rounds,
+            'train_rows': parent_meta.get('train_rows', 0) + len(df),
+            'metrics': {'new_rows_rmse_before': before, 'new_rows_rmse_after': after},
+            'training_seconds': round(elapsed, 3),
+            'parent': parent_version,
+            'lineage': parent_meta.get('lineage', []) + [data_slice(path, df, 'incremental')],
+        },
+    )
+    print(f"Model bundle {version} (parent {parent_version}) saved and activated! ({elapsed:.1f}s)")
+
+
+def rollback(target=None):
+    # Repoint CURRENT at `target`, or at the active bundle's parent
+    active = current_version()
+    if target is None:
+        if active is None:
+            raise SystemExit("No active model bundle to roll back.")
+        target = load_bundle(active).manifest.get('metadata', {}).get('parent')
+        if target is None:
+            raise SystemExit(f"Bundle {active} has no parent to roll back to.")
+    set_current_version(target)
+    print(f"Rolled back {active} -> {target}")
+
+
+# ------------------ Main ------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the revenue model and save a versioned bundle.")
+    parser.add_argument('--data', default='data/final_shop_6modata.csv')
+    parser.add_argument('--trials', type=int, default=0,
+                        help="Hyperparameter configurations to try (0 = train the fixed base model)")
+    parser.add_argument('--search', choices=['random', 'halving'], default='random')
+    parser.add_argument('--eta', type=int, default=3, help="Successive-halving reduction factor")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--max-rounds', type=int, default=1000)
+    parser.add_argument('--early-stopping', type=int, default=25)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="Parallel trial processes")
+    parser.add_argument('--n-jobs', type=int, default=2, help="XGBoost threads per trial")
+    parser.add_argument('--on-invalid', choices=['raise', 'drop', 'keep'], default='raise',
+                        help="Rows failing the ingest rules (rates are fractions: 0.41, not 41): stop with the "
+                             "rejection counts, drop them with a warning, or train on them")
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--report', default=None, help="Write the per-trial report to this JSON file")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Continue boosting the active bundle on new rows only")
+    parser.add_argument('--new-data', default=None,
+                        help="File holding only the new rows (default: months of --data not yet trained on)")
+    parser.add_argument('--parent', default=None, help="Bundle version to continue from (default: active)")
+    parser.add_argument('--rounds', type=int, default=50, help="Boosting rounds added by --incremental")
+    parser.add_argument('--rollback', nargs='?', const='', default=None, metavar='VERSION',
+                        help="Reactivate VERSION, or the active bundle's parent when omitted")
+    args = parser.parse_args(argv)
+    if args.eta < 2:
+        # Each rung keeps 1/eta of the configs; eta <= 1 never narrows the field
+        parser.error("--eta must be an integer greater than 1")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.rollback is not None:
+        return rollback(args.rollback or None)
+    if args.incremental:
+        return incremental(args)
+    started = time.perf_counter()
+
+    X, y, encoders, lineage = build_dataset(args.data, args.on_invalid)
+
+    # Train-test split
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=args.test_size, random_state=args.seed)
+
+    params, rounds, trials = dict(BASE_PARAMS), BASE_ROUNDS, []
+    if args.trials > 0:
+        trials = search(X_train, y_train, args)
+        for t in trials:
+            print(f"trial {t['trial']:>3} rounds={t['best_rounds']:>4} "
+                  f"cv_rmse={t['cv_rmse_mean']:.2f}±{t['cv_rmse_std']:.2f} ({t['seconds']:.2f}s)")
+        final_rung = [t for t in trials if t.get('rung', 0) == max(r.get('rung', 0) for r in trials)]
+        best = min(final_rung, key=lambda t: t['cv_rmse_mean'])
+        params.update(best['params'])
+        rounds = best['best_rounds']
+        print(f"Best trial {best['trial']}: {best['params']} ({rounds} rounds)")
+
+    # Final model on the training split, reusing one quantised matrix
+    dtrain = xgb.QuantileDMatrix(X_train, label=y_train, feature_names=features)
+    booster = xgb.train({**params, 'nthread': args.n_jobs * max(args.workers, 1)}, dtrain, num_boost_round=rounds)
+
+    # Evaluation
+    y_pred = booster.inplace_predict(X_test)
+    mse = mean_squared_error(y_test, y_pred)
+    rmse = np.sqrt(mse)
+    mae = mean_absolute_error(y_test, y_pred)
+    r2 = r2_score(y_test, y_pred)
+
+    print(f"R² Score: {r2:.4f}")
+    print(f"RMSE: {rmse:.2f}")
+    print(f"MAE: {mae:.2f}")
+
+    elapsed = time.perf_counter() - started
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'seconds': round(elapsed, 3), 'best_params': params, 'rounds': rounds,
+                       'trials': trials}, f, indent=2)
+
+    # Save model, encoder vocabularies and manifest as a versioned bundle
+    version = save_bundle(
+        booster,
+        encoders,
+        features,
+        metadata={
+            'params': params,
+            'num_boost_round': rounds,
+            'train_rows': len(X_train),
+            'test_rows': len(X_test),
+            'metrics': {'r2': float(r2), 'rmse': float(rmse), 'mae': float(mae)},
+            'search': {'trials': len(trials), 'strategy': args.search if trials else None},
+            'training_seconds': round(elapsed, 3),
+            'parent': None,
+            'lineage': [lineage],
+        },
+    )
+    print(f"Model bundle {version} saved and activated successfully! ({elapsed:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
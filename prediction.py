@@ -1,120 +1,281 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
 import pandas as pd
-import joblib
-from featureengineering import add_features
-
-# Load trained model & encoders
-xgb_model = joblib.load("xgb_model.pkl")
-le_adgroup = joblib.load("le_adgroup.pkl")
-le_month = joblib.load("le_month.pkl")
-
-# Required features for prediction
-features = [
-    'Impressions', 'Clicks', 'CTR', 'Conversions', 'Conv Rate',
-    'Cost', 'CPC', 'Sale Amount', 'P&L',
-    'ROI', 'Profit_Margin', 'CPM', 'Revenue_per_Click', 'Revenue_per_Conversion',
-    'Ad_Group_Encoded', 'Month_Encoded'
-]
+from featureengineering import feature_kernel, NUMERIC_INPUTS, CATEGORICAL_INPUTS
+from model_registry import registry, load_bundle, load_legacy_bundle, current_version, LEGACY_VERSION
+from preprocessing import load_data
+from dataio import detect_format, write_frame, unit_slices
+from ingest import iter_typed, read_unit_typed, validate, IngestReport, ON_INVALID
+from instrumentation import span, stage_summary, run_traced, record_spans
 
-# ------------------ Helper functions ------------------
+# Raw columns read from prediction inputs; every model feature derives from these
+INPUT_COLUMNS = NUMERIC_INPUTS + CATEGORICAL_INPUTS
 
-def encode_input(df):
-    # Encode 'Ad Group'
-    if 'Ad Group' in df.columns:
-        df['Ad_Group_Encoded'] = df['Ad Group'].apply(
-            lambda x: le_adgroup.transform([x])[0] if x in le_adgroup.classes_ else 0
-        )
-    else:
-        df['Ad_Group_Encoded'] = 0
-
-    # Encode 'Month'
-    if 'Month' in df.columns:
-        df['Month_Encoded'] = df['Month'].apply(
-            lambda x: le_month.transform([x])[0] if x in le_month.classes_ else 0
-        )
-    else:
-        df['Month_Encoded'] = 0
+KPI_COLUMNS = ['ROI', 'Profit_Margin', 'CPM', 'Revenue_per_Click', 'Revenue_per_Conversion']
 
-    return df
+# Batch scoring: shard names and the checkpoint that makes a run resumable
+SHARD_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+CHECKPOINT_FILE = '_checkpoint.json'
+# Bumped whenever chunk numbering changes, so an older checkpoint never resumes
+CHECKPOINT_VERSION = 2
+BATCH_CHUNK_ROWS = 200_000
+
+# ------------------ Helper functions ------------------
 
 def add_kpis(df, revenue_col='Predicted_Revenue'):
-    # Compute KPIs using predicted or actual revenue
-    df['ROI'] = df[revenue_col] / (df['Cost'] + 1e-6)
-    df['Profit_Margin'] = df['P&L'] / (df[revenue_col] + 1e-6)
-    df['CPM'] = df['Cost'] / (df['Impressions'] + 1e-6) * 1000
-    df['Revenue_per_Click'] = df[revenue_col] / (df['Clicks'] + 1e-6)
-    df['Revenue_per_Conversion'] = df[revenue_col] / (df['Conversions'] + 1e-6)
+    # Compute KPIs using predicted or actual revenue, as specified in featureengineering
+    for name, values in feature_kernel().kpis(df, df[revenue_col]).items():
+        df[name] = values
     return df
 
-# ------------------ Prediction functions ------------------
-
-def predict_csv(csv_path):
-    df = pd.read_csv(csv_path)
-    df = add_features(df, is_training=False)
-    df = encode_input(df)
+def predict_frame(df, bundle=None):
+    # Same compiled feature kernel as training and the API
+    bundle = bundle or registry.get()
+    with span('features', rows=len(df)):
+        X_input = feature_kernel(bundle.features)(df, bundle.encoders)
+    with span('predict', rows=len(df)):
+        df['Predicted_Revenue'] = bundle.predict(X_input)
+    with span('kpis', rows=len(df)):
+        return add_kpis(df, revenue_col='Predicted_Revenue')
 
-    # Fill missing features with 0
-    for col in features:
-        if col not in df.columns:
-            df[col] = 0
+def print_stage_timings():
+    for stage, s in stage_summary().items():
+        rate = f"{s['rows'] / s['seconds']:,.0f} rows/s" if s['rows'] and s['seconds'] else ""
+        print(f"  {stage:<10} {s['seconds'] * 1000:9.1f} ms  {rate}")
 
-    X_input = df[features]
-    df['Predicted_Revenue'] = xgb_model.predict(X_input)
-
-    # Compute KPIs using predicted revenue
-    df = add_kpis(df, revenue_col='Predicted_Revenue')
+# ------------------ Prediction functions ------------------
 
-    # Display results
-    cols_to_show = ['Ad Group', 'Month', 'Predicted_Revenue', 'ROI', 'Profit_Margin',
-                    'CPM', 'Revenue_per_Click', 'Revenue_per_Conversion']
-    print(df[cols_to_show])
+def predict_csv(csv_path, output_path="predicted_revenue_with_kpis.csv"):
+    # Input and output may be CSV, Parquet or Arrow IPC, chosen by extension
+    with span('parse') as parse:
+        df = load_data(csv_path, columns=INPUT_COLUMNS)
+        parse.rows = len(df)
+    df = predict_frame(df)
 
     # Save predictions
-    df.to_csv("predicted_revenue_with_kpis.csv", index=False)
-    print("Predictions saved as predicted_revenue_with_kpis.csv")
+    with span('serialize', rows=len(df)):
+        write_frame(df, output_path, fmt=detect_format(output_path))
+    print(f"{len(df)} predictions saved as {output_path}")
+    print("Stage timings:")
+    print_stage_timings()
 
 def predict_manual():
     print("Enter campaign details manually:")
     data = {}
 
-    numeric_cols = ['Impressions', 'Clicks', 'CTR', 'Conversions',
-                    'Cost', 'CPC', 'Sale Amount', 'P&L']
-    for col in numeric_cols:
+    for col in NUMERIC_INPUTS:
         val = input(f"{col}: ")
         data[col] = [float(val) if val else 0]
 
     data['Ad Group'] = [input("Ad Group: ") or "Unknown"]
     data['Month'] = [input("Month: ") or "Unknown"]
 
-    df = pd.DataFrame(data)
-    df = add_features(df, is_training=False)
-    df = encode_input(df)
-
-    # Fill missing features
-    for col in features:
-        if col not in df.columns:
-            df[col] = 0
-
-    X_input = df[features]
-    df['Predicted_Revenue'] = xgb_model.predict(X_input)
-
-    # Compute KPIs
-    df = add_kpis(df, revenue_col='Predicted_Revenue')
+    df = predict_frame(pd.DataFrame(data))
 
     # Display results
-    cols_to_show = ['Ad Group', 'Month', 'Predicted_Revenue', 'ROI', 'Profit_Margin',
-                    'CPM', 'Revenue_per_Click', 'Revenue_per_Conversion']
+    cols_to_show = ['Ad Group', 'Month', 'Predicted_Revenue'] + KPI_COLUMNS
     print("\nPrediction with KPIs:")
     print(df[cols_to_show])
 
+# ------------------ Batch Scoring ------------------
+
+# Per-process model bundle, loaded once by the pool initializer and reused for every chunk
+_BUNDLE = None
+
+def _init_worker(version):
+    global _BUNDLE
+    _BUNDLE = load_legacy_bundle() if version == LEGACY_VERSION else load_bundle(version)
+
+def shard_path(output_dir, index, fmt, prefix='part'):
+    return Path(output_dir) / f"{prefix}-{index:05d}{SHARD_EXTENSIONS[fmt]}"
+
+def write_shard(df, target, fmt):
+    # Shards appear atomically, so a killed run never leaves a partial one
+    tmp = target.with_name(f".{target.name}.tmp")
+    with span('serialize', rows=len(df)):
+        write_frame(df, str(tmp), fmt=fmt)
+    os.replace(tmp, target)
+
+def score_chunk(index, chunk, input_path, input_fmt, output_dir, output_fmt, on_invalid='quarantine', piece=None):
+    # `chunk` is a DataFrame for streamed input, None when the worker reads
+    # `piece` (row group / record batch, offset, rows) itself
+    started = time.perf_counter()
+    if chunk is None:
+        unit, offset, rows = piece
+        with span('parse') as parse:
+            chunk = read_unit_typed(input_path, input_fmt, unit, INPUT_COLUMNS, offset, rows)
+            parse.rows = len(chunk)
+    report = IngestReport()
+    with span('validate', rows=len(chunk)):
+        chunk, rejected = validate(chunk, on_invalid, report)
+    if rejected is not None:
+        write_shard(rejected, shard_path(output_dir, index, output_fmt, 'rejected'), output_fmt)
+    df = predict_frame(chunk, _BUNDLE)
+    write_shard(df, shard_path(output_dir, index, output_fmt), output_fmt)
+    return {'index': index, 'rows': len(df), 'seconds': time.perf_counter() - started, 'report': report}
+
+def _score_traced(*args):
+    return run_traced(score_chunk, args)
+
+def shard_files(output_dir):
+    return sorted(p for prefix in ('part', 'rejected') for ext in SHARD_EXTENSIONS.values()
+                  for p in Path(output_dir).glob(f"{prefix}-*{ext}"))
+
+def load_checkpoint(output_dir, fingerprint, restart=False):
+    """Chunks already scored into output_dir, {} when starting over.
+
+    Only shards listed in this tool's checkpoint are ever deleted (on
+    --restart); a directory holding other shard files is refused, so
+    pointing --output at the wrong place cannot remove anyone's data.
+    """
+    path = Path(output_dir) / CHECKPOINT_FILE
+    checkpoint = None
+    if path.exists():
+        with open(path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    if checkpoint is not None and not restart:
+        if checkpoint.get('fingerprint') != fingerprint:
+            raise SystemExit(f"{path} belongs to a different input, model or chunking; rerun with --restart.")
+        # Only chunks whose shard is still on disk count as done
+        return {int(i): rows for i, rows in checkpoint['completed'].items()
+                if shard_path(output_dir, int(i), fingerprint['output_format']).exists()}
+
+    listed = set()
+    if checkpoint is not None:
+        fmt = checkpoint.get('fingerprint', {}).get('output_format', fingerprint['output_format'])
+        listed = {shard_path(output_dir, int(i), fmt, prefix)
+                  for i in checkpoint.get('completed', {}) for prefix in ('part', 'rejected')}
+    unknown = [p for p in shard_files(output_dir) if p not in listed]
+    if unknown:
+        raise SystemExit(f"{output_dir} holds {len(unknown)} shard files no checkpoint accounts for "
+                         f"(e.g. {unknown[0].name}); use an empty directory or remove them first.")
+    for stale in listed:
+        stale.unlink(missing_ok=True)
+    if checkpoint is not None:
+        path.unlink()
+    return {}
+
+def save_checkpoint(output_dir, fingerprint, completed):
+    path = Path(output_dir) / CHECKPOINT_FILE
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': fingerprint, 'completed': {str(i): rows for i, rows in sorted(completed.items())}},
+                  f, indent=2)
+    os.replace(tmp, path)
+
+def batch_tasks(input_path, input_fmt, chunk_rows, done):
+    # Row groups / record batches, split into chunk_rows slices, are read by
+    # the workers; CSV and Arrow streams are read here in order and shipped as frames
+    pieces = unit_slices(input_path, input_fmt, chunk_rows)
+    if pieces is not None:
+        for index, piece in enumerate(pieces):
+            if index not in done:
+                yield index, None, piece
+        return
+    for index, chunk in enumerate(iter_typed(input_path, input_fmt, chunk_rows, columns=INPUT_COLUMNS)):
+        if index not in done:
+            yield index, chunk, None
+
+def score_batch(input_path, output_dir, input_fmt=None, output_fmt='parquet', chunk_rows=BATCH_CHUNK_ROWS,
+                workers=None, version=None, restart=False, on_invalid='quarantine'):
+    """Score a file into ordered shards with a process pool; resumable from a checkpoint.
+
+    Rows failing the ingest rules are handled per `on_invalid`; with
+    'quarantine' they land in rejected-NNNNN shards next to the predictions.
+    """
+    started = time.perf_counter()
+    input_fmt = input_fmt or detect_format(input_path)
+    # Pinned up front so every worker scores with the same bundle
+    version = version or current_version() or LEGACY_VERSION
+    workers = workers or os.cpu_count() or 1
+    stat = os.stat(input_path)
+    fingerprint = {
+        'checkpoint_version': CHECKPOINT_VERSION,
+        'input': os.path.abspath(input_path),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'input_format': input_fmt,
+        'output_format': output_fmt,
+        'chunk_rows': chunk_rows,
+        'model_version': version,
+        'on_invalid': on_invalid,
+    }
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    completed = load_checkpoint(output_dir, fingerprint, restart)
+    resumed = len(completed)
+    if resumed:
+        print(f"Resuming: {resumed} chunks already scored")
+
+    rows = 0
+    chunk_seconds = 0.0
+    report = IngestReport()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(version,)) as pool:
+        # At most two chunks per worker in flight keeps memory bounded for streamed input
+        pending = set()
+        tasks = batch_tasks(input_path, input_fmt, chunk_rows, completed)
+        while True:
+            for index, chunk, piece in tasks:
+                pending.add(pool.submit(_score_traced, index, chunk, input_path, input_fmt, output_dir, output_fmt,
+                                        on_invalid, piece))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result, spans = future.result()
+                record_spans(spans)
+                completed[result['index']] = result['rows']
+                rows += result['rows']
+                chunk_seconds += result['seconds']
+                report.merge(result['report'])
+            save_checkpoint(output_dir, fingerprint, completed)
+
+    elapsed = time.perf_counter() - started
+    scored = len(completed) - resumed
+    print(f"Model version: {version}")
+    print(f"Scored {rows:,} rows in {scored} chunks ({resumed} resumed) with {workers} workers "
+          f"in {elapsed:.2f}s: {rows / elapsed if elapsed else 0:,.0f} rows/s")
+    print(f"Ingest ({on_invalid}): {report}")
+    if scored:
+        print(f"Mean chunk time: {chunk_seconds / scored * 1000:.1f} ms; "
+              f"shards in {output_dir} ({len(completed)} total, {sum(completed.values()):,} rows)")
+    print("Stage timings (summed over workers):")
+    print_stage_timings()
+    return completed
+
 # ------------------ Main ------------------
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-score campaign rows into sharded prediction files.")
+    parser.add_argument('input', nargs='?', help="CSV, Parquet or Arrow IPC file to score")
+    parser.add_argument('--output', default='predictions', help="Directory for output shards and the checkpoint")
+    parser.add_argument('--input-format', choices=['csv', 'parquet', 'arrow'], default=None,
+                        help="Default: detected from the input extension")
+    parser.add_argument('--output-format', choices=list(SHARD_EXTENSIONS), default='parquet')
+    parser.add_argument('--chunk-rows', type=int, default=BATCH_CHUNK_ROWS,
+                        help="Rows per chunk; larger Parquet row groups and Arrow record batches are split")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--model-version', default=None, help="Bundle version to score with (default: active)")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and rescore every chunk")
+    parser.add_argument('--on-invalid', choices=ON_INVALID, default='quarantine',
+                        help="Rows failing the ingest rules (rates are fractions: 0.41, not 41): keep and "
+                             "score, drop, quarantine to rejected-NNNNN shards (default), or raise")
+    parser.add_argument('--manual', action='store_true', help="Enter one campaign interactively instead")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.manual:
+        return predict_manual()
+    if args.input is None:
+        raise SystemExit("An input file is required unless --manual is given.")
+    score_batch(args.input, args.output, args.input_format, args.output_format, args.chunk_rows,
+                args.workers, args.model_version, args.restart, args.on_invalid)
+
 if __name__ == "__main__":
-    mode = input("Select mode: 1 = CSV upload, 2 = Manual input: ")
-
-    if mode.strip() == "1":
-        csv_path = input("Enter path to CSV file: ")
-        predict_csv(csv_path)
-    elif mode.strip() == "2":
-        predict_manual()
-    else:
-        print("Invalid mode selected. Please choose 1 or 2.")
+    main()
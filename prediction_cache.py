@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# ------------------- Configuration -------------------
+CACHE_MAX_ENTRIES = int(os.getenv("MTA_CACHE_ENTRIES", "100000"))
+CACHE_MAX_MB = float(os.getenv("MTA_CACHE_MAX_MB", "0"))
+CACHE_TTL_SECONDS = float(os.getenv("MTA_CACHE_TTL_SECONDS", "0"))
+# Larger batches (bulk CSV, batch scoring) go straight to the model: hashing and
+# looking up every row costs more than predicting it
+CACHE_MAX_BATCH_ROWS = int(os.getenv("MTA_CACHE_MAX_BATCH_ROWS", "256"))
+
+# Approximate footprint of one entry: a 16 x float64 key plus dict/tuple overhead
+ENTRY_BYTES = 16 * 8 + 200
+
+
+def row_keys(X):
+    # Canonical per-row keys: float64, -0.0 folded into 0.0, one NaN bit pattern
+    X = np.asarray(X, dtype=np.float64) + 0.0
+    X = np.ascontiguousarray(np.where(np.isnan(X), np.nan, X))
+    return X.view(np.dtype((np.void, X.shape[1] * X.itemsize))).ravel().tolist()
+
+
+# ------------------- Prediction Cache -------------------
+class PredictionCache:
+    """LRU cache of predictions keyed on the feature vector and model version.
+
+    Entries belong to a single model version; seeing a different version
+    clears the cache, so a hot-swapped model never serves stale predictions.
+    Only batches of up to max_batch_rows rows use the cache. Lookups read the
+    dict without the lock; the lock only covers recency updates and writes.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_mb=CACHE_MAX_MB, ttl_seconds=CACHE_TTL_SECONDS,
+                 max_batch_rows=CACHE_MAX_BATCH_ROWS):
+        if max_mb > 0:
+            max_entries = min(max_entries, int(max_mb * 1024 * 1024 // ENTRY_BYTES))
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.max_batch_rows = max_batch_rows
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bypassed_rows = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            # A fresh dict, so lookups still reading the old one are unaffected
+            self._entries = OrderedDict()
+            self.version = version
+
+    def lookup(self, keys, version):
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            entries = self._entries
+        # Single dict reads are atomic, so concurrent lookups do not serialize here
+        found = [entries.get(key) for key in keys]
+        hit = np.fromiter((entry is not None and (not self.ttl or now - entry[1] <= self.ttl) for entry in found),
+                          dtype=bool, count=len(keys))
+        values = np.fromiter((entry[0] if ok else np.nan for entry, ok in zip(found, hit)),
+                             dtype=np.float32, count=len(keys))
+        hits = [key for key, ok in zip(keys, hit) if ok]
+        with self._lock:
+            if entries is self._entries:
+                for key in hits:
+                    if key in entries:
+                        entries.move_to_end(key)
+            self.hits += len(hits)
+            self.misses += len(keys) - len(hits)
+        return values, np.flatnonzero(~hit)
+
+    def store(self, keys, values, version):
+        now = time.monotonic()
+        with self._lock:
+            if version != self.version:
+                return
+            for key, value in zip(keys, values):
+                self._entries[key] = (float(value), now)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def predict(self, X, version, predict_fn):
+        # Only rows missing from the cache reach the model, in one batch
+        if not self.enabled or len(X) > self.max_batch_rows:
+            if self.enabled:
+                self.bypassed_rows += len(X)
+            return predict_fn(X)
+        X = np.asarray(X)
+        keys = row_keys(X)
+        values, missing = self.lookup(keys, version)
+        if len(missing):
+            # Duplicate vectors within the batch are scored once
+            first = {}
+            for i in missing:
+                first.setdefault(keys[i], i)
+            unique = np.fromiter(first.values(), dtype=np.intp, count=len(first))
+            preds = predict_fn(X[unique])
+            scored = dict(zip(first, preds))
+            values[missing] = [scored[keys[i]] for i in missing]
+            self.store(list(first), preds, version)
+        return values
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "model_version": self.version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "max_batch_rows": self.max_batch_rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "bypassed_rows": self.bypassed_rows,
+        }
+
+
+prediction_cache = PredictionCache()
@@ -1,21 +1,32 @@
-import pandas as pd
-from sklearn.preprocessing import LabelEncoder
+import warnings
+from encoding import fit_encoders, encode_frame
+from dataio import detect_format
+from ingest import read_campaign, IngestReport, memory_per_million_rows
 
-def load_data(path):
-    df = pd.read_csv(path)
+def load_data(path, columns=None, on_invalid='raise', report=None):
+    # CSV, Parquet or Arrow IPC, chosen by extension; optional column projection.
+    # Parsed with the campaign schema's dtypes; rows failing its rules (e.g.
+    # percentages where fractions belong) raise InvalidRows by default, so no
+    # row is lost silently ('drop' warns, 'keep' scores them anyway).
+    report = IngestReport() if report is None else report
+    df, _ = read_campaign(path, detect_format(path), columns, on_invalid, report)
+    if report.rejected and on_invalid == 'drop':
+        warnings.warn(f"{path}: {report}")
     return df
 
 def encode_columns(df):
-    le_adgroup = LabelEncoder()
-    le_month = LabelEncoder()
+    encoders = fit_encoders(df)
+    df = encode_frame(df, encoders)
     
-    df['Ad_Group_Encoded'] = le_adgroup.fit_transform(df['Ad Group'])
-    df['Month_Encoded'] = le_month.fit_transform(df['Month'])
-    
-    return df, le_adgroup, le_month
+    return df, encoders['Ad Group'], encoders['Month']
 
 def main():
-    df = load_data("data/final_shop_6modata.csv")
+    report = IngestReport()
+    df = load_data("data/final_shop_6modata.csv", report=report)
+    print(f"Ingest: {report}")
+    memory = memory_per_million_rows(df)
+    print(f"Memory per million rows: {memory['typed_mb']} MB typed vs {memory['default_mb']} MB inferred "
+          f"({memory['saved_mb']} MB, {memory['saved_fraction']:.0%} saved)")
     df, le_adgroup, le_month = encode_columns(df)
     print("Data loaded and encoded successfully")
     print(df.head())
@@ -0,0 +1,238 @@
+import itertools
+import numpy as np
+import pandas as pd
+from featureengineering import feature_kernel, FEATURE_SPEC, NUMERIC_INPUTS
+
+# ------------------- Levers -------------------
+# A level is one (Cost, Clicks, Impressions) multiplier triple for an Ad Group.
+# Clicks and Impressions follow Cost unless given, i.e. CPC and CPM hold.
+LEVERS = ('cost', 'clicks', 'impressions')
+MAX_SCENARIOS = 1_000_000
+
+# Budget allocation: per-group Cost multipliers searched on this grid
+ALLOCATION_MIN_MULTIPLIER = 0.5
+ALLOCATION_MAX_MULTIPLIER = 2.0
+ALLOCATION_STEPS = 31
+
+
+class InvalidScenario(ValueError):
+    pass
+
+
+def group_levels(spec):
+    # {"cost": [...], "clicks": [...], "impressions": [...]} -> (levels, 3) array,
+    # the product of the given lists
+    cost = spec.get('cost') or [1.0]
+    clicks = spec.get('clicks') or [None]
+    impressions = spec.get('impressions') or [None]
+    levels = [(c, c if k is None else k, c if i is None else i)
+              for c, k, i in itertools.product(cost, clicks, impressions)]
+    levels = np.asarray(levels, dtype=np.float64)
+    if (levels < 0).any():
+        raise InvalidScenario("Multipliers must be non-negative")
+    return levels
+
+
+# ------------------- Perturbation -------------------
+def perturb(base, rows, multipliers):
+    """Raw input columns of base `rows` under (cost, clicks, impressions) multipliers.
+
+    Volume follows Clicks: Conversions and Sale Amount scale with it (conversion
+    rate and order value hold), and so does the revenue basis Cost + P&L, so
+    P&L is rebuilt against the new Cost. CTR is rescaled by Clicks/Impressions;
+    CPC, CPM, Conv Rate and the KPIs are recomputed by the feature kernel.
+    """
+    cost_x, clicks_x, impressions_x = multipliers.T
+    cost = base['Cost'][rows] * cost_x
+    revenue = (base['Cost'][rows] + base['P&L'][rows]) * clicks_x
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ctr_x = np.where(impressions_x > 0, clicks_x / impressions_x, 0.0)
+    return {
+        'Impressions': base['Impressions'][rows] * impressions_x,
+        'Clicks': base['Clicks'][rows] * clicks_x,
+        'CTR': base['CTR'][rows] * ctr_x,
+        'Conversions': base['Conversions'][rows] * clicks_x,
+        'Cost': cost,
+        'Sale Amount': base['Sale Amount'][rows] * clicks_x,
+        'P&L': revenue - cost,
+    }
+
+
+def base_columns(df):
+    return {col: pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64) for col in NUMERIC_INPUTS}
+
+
+# ------------------- Response Curves -------------------
+def response_curves(bundle, df, levels_by_group):
+    """Predicted revenue and cost of every Ad Group at each of its levels.
+
+    The model scores rows independently and a row's features depend only on
+    its own Ad Group's levers, so total revenue is a sum of per-group curves.
+    Every (row, level) pair of every group is expanded into one feature matrix
+    and scored in a single predict call; scenarios are then combinations of
+    curve points. Groups missing from `levels_by_group` stay at 1.0.
+    """
+    groups = df['Ad Group'].astype(str).to_numpy()
+    names = list(dict.fromkeys(groups))
+    levels = [levels_by_group.get(name, np.ones((1, 3))) for name in names]
+    offsets = np.concatenate([[0], np.cumsum([len(lv) for lv in levels])])
+
+    # Row index, level id and multipliers of every expanded row, group by group
+    row_parts, level_parts, mult_parts = [], [], []
+    for g, name in enumerate(names):
+        rows = np.flatnonzero(groups == name)
+        k = len(levels[g])
+        row_parts.append(np.tile(rows, k))
+        level_parts.append(np.repeat(np.arange(k) + offsets[g], len(rows)))
+        mult_parts.append(np.repeat(levels[g], len(rows), axis=0))
+    rows = np.concatenate(row_parts)
+    level_id = np.concatenate(level_parts)
+    multipliers = np.concatenate(mult_parts)
+
+    kernel = feature_kernel(bundle.features)
+    columns = perturb(base_columns(df), rows, multipliers)
+    X = kernel(columns, bundle.encoders)
+    # Categorical codes are encoded once on the base rows and gathered
+    encoded = [j for j, name in enumerate(bundle.features) if FEATURE_SPEC[name][0] == 'encoded']
+    if encoded:
+        X[:, encoded] = kernel(df, bundle.encoders)[rows][:, encoded]
+
+    revenue = np.bincount(level_id, bundle.predict(X), minlength=offsets[-1])
+    cost = np.bincount(level_id, columns['Cost'], minlength=offsets[-1])
+    return names, levels, offsets, revenue, cost
+
+
+def baseline(bundle, df):
+    # Per-group revenue and cost with every lever at 1.0, in response_curves order
+    _, _, _, revenue, cost = response_curves(bundle, df, {})
+    return revenue, cost
+
+
+# ------------------- Scenario Grid -------------------
+def score_scenarios(bundle, df, grid, top=None):
+    """Every combination of the grid's per-group levels, scored and ranked by revenue."""
+    levels_by_group = {name: group_levels(spec) for name, spec in grid.items()}
+    unknown = sorted(set(levels_by_group) - set(df['Ad Group'].astype(str)))
+    if unknown:
+        raise InvalidScenario(f"Ad Groups not in the base rows: {unknown}")
+    names, levels, offsets, revenue, cost = response_curves(bundle, df, levels_by_group)
+    varied = [g for g, name in enumerate(names) if name in levels_by_group]
+
+    shape = [len(levels[g]) for g in varied]
+    count = int(np.prod(shape, dtype=np.float64)) if shape else 1
+    if count > MAX_SCENARIOS:
+        raise InvalidScenario(f"{count} scenarios exceed the limit of {MAX_SCENARIOS}")
+
+    # choice[s, i] = level of varied group i in scenario s
+    choice = np.indices(shape).reshape(len(shape), -1).T if shape else np.zeros((1, 0), dtype=np.int64)
+    fixed = [g for g in range(len(names)) if g not in varied]
+    fixed_revenue = revenue[offsets[fixed]].sum()
+    fixed_cost = cost[offsets[fixed]].sum()
+    points = choice + offsets[varied]
+    total_revenue = revenue[points].sum(axis=1) + fixed_revenue
+    total_cost = cost[points].sum(axis=1) + fixed_cost
+
+    base_revenue, base_cost = baseline(bundle, df)
+
+    out = {'Scenario': np.arange(count)}
+    for i, g in enumerate(varied):
+        chosen = levels[g][choice[:, i]]
+        for j, lever in enumerate(LEVERS):
+            if np.ptp(levels[g][:, j]) > 0:
+                out[f"{names[g]} | {lever}_x"] = chosen[:, j]
+    out['Total_Cost'] = total_cost
+    out['Predicted_Revenue'] = total_revenue
+    out['Revenue_Delta'] = total_revenue - base_revenue.sum()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out['ROI'] = (total_revenue - total_cost) / total_cost
+    result = pd.DataFrame(out)
+
+    order = np.argsort(-total_revenue, kind='stable')
+    if top is not None:
+        order = order[:top]
+    return result.iloc[order].reset_index(drop=True), float(base_revenue.sum()), float(base_cost.sum())
+
+
+# ------------------- Budget Allocation -------------------
+def hull_segments(cost, revenue):
+    # Upper concave hull of a (cost, revenue) curve from its cheapest point,
+    # as (start, end, extra cost, extra revenue) steps of decreasing slope
+    segments = []
+    current = 0
+    while current < len(cost) - 1:
+        ahead = np.arange(current + 1, len(cost))
+        ahead = ahead[cost[ahead] > cost[current]]
+        if not len(ahead):
+            break
+        slope = (revenue[ahead] - revenue[current]) / (cost[ahead] - cost[current])
+        best = ahead[len(slope) - 1 - np.argmax(slope[::-1])]
+        if slope.max() <= 0:
+            break
+        segments.append((current, best, cost[best] - cost[current], revenue[best] - revenue[current]))
+        current = best
+    return segments
+
+
+def allocate_budget(bundle, df, budget=None, min_multiplier=ALLOCATION_MIN_MULTIPLIER,
+                    max_multiplier=ALLOCATION_MAX_MULTIPLIER, steps=ALLOCATION_STEPS, groups=None):
+    """Greedy spend allocation across Ad Groups under a total Cost budget.
+
+    Each group's revenue curve over Cost multipliers comes from one batched
+    prediction; every group starts at min_multiplier, then hull segments are
+    bought in order of marginal revenue per unit of spend while the budget
+    lasts. Optimal when the curves are concave, a close bound otherwise.
+    The default budget is the current total spend, i.e. a pure reallocation.
+    """
+    if not 0 <= min_multiplier <= max_multiplier:
+        raise InvalidScenario("Need 0 <= min_multiplier <= max_multiplier")
+    names = list(dict.fromkeys(df['Ad Group'].astype(str)))
+    if groups is not None:
+        unknown = sorted(set(groups) - set(names))
+        if unknown:
+            raise InvalidScenario(f"Ad Groups not in the base rows: {unknown}")
+    levels = np.repeat(np.linspace(min_multiplier, max_multiplier, steps)[:, None], 3, axis=1)
+    tunable = set(names if groups is None else groups)
+    names, curves, offsets, revenue, cost = response_curves(
+        bundle, df, {name: levels for name in names if name in tunable})
+    base_revenue, base_cost = baseline(bundle, df)
+
+    budget = float(base_cost.sum()) if budget is None else float(budget)
+
+    chosen = np.zeros(len(names), dtype=np.int64)
+    segments = []
+    for g, name in enumerate(names):
+        start, end = offsets[g], offsets[g + 1]
+        if name in tunable:
+            segments.extend((dr / dc, g, a, b, dc) for a, b, dc, dr in hull_segments(cost[start:end], revenue[start:end]))
+    spend = float(cost[offsets[:-1]].sum())
+    if spend > budget:
+        raise InvalidScenario(f"Budget {budget:.2f} is below the minimum spend {spend:.2f} "
+                              f"at min_multiplier={min_multiplier}")
+
+    # A group's segments are taken in order; one that does not fit closes the group
+    blocked = set()
+    for _, g, a, b, dc in sorted(segments, key=lambda s: -s[0]):
+        if g in blocked or chosen[g] != a:
+            continue
+        if spend + dc > budget:
+            blocked.add(g)
+            continue
+        spend += dc
+        chosen[g] = b
+
+    points = offsets[:-1] + chosen
+    table = pd.DataFrame({
+        'Ad Group': names,
+        'Multiplier': [float(curves[g][chosen[g], 0]) for g in range(len(names))],
+        'Base_Cost': base_cost,
+        'Allocated_Cost': cost[points],
+        'Base_Revenue': base_revenue,
+        'Predicted_Revenue': revenue[points],
+    })
+    return {
+        'budget': budget,
+        'base': {'cost': float(table['Base_Cost'].sum()), 'revenue': float(table['Base_Revenue'].sum())},
+        'allocated': {'cost': float(table['Allocated_Cost'].sum()),
+                      'revenue': float(table['Predicted_Revenue'].sum())},
+        'groups': table,
+    }
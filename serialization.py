@@ -0,0 +1,190 @@
+import math
+import numpy as np
+import orjson
+import pandas as pd
+from dataio import MEDIA_TYPES as FRAME_MEDIA_TYPES, write_frame
+
+# ------------------- Formats -------------------
+FORMATS = ("json", "csv", "parquet", "arrow")
+MEDIA_TYPES = {"json": "application/json", **FRAME_MEDIA_TYPES}
+
+ACCEPT_FORMATS = {
+    "application/json": "json",
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/vnd.apache.arrow.stream": "arrow",
+}
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+class UnknownColumns(ValueError):
+    pass
+
+
+class NonFiniteValues(ValueError):
+    pass
+
+
+def negotiate(accept, default="json"):
+    """Pick an output format from an Accept header by q-value; None if nothing fits."""
+    if not accept:
+        return default
+    ranked = []
+    for position, part in enumerate(accept.split(",")):
+        media, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            ranked.append((-q, position, media.lower()))
+    for _, _, media in sorted(ranked):
+        if media in ACCEPT_FORMATS:
+            return ACCEPT_FORMATS[media]
+        if media in ("*/*", "application/*"):
+            return default
+    return None
+
+
+# ------------------- Frame Preparation -------------------
+def parse_columns(columns):
+    # "a,b" or ["a", "b"] -> list, None when not given
+    if columns is None:
+        return None
+    if isinstance(columns, str):
+        columns = columns.split(",")
+    return [col.strip() for col in columns if col.strip()] or None
+
+
+def select_columns(df, columns):
+    if columns is None:
+        return df
+    unknown = [col for col in columns if col not in df.columns]
+    if unknown:
+        raise UnknownColumns(f"Unknown output columns: {unknown}; available: {list(df.columns)}")
+    return df[columns]
+
+
+def handle_nonfinite(df, policy="null"):
+    """Make NaN/inf explicit: "null" writes them as null, "error" refuses them."""
+    floats = [col for col in df.columns if pd.api.types.is_float_dtype(df[col])]
+    if not floats:
+        return df
+    values = df[floats].to_numpy()
+    bad = ~np.isfinite(values)
+    if not bad.any():
+        return df
+    if policy == "error":
+        columns = [col for col, n in zip(floats, bad.sum(axis=0)) if n]
+        raise NonFiniteValues(f"Non-finite values (NaN/inf) in columns: {columns}")
+    # NaN is null in every output format; only infinities need replacing
+    infinite = np.isinf(values)
+    if not infinite.any():
+        return df
+    df = df.copy(deep=False)
+    for j in np.flatnonzero(infinite.any(axis=0)):
+        col = floats[j]
+        df[col] = df[col].where(~np.isinf(df[col]))
+    return df
+
+
+def nonfinite_paths(obj, path=()):
+    # Key paths of every NaN/inf in a nested summary of dicts, lists and arrays
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            yield from nonfinite_paths(value, (*path, key))
+    elif isinstance(obj, (list, tuple)):
+        for i, value in enumerate(obj):
+            yield from nonfinite_paths(value, (*path, i))
+    elif isinstance(obj, np.ndarray):
+        if obj.dtype.kind in "fc" and not np.isfinite(obj).all():
+            yield path
+        elif obj.dtype == object:
+            yield from nonfinite_paths(obj.tolist(), path)
+    elif isinstance(obj, (float, np.floating)) and not math.isfinite(obj):
+        yield path
+
+
+def handle_nonfinite_summary(summary, policy="null"):
+    """handle_nonfinite for nested JSON: orjson already writes NaN/inf as null."""
+    if policy == "error":
+        paths = [".".join(map(str, path)) for path in nonfinite_paths(summary)]
+        if paths:
+            raise NonFiniteValues(f"Non-finite values (NaN/inf) at: {paths}")
+    return summary
+
+
+# ------------------- Encoders -------------------
+def _column_list(series):
+    # orjson writes float NaN as null, so plain lists need no per-value cleanup
+    if series.dtype.kind in "biufO":
+        return series.tolist()
+    return series.astype(str).where(series.notna(), None).tolist()
+
+
+def columns_data(df):
+    # {"column": values}: numeric columns stay NumPy buffers for orjson, the rest become lists
+    return {col: df[col].to_numpy() if df[col].dtype.kind in "biuf" else _column_list(df[col])
+            for col in df.columns}
+
+
+def json_columns(df):
+    # Columnar JSON: {"column": [values...], ...}
+    return orjson.dumps(columns_data(df), option=ORJSON_OPTIONS)
+
+
+def json_records(df):
+    # Row-oriented JSON built from column lists, skipping DataFrame.to_dict boxing
+    names = list(df.columns)
+    rows = zip(*(_column_list(df[col]) for col in names))
+    return orjson.dumps([dict(zip(names, row)) for row in rows], option=ORJSON_OPTIONS)
+
+
+def encode_table(df, fmt="json", orient="records", nonfinite="null", columns=None):
+    """Encode a result frame as JSON (records or columns), CSV, Parquet or Arrow IPC."""
+    df = handle_nonfinite(select_columns(df, columns), nonfinite)
+    if fmt == "json":
+        return json_columns(df) if orient == "columns" else json_records(df)
+    return write_frame(df, fmt=fmt)
+
+
+def encode_json(obj):
+    return orjson.dumps(obj, option=ORJSON_OPTIONS)
+
+
+# ------------------- EDA Summary -------------------
+EDA_TABLES = {
+    "numeric_summary": "Numeric_Summary",
+    "correlation": "Correlation",
+    "missing_values": "Missing_Values",
+    "top_ad_groups": "Top_Ad_Groups",
+    "top_months": "Top_Months",
+}
+
+
+def eda_table(summary, table="numeric_summary"):
+    # One section of the EDA summary as a frame, for tabular formats
+    section = summary[EDA_TABLES[table]]
+    if table in ("numeric_summary", "correlation"):
+        df = pd.DataFrame(section)
+        return df.rename_axis("statistic" if table == "numeric_summary" else "column").reset_index()
+    return pd.DataFrame({"value": list(section), "count": list(section.values())})
+
+
+def encode_eda(summary, fmt="json", columns=None, table="numeric_summary", nonfinite="null"):
+    """JSON keeps the summary's nested shape (columns= picks sections); other formats get one table."""
+    if fmt == "json":
+        if columns is not None:
+            unknown = [section for section in columns if section not in summary]
+            if unknown:
+                raise UnknownColumns(f"Unknown EDA sections: {unknown}; available: {list(summary)}")
+            summary = {section: summary[section] for section in columns}
+        return encode_json(handle_nonfinite_summary(summary, nonfinite))
+    return encode_table(eda_table(summary, table), fmt, nonfinite=nonfinite, columns=columns)
@@ -0,0 +1,160 @@
+import argparse
+import time
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from dataio import detect_format, write_frames
+
+SOURCE_PATH = "data/final_shop_6modata.csv"
+COLUMNS = ['Ad Group', 'Month', 'Impressions', 'Clicks', 'CTR', 'Conversions', 'Conv Rate',
+           'Cost', 'CPC', 'Revenue', 'Sale Amount', 'P&L']
+
+# Per-row drivers sampled jointly; every other column derives from them
+DRIVERS = ['Log_Impressions', 'CTR', 'Conversions_per_Click', 'Conv Rate', 'CPC', 'ROAS', 'Order_Value']
+
+
+def _drivers(df):
+    clicks = df['Clicks'].clip(lower=1)
+    order_value = df['Sale Amount'] / df['Conversions'].where(df['Conversions'] > 0)
+    return pd.DataFrame({
+        'Log_Impressions': np.log(df['Impressions'].clip(lower=1)),
+        'CTR': df['Clicks'] / df['Impressions'].clip(lower=1),
+        'Conversions_per_Click': df['Conversions'] / clicks,
+        # The reported rate is its own column in the source, not Conversions / Clicks
+        'Conv Rate': df['Conv Rate'],
+        'CPC': df['Cost'] / clicks,
+        'ROAS': (df['Cost'] + df['P&L']) / df['Cost'].clip(lower=1),
+        'Order_Value': order_value.fillna(order_value.median()),
+    })
+
+
+# ------------------- Campaign Profile -------------------
+class CampaignProfile:
+    """Smoothed bootstrap of a reference file in normal-score (copula) space.
+
+    Every synthetic row starts from a random reference row: it keeps that
+    row's Ad Group and Month, so cardinalities and frequencies match, and
+    its drivers (impressions, CTR, conversion rate, CPC, revenue per cost,
+    order value) are the reference normal scores plus shrunk Gaussian
+    jitter. Ranks map the scores back through the empirical quantiles, so
+    marginals and the joint rank structure match the source at any row
+    count while values stay continuous.
+    """
+
+    def __init__(self, ad_groups, months, scores, quantiles, bandwidth=0.25):
+        self.ad_groups = np.asarray(ad_groups, dtype=object)
+        self.months = np.asarray(months, dtype=object)
+        self.scores = np.asarray(scores)
+        self.quantiles = np.asarray(quantiles)
+        self.bandwidth = bandwidth
+
+    @classmethod
+    def fit(cls, df, bandwidth=0.25):
+        drivers = _drivers(df)
+        ranks = drivers.rank(method='first').to_numpy() / (len(df) + 1)
+        return cls(
+            ad_groups=df['Ad Group'].to_numpy(dtype=object),
+            months=df['Month'].to_numpy(dtype=object),
+            scores=np.vectorize(NormalDist().inv_cdf)(ranks),
+            quantiles=np.sort(drivers.to_numpy(), axis=0),
+            bandwidth=bandwidth,
+        )
+
+    @classmethod
+    def from_path(cls, path=SOURCE_PATH):
+        return cls.fit(pd.read_csv(path))
+
+    def _marginal(self, u, j):
+        # Linear interpolation between the sorted reference values
+        values = self.quantiles[:, j]
+        return np.interp(u * (len(values) - 1), np.arange(len(values)), values)
+
+    def sample(self, rows, rng):
+        row = rng.integers(len(self.scores), size=rows)
+        h = self.bandwidth
+        z = self.scores[row] * np.sqrt(1 - h * h) + h * rng.standard_normal((rows, len(DRIVERS)))
+        u = _uniform_ranks(z)
+        d = {name: self._marginal(u[:, j], j) for j, name in enumerate(DRIVERS)}
+
+        impressions = np.maximum(np.rint(np.exp(d['Log_Impressions'])), 1)
+        clicks = np.maximum(np.rint(impressions * d['CTR']), 1)
+        conversions = np.rint(clicks * d['Conversions_per_Click'])
+        cost = np.maximum(np.rint(clicks * d['CPC']), 1)
+        revenue = cost * d['ROAS']
+        sale_amount = np.round(conversions * d['Order_Value'], 2)
+
+        return pd.DataFrame({
+            'Ad Group': self.ad_groups[row],
+            'Month': self.months[row],
+            'Impressions': impressions.astype(np.int64),
+            'Clicks': clicks.astype(np.int64),
+            'CTR': np.round(clicks / impressions, 2),
+            'Conversions': conversions.astype(np.int64),
+            'Conv Rate': np.round(d['Conv Rate'], 2),
+            'Cost': cost.astype(np.int64),
+            'CPC': np.round(cost / clicks, 2),
+            'Revenue': np.rint(revenue).astype(np.int64),
+            'Sale Amount': sale_amount,
+            'P&L': np.round(revenue - cost, 3),
+        }, columns=COLUMNS)
+
+
+def _uniform_ranks(z):
+    # Column ranks of the jittered scores -> uniforms carrying their rank structure
+    u = np.empty_like(z)
+    for j in range(z.shape[1]):
+        u[np.argsort(z[:, j]), j] = (np.arange(len(z)) + 0.5) / len(z)
+    return u
+
+
+# ------------------- Generation -------------------
+def iter_synthetic(rows, profile=None, seed=42, chunk_rows=1_000_000):
+    # Chunk i is seeded by (seed, i): the same rows come out for any chunk size split
+    profile = profile or CampaignProfile.from_path()
+    for i, start in enumerate(range(0, rows, chunk_rows)):
+        yield profile.sample(min(chunk_rows, rows - start), np.random.default_rng([seed, i]))
+
+
+def generate(rows, profile=None, seed=42):
+    return pd.concat(list(iter_synthetic(rows, profile, seed)), ignore_index=True)
+
+
+def write_synthetic(path, rows, profile=None, seed=42, chunk_rows=1_000_000, fmt=None):
+    return write_frames(iter_synthetic(rows, profile, seed, chunk_rows), path, fmt or detect_format(path))
+
+
+def compare(reference, synthetic):
+    # Side-by-side marginals and correlation gap, for checking a profile
+    numeric = reference.select_dtypes(include='number').columns
+    stats = pd.concat({'reference': reference[numeric].describe().T[['mean', '50%', 'std']],
+                       'synthetic': synthetic[numeric].describe().T[['mean', '50%', 'std']]}, axis=1)
+    gap = (reference[numeric].corr(method='spearman') - synthetic[numeric].corr(method='spearman')).abs()
+    return stats, float(gap.to_numpy().max())
+
+
+# ------------------ Main ------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic campaign data shaped like the reference file.")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--out', default='data/synthetic.parquet', help="Output path; .csv, .parquet or .arrow")
+    parser.add_argument('--source', default=SOURCE_PATH, help="Reference file the profile is fitted on")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000)
+    parser.add_argument('--compare', action='store_true', help="Print reference vs synthetic statistics")
+    args = parser.parse_args(argv)
+
+    reference = pd.read_csv(args.source)
+    profile = CampaignProfile.fit(reference)
+    started = time.perf_counter()
+    rows = write_synthetic(args.out, args.rows, profile, args.seed, args.chunk_rows)
+    print(f"Wrote {rows} rows to {args.out} in {time.perf_counter() - started:.1f}s")
+
+    if args.compare:
+        stats, gap = compare(reference, generate(min(args.rows, 1_000_000), profile, args.seed))
+        print(stats.round(3))
+        print(f"Max Spearman correlation gap: {gap:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+from attribution import PathAccumulator, accumulate_file, attribute
+
+JOURNEYS = [
+    (['Search', 'Display', 'Search'], 1, 120.0, 'July'),
+    (['Display'], 0, 0.0, 'July'),
+    (['Search', 'Email'], 1, 80.0, 'August'),
+    (['Search', 'Display', 'Search'], 0, 0.0, 'July'),
+    (['Email'], 1, 40.0, 'August'),
+]
+
+
+def journeys(as_lists):
+    return pd.DataFrame({
+        'Path': [list(p) if as_lists else ' > '.join(p) for p, *_ in JOURNEYS],
+        'Conversions': [c for _, c, _, _ in JOURNEYS],
+        'Revenue': [r for *_, r, _ in JOURNEYS],
+        'Month': [m for *_, m in JOURNEYS],
+    })
+
+
+def credit(acc):
+    result = attribute(acc.paths(), models=['linear', 'markov'])
+    return result.sort_values(['Month', 'Ad Group', 'Model']).reset_index(drop=True)
+
+
+def test_parquet_list_paths_group_like_csv_paths(tmp_path):
+    pytest.importorskip('pyarrow')
+    parquet, csv = tmp_path / 'journeys.parquet', tmp_path / 'journeys.csv'
+    journeys(as_lists=True).to_parquet(parquet)
+    journeys(as_lists=False).to_csv(csv, index=False)
+
+    from_parquet, from_csv = accumulate_file(str(parquet)), accumulate_file(str(csv))
+    assert from_parquet.journeys == from_csv.journeys == len(JOURNEYS)
+    pd.testing.assert_frame_equal(from_parquet.paths().sort_values(['Month', 'Path']).reset_index(drop=True),
+                                  from_csv.paths().sort_values(['Month', 'Path']).reset_index(drop=True))
+    pd.testing.assert_frame_equal(credit(from_parquet), credit(from_csv))
+
+
+def test_list_paths_merge_across_chunks():
+    df = journeys(as_lists=True)
+    acc = PathAccumulator().update(df.iloc[:2]).merge(PathAccumulator().update(df.iloc[2:]))
+    paths = acc.paths().set_index(['Month', 'Path'])
+    # The two July Search > Display > Search journeys land in one path
+    assert len(paths) == 4
+    assert paths.loc[('July', 'Search > Display > Search'), 'Nulls'] == 1
+    assert paths['Conversions'].sum() == 3
@@ -0,0 +1,36 @@
+import asyncio
+import numpy as np
+from batching import MicroBatcher
+
+
+def test_rows_are_scored_with_the_key_they_were_submitted_with():
+    calls = []
+
+    def predict(key, X):
+        calls.append((key, len(X)))
+        return X[:, 0] * key
+
+    async def run():
+        batcher = MicroBatcher(predict, max_wait_ms=50)
+        # Features built for two model versions land in the same batch window
+        return await asyncio.gather(*[batcher.submit(np.array([[i]]), 1 if i % 2 else 100) for i in range(6)]), batcher
+
+    results, batcher = asyncio.run(run())
+    assert [int(r) for r in results] == [0, 1, 200, 3, 400, 5]
+    assert sorted(calls) == [(1, 3), (100, 3)]
+    assert batcher.stats()["batches"] == 1
+
+
+def test_a_failing_group_does_not_fail_the_others():
+    def predict(key, X):
+        if key == "broken":
+            raise RuntimeError("model unavailable")
+        return X[:, 0]
+
+    async def run():
+        batcher = MicroBatcher(predict, max_wait_ms=50)
+        return await asyncio.gather(batcher.submit(np.array([[7.0]]), "ok"),
+                                    batcher.submit(np.array([[8.0]]), "broken"), return_exceptions=True)
+
+    ok, broken = asyncio.run(run())
+    assert ok == 7.0 and isinstance(broken, RuntimeError)
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+from dataset_store import DatasetStore
+
+pytest.importorskip('pyarrow')
+
+
+def campaign_csv(rows, month='July'):
+    return pd.DataFrame({
+        'Ad Group': [f'Group {i % 7}' for i in range(rows)],
+        'Month': month,
+        'Impressions': 1_000,
+        'Clicks': 50,
+        'Cost': [float(i) for i in range(rows)],
+    }).to_csv(index=False).encode()
+
+
+def test_upload_over_both_budgets_is_still_described(tmp_path):
+    store = DatasetStore(tmp_path, memory_mb=1e-6, disk_mb=1e-6)
+    dataset_id = store.put(campaign_csv(500))
+    info = store.info(dataset_id)
+    assert info['rows'] == 500 and not info['in_memory']
+    assert store.exists(dataset_id)
+
+    # The next upload evicts it from disk instead
+    other = store.put(campaign_csv(500, month='August'))
+    assert store.exists(other) and not store.exists(dataset_id)
+    with pytest.raises(KeyError):
+        store.info(dataset_id)
+
+
+def test_info_falls_back_to_the_cached_frame(tmp_path):
+    store = DatasetStore(tmp_path)
+    dataset_id = store.put(campaign_csv(10))
+    store.path(dataset_id).unlink()
+    info = store.info(dataset_id)
+    assert info['rows'] == 10 and info['in_memory'] and info['stored_bytes'] == 0
+
+
+def test_lookups_do_not_change_eviction_order(tmp_path):
+    store = DatasetStore(tmp_path)
+    first, second = store.put(campaign_csv(10)), store.put(campaign_csv(10, month='August'))
+    store.exists(first)
+    store.info(first)
+    assert list(store._frames.entries) == [first, second]
@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+from featureengineering import FEATURES, build_features, columns_from_records
+
+EPS = 1e-6
+
+# Ad Group, Month, Impressions, Clicks, Conversions, Cost, Revenue, Sale Amount
+ROWS = [
+    ('Search', 'July', 10_000, 500, 25, 250.0, 900.0, 3_000.0),
+    ('Search', 'August', 4_000, 120, 6, 130.5, 80.25, 400.0),     # loss: negative ROI
+    ('Display', 'July', 100, 0, 0, 0.0, 0.0, 0.0),                # every denominator zero
+    ('Display', 'August', 1_000, 0, 0, 0.0, 40.0, 100.0),         # revenue without cost or clicks
+    ('Video', 'September', 2_000, 50, 0, 75.5, 0.0, 0.0),         # cost without revenue or conversions
+    ('Video', 'July', 0, 0, 0, 12.0, 0.0, 0.0),                   # no impressions
+]
+
+
+def campaign_frame():
+    df = pd.DataFrame(ROWS, columns=['Ad Group', 'Month', 'Impressions', 'Clicks', 'Conversions',
+                                     'Cost', 'Revenue', 'Sale Amount'])
+    df['CTR'] = np.where(df['Impressions'] > 0, df['Clicks'] / df['Impressions'].where(df['Impressions'] > 0), 0.0)
+    df['Conv Rate'] = np.where(df['Clicks'] > 0, df['Conversions'] / df['Clicks'].where(df['Clicks'] > 0), 0.0)
+    df['CPC'] = np.where(df['Clicks'] > 0, df['Cost'] / df['Clicks'].where(df['Clicks'] > 0), 0.0)
+    df['P&L'] = df['Revenue'] - df['Cost']
+    return df
+
+
+def reference_features(df):
+    """The training definition written out by hand: x / (d + 1e-6), NaN -> 0."""
+    revenue, cost = df['Revenue'].to_numpy(), df['Cost'].to_numpy()
+    clicks, conversions = df['Clicks'].to_numpy(float), df['Conversions'].to_numpy(float)
+    impressions = df['Impressions'].to_numpy(float)
+    labels = {col: sorted(df[col].unique()) for col in ('Ad Group', 'Month')}
+    expected = {
+        'Impressions': impressions,
+        'Clicks': clicks,
+        'CTR': df['CTR'].to_numpy(),
+        'Conversions': conversions,
+        'Conv Rate': conversions / (clicks + EPS),
+        'Cost': cost,
+        'CPC': cost / (clicks + EPS),
+        'Sale Amount': df['Sale Amount'].to_numpy(),
+        'P&L': df['P&L'].to_numpy(),
+        'ROI': (revenue - cost) / (cost + EPS),
+        'Profit_Margin': (revenue - cost) / (revenue + EPS),
+        'CPM': cost / (impressions + EPS) * 1000,
+        'Revenue_per_Click': revenue / (clicks + EPS),
+        'Revenue_per_Conversion': revenue / (conversions + EPS),
+        'Ad_Group_Encoded': [labels['Ad Group'].index(v) for v in df['Ad Group']],
+        'Month_Encoded': [labels['Month'].index(v) for v in df['Month']],
+    }
+    return np.nan_to_num(np.column_stack([expected[name] for name in FEATURES]).astype(np.float64))
+
+
+def assert_matches_reference(X, df):
+    assert X.dtype == np.float32 and X.shape == (len(df), len(FEATURES))
+    np.testing.assert_allclose(X, reference_features(df).astype(np.float32), rtol=1e-6, atol=1e-6)
+
+
+@pytest.fixture(scope='module')
+def training(tmp_path_factory):
+    modeltraining = pytest.importorskip('modeltraining')
+    df = campaign_frame()
+    path = tmp_path_factory.mktemp('data') / 'campaigns.csv'
+    df.to_csv(path, index=False)
+    X, y, encoders, _ = modeltraining.build_dataset(str(path))
+    return df, X, y, encoders
+
+
+def test_training_features_match_reference(training):
+    df, X, y, _ = training
+    assert_matches_reference(X, df)
+    np.testing.assert_allclose(y, df['Revenue'].to_numpy(np.float32))
+
+
+def test_roi_and_zero_denominators(training):
+    df, X, _, _ = training
+    roi, margin, cpm = (X[:, FEATURES.index(name)] for name in ('ROI', 'Profit_Margin', 'CPM'))
+    per_click = X[:, FEATURES.index('Revenue_per_Click')]
+    # ROI = (Revenue - Cost) / Cost
+    np.testing.assert_allclose(roi[:2], [(900 - 250) / 250, (80.25 - 130.5) / 130.5], rtol=1e-6)
+    # 0 / 0 is 0 rather than NaN, and x / 0 is x / 1e-6 as in training
+    assert roi[2] == margin[2] == cpm[2] == per_click[2] == 0
+    np.testing.assert_allclose(roi[3], 40 / EPS, rtol=1e-6)
+    np.testing.assert_allclose(margin[4], -75.5 / EPS, rtol=1e-6)
+    np.testing.assert_allclose(cpm[5], 12 / EPS * 1000, rtol=1e-6)
+    assert np.isfinite(X).all()
+
+
+def test_serving_features_match_training(training):
+    app = pytest.importorskip('app')
+    df, X, _, encoders = training
+    bundle = SimpleNamespace(features=FEATURES, encoders=encoders)
+    # The API only accepts rows with impressions
+    served = df[df['Impressions'] > 0]
+    records = [app.CampaignInput(
+        Impressions=row['Impressions'], Clicks=row['Clicks'], CTR=row['CTR'], Conversions=row['Conversions'],
+        Conv_Rate=row['Conv Rate'], Cost=row['Cost'], CPC=row['CPC'], Sale_Amount=row['Sale Amount'],
+        PnL=row['P&L'], Ad_Group=row['Ad Group'], Month=row['Month']) for _, row in served.iterrows()]
+
+    batch = app.campaign_features(records, bundle)
+    single = np.vstack([app.campaign_features([record], bundle) for record in records])
+    assert_matches_reference(batch, served)
+    np.testing.assert_array_equal(batch, X[served.index])
+    np.testing.assert_array_equal(single, X[served.index])
+
+
+def test_frame_and_record_inputs_agree_on_blanks(training):
+    df, _, _, encoders = training
+    # A blank input counts as zero on both paths
+    blank = df.assign(CTR=np.nan)
+    frame_X = build_features(blank, encoders)
+    records = blank.rename(columns={'Sale Amount': 'Sale_Amount', 'P&L': 'PnL', 'Ad Group': 'Ad_Group'})
+    record_X = build_features(columns_from_records(records.to_dict(orient='records')), encoders)
+    assert (frame_X[:, FEATURES.index('CTR')] == 0).all()
+    np.testing.assert_array_equal(frame_X, record_X)
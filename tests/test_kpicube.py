@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+from kpicube import KPICube, CubeStore, InvalidCube, MEASURES
+
+
+def campaign_rows(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    impressions = rng.integers(100, 10_000, n)
+    clicks = (impressions * rng.uniform(0.01, 0.3, n)).astype(int)
+    conversions = (clicks * rng.uniform(0, 0.2, n)).astype(int)
+    cost = np.round(clicks * rng.uniform(0.2, 2.0, n), 2)
+    revenue = np.round(conversions * rng.uniform(5, 50, n), 2)
+    return pd.DataFrame({
+        'Ad Group': rng.choice([f'Group {i}' for i in range(6)], n),
+        'Month': rng.choice(['July', 'August', 'September'], n),
+        'Impressions': impressions,
+        'Clicks': clicks,
+        'Conversions': conversions,
+        'Cost': cost,
+        'Revenue': revenue,
+        'Sale Amount': np.round(revenue * 4, 2),
+        'P&L': revenue - cost,
+    })
+
+
+def frame(result):
+    return pd.DataFrame(result)
+
+
+def expected(df, by):
+    sums = df.groupby(by)[MEASURES].sum() if by else df[MEASURES].sum().to_frame().T
+    sums['CTR'] = sums['Clicks'] / sums['Impressions']
+    sums['ROAS'] = sums['Revenue'] / sums['Cost']
+    return sums
+
+
+@pytest.fixture
+def df():
+    return campaign_rows()
+
+
+def test_roll_up_matches_groupby(df):
+    cube = KPICube().update(df)
+    assert cube.rows == len(df)
+    assert len(cube) == df.groupby(['Ad Group', 'Month']).ngroups
+
+    by_group = frame(cube.query(by=['Ad Group'])).set_index('Ad Group').sort_index()
+    reference = expected(df, 'Ad Group')
+    for col in [*MEASURES, 'CTR', 'ROAS']:
+        np.testing.assert_allclose(by_group[col], reference[col], rtol=1e-12)
+
+    total = frame(cube.query())
+    assert total['Rows'].iloc[0] == len(df)
+    np.testing.assert_allclose(total['Cost'].iloc[0], df['Cost'].sum(), rtol=1e-12)
+
+
+def test_slice_keeps_only_filtered_cells(df):
+    cube = KPICube().update(df)
+    result = frame(cube.query(by=['Month'], filters={'Ad Group': ['Group 1', 'Group 4', 'No such group']}))
+    sliced = df[df['Ad Group'].isin(['Group 1', 'Group 4'])]
+    reference = expected(sliced, 'Month')
+    result = result.set_index('Month').loc[reference.index]
+    np.testing.assert_allclose(result['Revenue'], reference['Revenue'], rtol=1e-12)
+    np.testing.assert_allclose(result['CTR'], reference['CTR'], rtol=1e-12)
+    assert (result['Rows'] == sliced.groupby('Month').size().loc[reference.index]).all()
+
+
+def test_top_k_orders_by_metric(df):
+    cube = KPICube().update(df)
+    result = cube.query(by=['Ad Group', 'Month'], metrics=['Revenue'], sort_by='ROAS', top=3)
+    reference = expected(df, ['Ad Group', 'Month'])['ROAS'].sort_values(ascending=False).head(3)
+    assert list(zip(result['Ad Group'], result['Month'])) == list(reference.index)
+    # The sort key ranks the groups but only the asked-for metrics come back
+    assert list(result) == ['Ad Group', 'Month', 'Revenue']
+
+    lowest = cube.query(by=['Ad Group'], metrics=['Cost'], top=2, sort_by='Cost', descending=False)
+    np.testing.assert_allclose(lowest['Cost'], df.groupby('Ad Group')['Cost'].sum().nsmallest(2).to_numpy())
+
+
+def test_zero_denominators_read_as_nan():
+    df = campaign_rows(4).assign(Impressions=0, Clicks=0)
+    result = KPICube().update(df).query(metrics=['CTR', 'Conv Rate'])
+    assert np.isnan(result['CTR']).all() and np.isnan(result['Conv Rate']).all()
+
+
+def test_append_equals_one_build(df, tmp_path):
+    store = CubeStore(tmp_path)
+    # New labels arrive with the later batches
+    batches = [df.iloc[:100], df.iloc[100:250], df.iloc[250:].assign(Month='October')]
+    for batch in batches:
+        store.append('shop', KPICube().update(batch))
+    full = KPICube().update(pd.concat(batches))
+
+    appended = CubeStore(tmp_path).get('shop')
+    assert appended.rows == full.rows == len(df)
+    by = ['Ad Group', 'Month']
+    got = frame(appended.query(by=by)).set_index(by).sort_index()
+    want = frame(full.query(by=by)).set_index(by).sort_index()
+    pd.testing.assert_frame_equal(got, want)
+
+    updated = KPICube().update(batches[0]).update(batches[1]).update(batches[2])
+    pd.testing.assert_frame_equal(frame(updated.query(by=by)).set_index(by).sort_index(), want)
+
+
+def test_unknown_dimension_is_rejected(df):
+    with pytest.raises(InvalidCube):
+        KPICube().update(df).query(by=['Region'])
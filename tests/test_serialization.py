@@ -0,0 +1,33 @@
+import numpy as np
+import orjson
+import pandas as pd
+import pytest
+from serialization import NonFiniteValues, encode_eda, encode_table
+
+SUMMARY = {
+    "Shape": [3, 2],
+    "Numeric_Summary": {"CTR": {"mean": 0.4, "std": float("nan")}, "Cost": {"mean": 10.0, "std": 1.5}},
+    "Correlation": {"CTR": {"CTR": 1.0, "Cost": np.float64("inf")}},
+    "Missing_Values": {"CTR": 0, "Cost": 1},
+}
+
+
+def test_eda_json_writes_nonfinite_as_null():
+    body = orjson.loads(encode_eda(SUMMARY))
+    assert body["Numeric_Summary"]["CTR"]["std"] is None
+    assert body["Correlation"]["CTR"]["Cost"] is None
+
+
+def test_eda_json_refuses_nonfinite_on_error():
+    with pytest.raises(NonFiniteValues, match=r"Numeric_Summary\.CTR\.std.*Correlation\.CTR\.Cost"):
+        encode_eda(SUMMARY, nonfinite="error")
+    # Sections without them still encode
+    body = orjson.loads(encode_eda(SUMMARY, columns=["Missing_Values"], nonfinite="error"))
+    assert body == {"Missing_Values": {"CTR": 0, "Cost": 1}}
+
+
+def test_eda_json_and_tables_agree_on_error():
+    with pytest.raises(NonFiniteValues):
+        encode_eda(SUMMARY, fmt="csv", nonfinite="error")
+    with pytest.raises(NonFiniteValues):
+        encode_table(pd.DataFrame({"x": [1.0, np.nan]}), nonfinite="error")
@@ -0,0 +1,141 @@
+import json
+import numpy as np
+
+# Objectives whose prediction is the raw margin, so leaf sums need no link function
+IDENTITY_OBJECTIVES = {'reg:squarederror', 'reg:linear', 'reg:absoluteerror', 'reg:pseudohubererror'}
+
+# Self-check against XGBoost on threshold-probing rows when the ensemble is built
+VERIFY_ROWS = 512
+VERIFY_RTOL = 1e-5
+VERIFY_ATOL = 1e-3
+
+
+class UnsupportedModel(ValueError):
+    pass
+
+
+def _base_score(value):
+    # "[3.05E3]" in XGBoost >= 2, "3.05E3" before
+    return float(str(value).strip('[]').split(',')[0])
+
+
+# ------------------- Flat Ensemble -------------------
+class FlatEnsemble:
+    """A gbtree booster as contiguous node arrays for low-overhead inference.
+
+    All trees are concatenated: node i splits on feature[i] at threshold[i]
+    and goes to left[i] when x < threshold (or when x is NaN and
+    default_left[i]), else right[i]. Leaves point to themselves and carry
+    value[i], so every row walks every tree for exactly `depth` vectorized
+    steps. Single rows and small batches skip DMatrix construction and
+    XGBoost's thread-pool dispatch entirely.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots, depth, base_score):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.base_score = base_score
+
+    @classmethod
+    def from_booster(cls, booster):
+        model = json.loads(booster.save_raw('json'))['learner']
+        objective = model['objective']['name']
+        if objective not in IDENTITY_OBJECTIVES:
+            raise UnsupportedModel(f"Objective {objective} needs a link function")
+        params = model['learner_model_param']
+        if int(params.get('num_class', 0)) > 1 or int(params.get('num_target', 1)) > 1:
+            raise UnsupportedModel("Multi-output models are not supported")
+        if model['gradient_booster']['name'] != 'gbtree':
+            raise UnsupportedModel(f"Booster {model['gradient_booster']['name']} is not a tree ensemble")
+        trees = model['gradient_booster']['model']['trees']
+
+        parts = {k: [] for k in ('feature', 'threshold', 'left', 'right', 'default_left', 'value')}
+        roots, depth, offset = [], 0, 0
+        for tree in trees:
+            if any(tree.get('split_type', ())):
+                raise UnsupportedModel("Categorical splits are not supported")
+            left = np.asarray(tree['left_children'], dtype=np.int64)
+            right = np.asarray(tree['right_children'], dtype=np.int64)
+            leaf = left < 0
+            nodes = np.arange(len(left))
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+
+            parts['feature'].append(np.where(leaf, 0, tree['split_indices']))
+            parts['threshold'].append(np.where(leaf, np.float32(0), conditions))
+            parts['left'].append(np.where(leaf, nodes, left) + offset)
+            parts['right'].append(np.where(leaf, nodes, right) + offset)
+            parts['default_left'].append(np.asarray(tree['default_left'], dtype=bool))
+            # A leaf's output is stored in its split condition slot
+            parts['value'].append(np.where(leaf, conditions, np.float32(0)))
+            roots.append(offset)
+            depth = max(depth, _tree_depth(left, right))
+            offset += len(left)
+
+        return cls(
+            feature=np.concatenate(parts['feature']).astype(np.intp),
+            threshold=np.concatenate(parts['threshold']).astype(np.float32),
+            left=np.concatenate(parts['left']).astype(np.intp),
+            right=np.concatenate(parts['right']).astype(np.intp),
+            default_left=np.concatenate(parts['default_left']),
+            value=np.concatenate(parts['value']).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.intp),
+            depth=depth,
+            base_score=np.float32(_base_score(params['base_score'])),
+        )
+
+    def __len__(self):
+        return len(self.roots)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.depth):
+            x = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].sum(axis=1, dtype=np.float32) + self.base_score
+
+    def probe_rows(self, n_features, rows=VERIFY_ROWS, seed=0):
+        # Values at, just below and just above real split thresholds, so the
+        # check exercises both branches and the strict < comparison
+        rng = np.random.default_rng(seed)
+        X = rng.normal(size=(rows, n_features)).astype(np.float32)
+        split = self.left != np.arange(len(self.left))
+        for f in range(n_features):
+            thresholds = self.threshold[split & (self.feature == f)]
+            if len(thresholds):
+                picked = rng.choice(thresholds, rows)
+                nudge = rng.integers(-1, 2, rows)
+                picked = np.where(nudge < 0, np.nextafter(picked, -np.inf), picked)
+                X[:, f] = np.where(nudge > 0, np.nextafter(picked, np.inf), picked)
+        return X
+
+    def verify(self, booster, X=None, rtol=VERIFY_RTOL, atol=VERIFY_ATOL):
+        """Compare against booster.inplace_predict; returns the max absolute error."""
+        if X is None:
+            X = self.probe_rows(booster.num_features())
+        expected = booster.inplace_predict(X)
+        actual = self.predict(X)
+        error = float(np.max(np.abs(actual - expected))) if len(X) else 0.0
+        if not np.allclose(actual, expected, rtol=rtol, atol=atol):
+            raise UnsupportedModel(f"Flat ensemble differs from XGBoost by up to {error:g}")
+        return error
+
+
+def _tree_depth(left, right):
+    # Edges from the root to the deepest leaf
+    depth, frontier = 0, [0]
+    while True:
+        frontier = [child for node in frontier if left[node] >= 0 for child in (left[node], right[node])]
+        if not frontier:
+            return depth
+        depth += 1